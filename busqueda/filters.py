@@ -0,0 +1,33 @@
+from rest_framework import filters
+
+from . import indice
+
+
+class IndiceSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter que responde `?search=` con el índice de trigramas cuando el
+    modelo está registrado en busqueda.indice, y con `icontains` si no lo está.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not indice.registrado(queryset.model):
+            return super().filter_queryset(request, queryset, view)
+        consulta = request.query_params.get(self.search_param, '')
+        if not consulta.strip():
+            return queryset
+        return indice.buscar(queryset, consulta)
+
+
+class RelevanciaOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter que, si hay búsqueda y el cliente no pidió `?ordering=`,
+    ordena por relevancia en lugar del ordenamiento por defecto de la vista.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if 'relevancia' in queryset.query.annotations and not self.get_ordering_param(request):
+            return queryset.order_by('-relevancia', 'pk')
+        return super().filter_queryset(request, queryset, view)
+
+    def get_ordering_param(self, request):
+        return request.query_params.get(self.ordering_param, '').strip()
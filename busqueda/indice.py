@@ -0,0 +1,223 @@
+"""
+Índice de búsqueda por trigramas para los modelos registrados.
+
+Cada app registra en su `ready()` los campos buscables de sus modelos:
+
+    registrar(Lote, ['nombre', 'codigo', 'cultivo_actual', 'finca__nombre'])
+
+El índice se actualiza con señales al guardar o eliminar objetos (y al cambiar
+los campos de modelos relacionados, como el nombre de la finca de un lote).
+`buscar()` resuelve una consulta con búsquedas por índice sobre TerminoIndice en
+lugar de `LIKE '%texto%'`, y anota la relevancia de cada resultado.
+"""
+import operator
+from functools import reduce
+
+from django.db import connection, models, transaction
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from config.exportacion import iterar_filas
+
+from . import texto
+from .models import TerminoIndice
+
+# modelo -> {campo: peso}
+_registro = {}
+
+
+def etiqueta(modelo):
+    return modelo._meta.label_lower
+
+
+def registrado(modelo):
+    return modelo in _registro
+
+
+def modelos_registrados():
+    return list(_registro)
+
+
+def campos_registrados(modelo):
+    """Retorna {campo: peso} de los campos buscables del modelo"""
+    return dict(_registro[modelo])
+
+
+def registrar(modelo, campos):
+    """
+    Registra los campos buscables de un modelo. `campos` es una lista de
+    nombres (peso 1) o un diccionario {campo: peso}. Se admiten campos de
+    modelos relacionados con la sintaxis 'relacion__campo'.
+    """
+    if not isinstance(campos, dict):
+        campos = {campo: 1 for campo in campos}
+    _registro[modelo] = campos
+
+    post_save.connect(_indexar_guardado, sender=modelo, weak=False,
+                      dispatch_uid=f'busqueda-guardar-{etiqueta(modelo)}')
+    post_delete.connect(_eliminar_indice, sender=modelo, weak=False,
+                        dispatch_uid=f'busqueda-eliminar-{etiqueta(modelo)}')
+
+    # Campos de otro modelo: reindexar cuando ese modelo cambie
+    for campo in campos:
+        if LOOKUP_SEP not in campo:
+            continue
+        relacion, campo_relacionado = campo.split(LOOKUP_SEP, 1)
+        relacionado = modelo._meta.get_field(relacion).related_model
+        uid = f'busqueda-{etiqueta(modelo)}-{campo}'
+        pre_save.connect(
+            _guardar_previo_relacionado(campo_relacionado), sender=relacionado,
+            weak=False, dispatch_uid=f'{uid}-previo'
+        )
+        post_save.connect(
+            _reindexar_relacionados(modelo, relacion, campo_relacionado),
+            sender=relacionado, weak=False, dispatch_uid=f'{uid}-guardar'
+        )
+
+
+# ===== CONSTRUCCIÓN DEL ÍNDICE =====
+
+def _terminos(modelo, objeto_id, valores):
+    """Genera las filas (modelo, objeto_id, campo, trigrama, peso) de un objeto"""
+    etiqueta_modelo = etiqueta(modelo)
+    for campo, peso in _registro[modelo].items():
+        for trigrama in texto.trigramas_texto(valores.get(campo)):
+            yield etiqueta_modelo, objeto_id, campo, trigrama, peso
+
+
+def _insertar_terminos(filas):
+    """
+    Inserta las filas del índice con executemany. Se evita bulk_create porque
+    crear una instancia del modelo por trigrama domina el tiempo al reindexar
+    miles de objetos.
+    """
+    if not filas:
+        return
+    tabla = connection.ops.quote_name(TerminoIndice._meta.db_table)
+    columnas = ', '.join(
+        connection.ops.quote_name(c) for c in ('modelo', 'objeto_id', 'campo', 'trigrama', 'peso')
+    )
+    sql = f'INSERT INTO {tabla} ({columnas}) VALUES (%s, %s, %s, %s, %s)'
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, filas)
+
+
+def reindexar(modelo, queryset=None, tamano_bloque=1000):
+    """Reconstruye el índice de los objetos del queryset (todos por defecto)"""
+    if queryset is None:
+        # Borrado y reconstrucción en una transacción: las búsquedas
+        # concurrentes siguen viendo el índice anterior hasta que termine
+        with transaction.atomic():
+            TerminoIndice.objects.filter(modelo=etiqueta(modelo)).delete()
+            return _indexar(modelo, modelo._default_manager.all(), tamano_bloque, borrar=False)
+    return _indexar(modelo, queryset, tamano_bloque, borrar=True)
+
+
+def _indexar(modelo, queryset, tamano_bloque, borrar):
+    campos = list(_registro[modelo])
+    pk = modelo._meta.pk.attname
+    bloque = []
+    total = 0
+    for fila in iterar_filas(queryset, [pk] + campos, tamano_bloque):
+        bloque.append(fila)
+        if len(bloque) == tamano_bloque:
+            _escribir_bloque(modelo, campos, bloque, borrar)
+            total += len(bloque)
+            bloque = []
+    if bloque:
+        _escribir_bloque(modelo, campos, bloque, borrar)
+        total += len(bloque)
+    return total
+
+
+def _escribir_bloque(modelo, campos, filas, borrar):
+    with transaction.atomic():
+        if borrar:
+            TerminoIndice.objects.filter(
+                modelo=etiqueta(modelo), objeto_id__in=[fila[0] for fila in filas]
+            ).delete()
+        terminos = []
+        for fila in filas:
+            terminos.extend(_terminos(modelo, fila[0], dict(zip(campos, fila[1:]))))
+        _insertar_terminos(terminos)
+
+
+def _indexar_guardado(sender, instance, **kwargs):
+    reindexar(sender, sender._default_manager.filter(pk=instance.pk))
+
+
+def _eliminar_indice(sender, instance, **kwargs):
+    TerminoIndice.objects.filter(modelo=etiqueta(sender), objeto_id=instance.pk).delete()
+
+
+def _guardar_previo_relacionado(campo):
+    def receptor(sender, instance, **kwargs):
+        previo = None
+        if instance.pk:
+            previo = (
+                sender._default_manager.filter(pk=instance.pk)
+                .values_list(campo, flat=True).first()
+            )
+        setattr(instance, f'_busqueda_previo_{campo}', previo)
+    return receptor
+
+
+def _reindexar_relacionados(modelo, relacion, campo):
+    def receptor(sender, instance, created, **kwargs):
+        previo = getattr(instance, f'_busqueda_previo_{campo}', None)
+        if created or previo == getattr(instance, campo):
+            return
+        reindexar(modelo, modelo._default_manager.filter(**{relacion: instance}))
+    return receptor
+
+
+# ===== CONSULTAS =====
+
+def buscar(queryset, consulta, campos=None):
+    """
+    Filtra el queryset a los objetos que contienen todas las palabras de la
+    consulta (en cualquiera de los campos registrados, o solo en `campos`) y
+    anota `relevancia`: la suma de los pesos de los trigramas coincidentes.
+
+    El índice descarta los objetos que no tienen los trigramas de cada palabra,
+    pero no sabe si están seguidos ("arroz" en "arroyo rozado"): los candidatos
+    se confirman con `icontains` de cada término, como SearchFilter.
+    """
+    modelo = queryset.model
+    palabras = texto.palabras(consulta)
+    if not palabras:
+        return queryset
+
+    terminos = TerminoIndice.objects.filter(modelo=etiqueta(modelo))
+    if campos is not None:
+        terminos = terminos.filter(campo__in=campos)
+
+    todos = set()
+    for palabra in palabras:
+        requeridos = texto.trigramas_requeridos(palabra)
+        todos |= requeridos | texto.trigramas(palabra)
+        coincidencias = (
+            terminos.filter(trigrama__in=requeridos)
+            .values('objeto_id')
+            .annotate(encontrados=models.Count('trigrama', distinct=True))
+            .filter(encontrados=len(requeridos))
+            .values('objeto_id')
+        )
+        queryset = queryset.filter(pk__in=coincidencias)
+
+    campos_texto = campos if campos is not None else list(_registro[modelo])
+    for termino in consulta.replace(',', ' ').split():
+        if texto.palabras(termino):
+            queryset = queryset.filter(reduce(operator.or_, (
+                models.Q(**{f'{campo}__icontains': termino}) for campo in campos_texto
+            )))
+
+    relevancia = (
+        terminos.filter(objeto_id=models.OuterRef('pk'), trigrama__in=todos)
+        .values('objeto_id')
+        .annotate(total=models.Sum('peso'))
+        .values('total')
+    )
+    return queryset.annotate(
+        relevancia=models.Subquery(relevancia, output_field=models.IntegerField())
+    )
@@ -0,0 +1,31 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from busqueda import indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de los modelos registrados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'modelos', nargs='*',
+            help='Modelos a reindexar (app.Modelo). Por defecto, todos los registrados.'
+        )
+
+    def handle(self, *args, **options):
+        modelos = []
+        for nombre in options['modelos']:
+            try:
+                modelo = apps.get_model(nombre)
+            except (LookupError, ValueError):
+                raise CommandError(f'Modelo desconocido: {nombre}')
+            if not indice.registrado(modelo):
+                raise CommandError(f'{nombre} no está registrado en el índice de búsqueda')
+            modelos.append(modelo)
+
+        for modelo in modelos or indice.modelos_registrados():
+            total = indice.reindexar(modelo)
+            self.stdout.write(
+                self.style.SUCCESS(f'{modelo._meta.label}: {total} objeto(s) indexado(s)')
+            )
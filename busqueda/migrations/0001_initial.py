@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoIndice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(help_text='Etiqueta app.modelo', max_length=100)),
+                ('objeto_id', models.BigIntegerField()),
+                ('campo', models.CharField(max_length=100)),
+                ('trigrama', models.CharField(max_length=3)),
+                ('peso', models.PositiveSmallIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Término del Índice',
+                'verbose_name_plural': 'Términos del Índice',
+                'indexes': [models.Index(fields=['modelo', 'trigrama', 'objeto_id'], name='busqueda_te_modelo_4b9ed2_idx'), models.Index(fields=['modelo', 'campo', 'trigrama', 'objeto_id'], name='busqueda_te_modelo_c792b5_idx'), models.Index(fields=['modelo', 'objeto_id'], name='busqueda_te_modelo_d83af9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+from busqueda import indice, texto
+
+TAMANO_BLOQUE = 1000
+
+
+def indexar_existentes(apps, schema_editor):
+    """Indexa los objetos que ya existían en los modelos registrados"""
+    TerminoIndice = apps.get_model('busqueda', 'TerminoIndice')
+    for modelo in indice.modelos_registrados():
+        historico = apps.get_model(modelo._meta.label)
+        campos = indice.campos_registrados(modelo)
+        # Por si el índice ya se había construido con reindexar_busqueda
+        TerminoIndice.objects.filter(modelo=indice.etiqueta(modelo)).delete()
+        filas = historico.objects.order_by('pk').values_list('pk', *campos)
+        terminos = []
+        for fila in filas.iterator(chunk_size=TAMANO_BLOQUE):
+            for campo, valor in zip(campos, fila[1:]):
+                terminos.extend(
+                    TerminoIndice(
+                        modelo=indice.etiqueta(modelo), objeto_id=fila[0], campo=campo,
+                        trigrama=trigrama, peso=campos[campo],
+                    )
+                    for trigrama in texto.trigramas_texto(valor)
+                )
+            if len(terminos) >= TAMANO_BLOQUE:
+                TerminoIndice.objects.bulk_create(terminos)
+                terminos = []
+        TerminoIndice.objects.bulk_create(terminos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('busqueda', '0001_initial'),
+        ('fincas', '0001_initial'),
+        ('insumos', '0001_initial'),
+        ('trabajadores', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(indexar_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class TerminoIndice(models.Model):
+    """
+    Trigrama normalizado de un campo de texto de un objeto buscable.
+    
+    Cada modelo registrado en busqueda.indice tiene sus propias filas,
+    separadas por la columna `modelo` que encabeza los índices.
+    """
+    
+    modelo = models.CharField(max_length=100, help_text="Etiqueta app.modelo")
+    objeto_id = models.BigIntegerField()
+    campo = models.CharField(max_length=100)
+    trigrama = models.CharField(max_length=3)
+    peso = models.PositiveSmallIntegerField(default=1)
+    
+    class Meta:
+        verbose_name = 'Término del Índice'
+        verbose_name_plural = 'Términos del Índice'
+        indexes = [
+            models.Index(fields=['modelo', 'trigrama', 'objeto_id']),
+            models.Index(fields=['modelo', 'campo', 'trigrama', 'objeto_id']),
+            models.Index(fields=['modelo', 'objeto_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.modelo}:{self.objeto_id} {self.campo} '{self.trigrama}'"
@@ -0,0 +1,29 @@
+from rest_framework.test import APITestCase
+
+from insumos.models import Insumo
+
+from . import indice
+from .models import TerminoIndice
+
+
+class BusquedaTests(APITestCase):
+
+    def crear_insumo(self, codigo, nombre):
+        return Insumo.objects.create(
+            codigo=codigo, nombre=nombre, categoria='fertilizante',
+            stock_actual=1, stock_minimo=0, precio_unitario=1
+        )
+
+    def test_trigramas_dispersos_no_coinciden(self):
+        arroz = self.crear_insumo('A-1', 'Arroz blanco')
+        self.crear_insumo('A-2', 'Arroyo rozado')
+        respuesta = self.client.get('/api/inventario/insumos/', {'nombre': 'arroz'})
+        self.assertEqual([i['id'] for i in respuesta.json()['results']], [arroz.pk])
+        self.assertEqual(list(indice.buscar(Insumo.objects.all(), 'arroz')), [arroz])
+
+    def test_reindexar_reconstruye_el_indice(self):
+        insumo = self.crear_insumo('A-1', 'Urea')
+        TerminoIndice.objects.all().delete()
+        self.assertFalse(indice.buscar(Insumo.objects.all(), 'urea').exists())
+        self.assertEqual(indice.reindexar(Insumo), 1)
+        self.assertEqual(list(indice.buscar(Insumo.objects.all(), 'urea')), [insumo])
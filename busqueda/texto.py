@@ -0,0 +1,49 @@
+"""
+Normalización de texto y extracción de trigramas para el índice de búsqueda.
+
+El texto se pasa a minúsculas, se le quitan las tildes ("Maíz" -> "maiz") y se
+divide en palabras alfanuméricas. Cada palabra se rellena con '^^' al inicio y
+'$' al final antes de partirla en trigramas, así los trigramas de borde premian
+las coincidencias al comienzo o al final de una palabra.
+"""
+import re
+import unicodedata
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto):
+    """Retorna el texto en minúsculas, sin tildes y solo con letras y números"""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(' ', texto.lower()).strip()
+
+
+def palabras(texto):
+    """Retorna las palabras normalizadas del texto"""
+    return normalizar(texto).split()
+
+
+def trigramas(palabra):
+    """Retorna los trigramas de una palabra rellenada con '^^' y '$'"""
+    relleno = f'^^{palabra}$'
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def trigramas_texto(texto):
+    """Retorna todos los trigramas de las palabras de un texto"""
+    resultado = set()
+    for palabra in palabras(texto):
+        resultado |= trigramas(palabra)
+    return resultado
+
+
+def trigramas_requeridos(palabra):
+    """
+    Trigramas que debe contener un campo para que la palabra buscada aparezca
+    en él: los trigramas internos (coincidencia en cualquier parte de una
+    palabra) o, para palabras de 1 o 2 letras, el trigrama de inicio.
+    """
+    if len(palabra) >= 3:
+        return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+    return {f'^^{palabra}'[-3:] if len(palabra) == 1 else f'^{palabra}'}
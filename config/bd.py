@@ -0,0 +1,41 @@
+"""
+Utilidades de escritura que dependen del motor de base de datos.
+"""
+from django.db import connections, router
+
+
+def guardar_por_clave(modelo, objetos, clave, campos, batch_size=None):
+    """
+    Inserta o actualiza `objetos` según el campo único `clave`.
+
+    En motores con ON CONFLICT (PostgreSQL, SQLite) es un solo upsert. MySQL no
+    admite indicar la columna del conflicto, así que ahí se actualizan las filas
+    que ya existen y se insertan solo las que faltan.
+    """
+    objetos = list(objetos)
+    if not objetos:
+        return
+    alias = router.db_for_write(modelo)
+    if connections[alias].features.supports_update_conflicts_with_target:
+        modelo.objects.using(alias).bulk_create(
+            objetos, batch_size=batch_size, update_conflicts=True,
+            unique_fields=[clave], update_fields=campos,
+        )
+        return
+
+    atributo = modelo._meta.get_field(clave).attname
+    existentes = dict(
+        modelo.objects.using(alias)
+        .filter(**{f'{atributo}__in': [getattr(o, atributo) for o in objetos]})
+        .values_list(atributo, 'pk')
+    )
+    nuevos, actualizados = [], []
+    for objeto in objetos:
+        pk = existentes.get(getattr(objeto, atributo))
+        if pk is None:
+            nuevos.append(objeto)
+        else:
+            objeto.pk = pk
+            actualizados.append(objeto)
+    modelo.objects.using(alias).bulk_update(actualizados, campos, batch_size=batch_size)
+    modelo.objects.using(alias).bulk_create(nuevos, batch_size=batch_size)
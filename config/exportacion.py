@@ -0,0 +1,84 @@
+"""
+Exportación de querysets en NDJSON o CSV con memoria constante.
+
+Las filas se leen en bloques ordenados por clave primaria (`pk > último`) con
+`values_list`, de modo que nunca se cargan más de `tamano_bloque` filas a la
+vez, incluso en MySQL donde el driver no soporta cursores del lado del servidor.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+FORMATOS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+TAMANO_BLOQUE = 2000
+
+
+def campos_exportables(modelo):
+    """Retorna los nombres de columna de todos los campos concretos del modelo"""
+    return [campo.attname for campo in modelo._meta.concrete_fields]
+
+
+def iterar_filas(queryset, campos, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Genera tuplas con los `campos` de cada fila, leyendo por bloques de pk.
+    `campos` debe incluir la clave primaria.
+    """
+    pk = queryset.model._meta.pk.attname
+    posicion = campos.index(pk)
+    queryset = queryset.order_by(pk).values_list(*campos)
+
+    ultimo = None
+    while True:
+        bloque = queryset if ultimo is None else queryset.filter(**{f'{pk}__gt': ultimo})
+        filas = list(bloque[:tamano_bloque])
+        yield from filas
+        if len(filas) < tamano_bloque:
+            return
+        ultimo = filas[-1][posicion]
+
+
+class _Eco:
+    """Archivo mínimo para csv.writer que retorna lo escrito"""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_lineas(queryset, campos, formato, tamano_bloque=TAMANO_BLOQUE):
+    """Genera las líneas de texto de la exportación en el formato pedido"""
+    pk = queryset.model._meta.pk.attname
+    if pk not in campos:
+        campos = [pk] + list(campos)
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(campos)
+        for fila in iterar_filas(queryset, campos, tamano_bloque):
+            yield escritor.writerow(fila)
+    elif formato == 'ndjson':
+        for fila in iterar_filas(queryset, campos, tamano_bloque):
+            yield json.dumps(dict(zip(campos, fila)), cls=DjangoJSONEncoder) + '\n'
+    else:
+        raise ValueError(f'Formato no soportado: {formato}')
+
+
+def formato_solicitado(request, por_defecto='ndjson'):
+    """Lee `?formato=` de la petición; retorna None si no es un formato soportado"""
+    formato = request.query_params.get('formato', por_defecto)
+    return formato if formato in FORMATOS else None
+
+
+def respuesta_exportacion(queryset, formato, nombre, campos=None):
+    """Retorna un StreamingHttpResponse con la exportación del queryset"""
+    campos = campos or campos_exportables(queryset.model)
+    respuesta = StreamingHttpResponse(
+        generar_lineas(queryset, campos, formato),
+        content_type=FORMATOS[formato],
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return respuesta
@@ -0,0 +1,230 @@
+"""
+Paginación por cursor (keyset) para todos los listados de la API.
+
+En lugar de OFFSET, cada página continúa desde los valores de ordenamiento de la
+última fila de la página anterior: `WHERE (a, b, id) > (x, y, z)`. La base de
+datos entra directamente al índice compuesto en ese punto, así que una página
+profunda cuesta lo mismo que la primera.
+
+El ordenamiento se toma del queryset (OrderingFilter o `ordering` de la vista)
+o, si no tiene, de `Meta.ordering` del modelo, y siempre se completa con la
+clave primaria para que sea único. Las columnas del ordenamiento no deben ser
+nulas.
+
+Configuración en `REST_FRAMEWORK`:
+- PAGE_SIZE: tamaño de página por defecto.
+- MAX_PAGE_SIZE: si se define, permite `?page_size=` hasta ese máximo.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or 50
+        max_page_size = settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE')
+        if max_page_size and self.page_size_query_param in request.query_params:
+            try:
+                solicitado = int(request.query_params[self.page_size_query_param])
+            except ValueError:
+                return page_size
+            if solicitado > 0:
+                return min(solicitado, max_page_size)
+        return page_size
+
+    # ===== ORDENAMIENTO =====
+
+    def get_ordering(self, queryset):
+        """Retorna [(nombre_columna, descendente)] terminando en la clave primaria"""
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        modelo = queryset.model
+        pk = modelo._meta.pk.attname
+
+        resultado = []
+        for item in ordering:
+            if not isinstance(item, str) or item == '?':
+                raise ImproperlyConfigured(
+                    'KeysetPagination solo admite ordenamientos por nombre de campo'
+                )
+            descendente = item.startswith('-')
+            nombre = item.lstrip('-')
+            if nombre == 'pk':
+                nombre = pk
+            if nombre not in queryset.query.annotations:
+                if LOOKUP_SEP in nombre:
+                    raise ImproperlyConfigured(
+                        f'KeysetPagination no admite ordenar por relaciones ({nombre})'
+                    )
+                nombre = modelo._meta.get_field(nombre).attname
+            resultado.append((nombre, descendente))
+            if nombre == pk:
+                break
+        if not resultado or resultado[-1][0] != pk:
+            resultado.append((pk, False))
+        return resultado
+
+    def _campo(self, queryset, nombre):
+        if nombre in queryset.query.annotations:
+            return queryset.query.annotations[nombre].output_field
+        return next(f for f in queryset.model._meta.concrete_fields if f.attname == nombre)
+
+    # ===== CURSOR =====
+
+    def encode_cursor(self, valores, reverso):
+        datos = {'v': [self._a_texto(v) for v in valores]}
+        if reverso:
+            datos['r'] = 1
+        texto = json.dumps(datos, separators=(',', ':'))
+        return base64.urlsafe_b64encode(texto.encode()).decode()
+
+    def decode_cursor(self, request):
+        codificado = request.query_params.get(self.cursor_query_param)
+        if not codificado:
+            return None, False
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(codificado.encode()))
+            valores = datos['v']
+            reverso = bool(datos.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            self._cursor_invalido()
+        if not isinstance(valores, list) or len(valores) != len(self.ordering):
+            self._cursor_invalido()
+        convertidos = []
+        try:
+            for (nombre, _), valor in zip(self.ordering, valores):
+                campo = self._campo(self.queryset, nombre)
+                valor = campo.to_python(valor)
+                # Columnas no nulas; los validadores acotan los enteros al rango de la base
+                if valor is None:
+                    self._cursor_invalido()
+                campo.run_validators(valor)
+                convertidos.append(valor)
+        except (TypeError, ValueError, DjangoValidationError):
+            self._cursor_invalido()
+        return convertidos, reverso
+
+    def _cursor_invalido(self):
+        """Un cursor alterado o de otro ordenamiento es un error del cliente (400)"""
+        raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+
+    @staticmethod
+    def _a_texto(valor):
+        if hasattr(valor, 'isoformat'):
+            return valor.isoformat()
+        if isinstance(valor, (bool, int, float)) or valor is None:
+            return valor
+        return str(valor)
+
+    def _filtro_posterior(self, valores, reverso):
+        """Construye el filtro de las filas que van después de `valores`"""
+        filtro = Q()
+        iguales = Q()
+        for (nombre, descendente), valor in zip(self.ordering, valores):
+            mayor = descendente == reverso
+            filtro |= iguales & Q(**{f'{nombre}__{"gt" if mayor else "lt"}': valor})
+            iguales &= Q(**{nombre: valor})
+        # Cota sobre la primera columna para que el índice se recorra por rango
+        nombre, descendente = self.ordering[0]
+        cota = Q(**{f'{nombre}__{"gte" if descendente == reverso else "lte"}': valores[0]})
+        return cota & filtro
+
+    # ===== PAGINACIÓN =====
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.queryset = queryset
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        valores, reverso = self.decode_cursor(request)
+
+        orden = [
+            f'{"-" if descendente != reverso else ""}{nombre}'
+            for nombre, descendente in self.ordering
+        ]
+        queryset = queryset.order_by(*orden)
+        if valores is not None:
+            queryset = queryset.filter(self._filtro_posterior(valores, reverso))
+
+        filas = list(queryset[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if reverso:
+            filas.reverse()
+
+        self.next_values = self.previous_values = None
+        if filas:
+            primera = [getattr(filas[0], nombre) for nombre, _ in self.ordering]
+            ultima = [getattr(filas[-1], nombre) for nombre, _ in self.ordering]
+            if (hay_mas and not reverso) or (reverso and valores is not None):
+                self.next_values = ultima
+            if (hay_mas and reverso) or (not reverso and valores is not None):
+                self.previous_values = primera
+        return filas
+
+    def get_next_link(self):
+        if self.next_values is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_values, False)
+        )
+
+    def get_previous_link(self):
+        if self.previous_values is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.previous_values, True)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        parametros = [{
+            'name': self.cursor_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Cursor de la página (tomado de next/previous)',
+            'schema': {'type': 'string'},
+        }]
+        if settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE'):
+            parametros.append({
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Número de resultados por página',
+                'schema': {'type': 'integer'},
+            })
+        return parametros
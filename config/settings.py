@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'drf_spectacular',
     'django_filters',
+    'busqueda',
     'fincas',
     'tarea',
     'insumos',
@@ -96,6 +97,19 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Con varios procesos (gunicorn) usar una caché compartida, por ejemplo Redis,
+# para que todos vean las mismas versiones de datos (config/versiones.py)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -139,6 +153,11 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Paginación por cursor sobre el ordenamiento de cada modelo (config/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('PAGE_SIZE', '50')),
+    # Opcional: permite ?page_size= hasta este máximo. Sin definir, el tamaño es fijo.
+    'MAX_PAGE_SIZE': int(os.getenv('MAX_PAGE_SIZE', '0')) or None,
 }
 
 SPECTACULAR_SETTINGS = {
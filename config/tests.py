@@ -0,0 +1,143 @@
+import base64
+import csv
+import io
+import json
+
+from django.http import StreamingHttpResponse
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from fincas.models import Finca, Lote
+from insumos.models import Insumo, Movimiento
+
+from .exportacion import iterar_filas
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.KeysetPagination',
+    'PAGE_SIZE': 7,
+    'MAX_PAGE_SIZE': 20,
+}
+
+
+@override_settings(REST_FRAMEWORK=REST_FRAMEWORK)
+class KeysetPaginationTests(APITestCase):
+    url = '/api/lotes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        finca = Finca.objects.create(
+            nombre='Finca Test', ubicacion='Vereda', area_total=100,
+            latitud=4.6, longitud=-74.1, propietario='Propietario'
+        )
+        estados = ['sembrado', 'cosecha', 'sembrado', 'barbecho', 'sembrado']
+        # 40 lotes con solo 3 estados distintos: el ordenamiento tiene muchos empates
+        Lote.objects.bulk_create([
+            Lote(finca=finca, codigo=f'L-{i:02}', nombre=f'Lote {i}', area=1,
+                 estado=estados[i % len(estados)])
+            for i in range(40)
+        ])
+
+    def recorrer(self, url, enlace):
+        """Sigue los enlaces `enlace` desde `url`; retorna los ids de cada página"""
+        paginas = []
+        while url:
+            datos = self.client.get(url).json()
+            paginas.append([lote['id'] for lote in datos['results']])
+            url = datos[enlace]
+        return paginas
+
+    def test_recorrido_con_empates_sin_duplicados_ni_huecos(self):
+        for ordering, orden in [('estado', ['estado', 'id']), ('-estado', ['-estado', 'id'])]:
+            with self.subTest(ordering=ordering):
+                esperados = list(Lote.objects.order_by(*orden).values_list('id', flat=True))
+                paginas = self.recorrer(f'{self.url}?ordering={ordering}', 'next')
+                self.assertEqual([len(p) for p in paginas], [7] * 5 + [5])
+                self.assertEqual([i for pagina in paginas for i in pagina], esperados)
+
+                # Hacia atrás desde la última página, con los enlaces previous
+                ultima = self.client.get(f'{self.url}?ordering={ordering}')
+                while ultima.json()['next']:
+                    ultima = self.client.get(ultima.json()['next'])
+                atras = self.recorrer(ultima.json()['previous'], 'previous')
+                self.assertEqual(atras, paginas[-2::-1])
+
+    def cursor(self, datos):
+        return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+
+    def test_cursor_invalido_es_400(self):
+        for cursor in [
+            'no-es-base64!', base64.urlsafe_b64encode(b'{').decode(),
+            self.cursor([1, 2]), self.cursor({'x': 1}), self.cursor({'v': 5}),
+            self.cursor({'v': ['sembrado']}), self.cursor({'v': ['sembrado', 'abc']}),
+            self.cursor({'v': [None, 3]}), self.cursor({'v': ['sembrado', 10 ** 30]}),
+        ]:
+            with self.subTest(cursor=cursor):
+                respuesta = self.client.get(self.url, {'ordering': 'estado', 'cursor': cursor})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('cursor', respuesta.json())
+
+    def test_page_size_limitado_al_maximo(self):
+        for page_size, esperado in [(3, 3), (20, 20), (500, 20), (0, 7), ('x', 7)]:
+            with self.subTest(page_size=page_size):
+                respuesta = self.client.get(self.url, {'page_size': page_size})
+                self.assertEqual(len(respuesta.json()['results']), esperado)
+
+
+class ExportacionTests(APITestCase):
+    url = '/api/inventario/movimientos/exportar/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.insumo = Insumo.objects.create(
+            codigo='E-1', nombre='Urea', categoria='fertilizante',
+            stock_actual=0, stock_minimo=0, precio_unitario=1
+        )
+        cls.descripciones = [
+            'Compra', 'Con, coma', 'Con "comillas"', 'Dos\nlíneas', 'Ñandú; ¿acentos?', '',
+        ]
+        Movimiento.objects.bulk_create([
+            Movimiento(insumo=cls.insumo, tipo='entrada' if i % 3 else 'salida',
+                       cantidad=i + 1, descripcion=cls.descripciones[i % 6], responsable='r')
+            for i in range(12)
+        ])
+
+    def contenido(self, respuesta):
+        return b''.join(respuesta.streaming_content).decode()
+
+    def test_respuesta_en_streaming_con_filtros(self):
+        respuesta = self.client.get(self.url, {'tipo': 'entrada'})
+        self.assertIsInstance(respuesta, StreamingHttpResponse)
+        self.assertEqual(respuesta['Content-Type'], 'application/x-ndjson')
+        self.assertIn('movimientos.ndjson', respuesta['Content-Disposition'])
+        filas = [json.loads(linea) for linea in self.contenido(respuesta).splitlines()]
+        esperados = list(
+            Movimiento.objects.filter(tipo='entrada').order_by('pk').values_list('pk', flat=True)
+        )
+        self.assertEqual([f['id'] for f in filas], esperados)
+        self.assertEqual({f['tipo'] for f in filas}, {'entrada'})
+
+        respuesta = self.client.get(self.url, {'formato': 'xml'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_csv_escapa_separadores_comillas_y_saltos(self):
+        respuesta = self.client.get(self.url, {'formato': 'csv'})
+        self.assertIsInstance(respuesta, StreamingHttpResponse)
+        filas = list(csv.reader(io.StringIO(self.contenido(respuesta), newline='')))
+        encabezado, filas = filas[0], filas[1:]
+        self.assertEqual(encabezado[0], 'id')
+        columna = encabezado.index('descripcion')
+        self.assertEqual(len(filas), 12)
+        self.assertEqual([f[columna] for f in filas], self.descripciones * 2)
+
+    def test_bloques_por_pk_sin_saltos_ni_duplicados(self):
+        # Huecos en las claves y un ordenamiento distinto en el queryset
+        huecos = list(Movimiento.objects.order_by('pk').values_list('pk', flat=True)[2:5])
+        Movimiento.objects.filter(pk__in=huecos).delete()
+        queryset = Movimiento.objects.order_by('-cantidad')
+        esperados = list(Movimiento.objects.order_by('pk').values_list('pk', flat=True))
+        for tamano in (1, 3, 4, 9, 50):
+            with self.subTest(tamano=tamano):
+                # Una consulta por bloque lleno y una más que termina el recorrido
+                with self.assertNumQueries(len(esperados) // tamano + 1):
+                    filas = list(iterar_filas(queryset, ['id', 'tipo'], tamano_bloque=tamano))
+                self.assertEqual([pk for pk, _ in filas], esperados)
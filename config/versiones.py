@@ -0,0 +1,38 @@
+"""
+Versiones de datos guardadas en la caché de Django.
+
+Cada conjunto de datos (por ejemplo 'lotes') tiene un número de versión que se
+incrementa cuando sus filas cambian. Los resultados precalculados se guardan
+con la versión en la clave, así que un cambio los invalida sin borrarlos uno a uno.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _clave(nombre):
+    return f'version-datos:{nombre}'
+
+
+def version_datos(nombre):
+    """Retorna la versión actual del conjunto de datos `nombre`"""
+    clave = _clave(nombre)
+    version = cache.get(clave)
+    if version is None:
+        # Se parte de un valor basado en el reloj para no repetir versiones
+        # anteriores si la caché se vació
+        cache.add(clave, time.time_ns(), timeout=None)
+        version = cache.get(clave)
+    return version
+
+
+def incrementar_version(nombre):
+    """Incrementa la versión cuando la transacción actual se confirma"""
+    def incrementar():
+        try:
+            cache.incr(_clave(nombre))
+        except ValueError:
+            version_datos(nombre)
+
+    transaction.on_commit(incrementar)
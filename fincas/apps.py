@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class FincasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fincas'
+    
+    def ready(self):
+        from busqueda.indice import registrar
+        from . import signals  # noqa: F401
+        from .models import Finca, Lote
+        
+        registrar(Finca, ['nombre', 'propietario', 'ubicacion'])
+        registrar(Lote, ['nombre', 'codigo', 'cultivo_actual', 'finca__nombre'])
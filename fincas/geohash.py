@@ -0,0 +1,91 @@
+"""
+Codificación geohash y búsqueda por celdas vecinas.
+
+Un geohash divide el mapa en celdas cada vez más pequeñas: todos los puntos de
+una celda comparten el mismo prefijo, de modo que la búsqueda de las celdas
+cercanas se resuelve con consultas `geohash LIKE 'prefijo%'` sobre un índice.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION_MAXIMA = 12
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+
+
+def codificar(lat, lng, precision=PRECISION_MAXIMA):
+    """Retorna el geohash del punto con el número de caracteres indicado"""
+    rango_lat = [-90.0, 90.0]
+    rango_lng = [-180.0, 180.0]
+    resultado = []
+    bits = 0
+    valor = 0
+    par = True
+    while len(resultado) < precision:
+        rango, coordenada = (rango_lng, lng) if par else (rango_lat, lat)
+        medio = (rango[0] + rango[1]) / 2
+        valor <<= 1
+        if coordenada >= medio:
+            valor |= 1
+            rango[0] = medio
+        else:
+            rango[1] = medio
+        par = not par
+        bits += 1
+        if bits == 5:
+            resultado.append(BASE32[valor])
+            bits = 0
+            valor = 0
+    return ''.join(resultado)
+
+
+def tamano_celda(precision):
+    """Retorna (alto, ancho) en grados de una celda con esa precisión"""
+    bits = 5 * precision
+    bits_lng = math.ceil(bits / 2)
+    bits_lat = bits // 2
+    return 180.0 / (2 ** bits_lat), 360.0 / (2 ** bits_lng)
+
+
+def distancia_km(lat1, lng1, lat2, lng2):
+    """Distancia haversine entre dos puntos en kilómetros"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+def precision_para_radio(lat, radio_km):
+    """
+    Retorna la mayor precisión cuyas celdas miden al menos `radio_km` de alto y
+    de ancho alrededor de la latitud dada, o 0 si ninguna alcanza o si el
+    círculo contiene un polo.
+
+    Con celdas de ese tamaño, el círculo de búsqueda queda dentro de la celda del
+    centro y sus 8 vecinas.
+    """
+    lat_extrema = abs(lat) + radio_km / KM_POR_GRADO
+    if lat_extrema >= 90:
+        # El círculo cruza el polo y alcanza cualquier longitud
+        return 0
+    lat_extrema = min(lat_extrema, 89.9)
+    km_por_grado_lng = KM_POR_GRADO * math.cos(math.radians(lat_extrema))
+    for precision in range(PRECISION_MAXIMA, 0, -1):
+        alto, ancho = tamano_celda(precision)
+        if alto * KM_POR_GRADO >= radio_km and ancho * km_por_grado_lng >= radio_km:
+            return precision
+    return 0
+
+
+def celdas_vecinas(lat, lng, precision):
+    """Retorna el geohash de la celda del punto y de sus 8 vecinas"""
+    alto, ancho = tamano_celda(precision)
+    celdas = set()
+    for d_lat in (-alto, 0, alto):
+        vecino_lat = lat + d_lat
+        if not -90 <= vecino_lat <= 90:
+            continue
+        for d_lng in (-ancho, 0, ancho):
+            vecino_lng = (lng + d_lng + 180) % 360 - 180
+            celdas.add(codificar(vecino_lat, vecino_lng, precision))
+    return sorted(celdas)
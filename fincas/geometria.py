@@ -0,0 +1,198 @@
+"""
+Utilidades geométricas para los polígonos de los lotes.
+
+Los vértices se manejan como tuplas (latitud, longitud) en grados.
+"""
+import json
+
+# Tolerancias de simplificación (grados) de cada nivel de detalle
+NIVELES_DETALLE = {
+    'alto': 0.00001,  # ~1 m
+    'medio': 0.0001,  # ~11 m
+    'bajo': 0.001,    # ~110 m
+}
+
+
+def _vertice(punto):
+    """Convierte un punto en formato [lat, lng] o {"lat": .., "lng": ..} a tupla"""
+    if isinstance(punto, dict):
+        lat = punto.get('lat', punto.get('latitud'))
+        lng = punto.get('lng', punto.get('lon', punto.get('longitud')))
+    elif isinstance(punto, (list, tuple)) and len(punto) >= 2:
+        lat, lng = punto[0], punto[1]
+    else:
+        raise ValueError('Cada vértice debe ser [lat, lng] o {"lat": .., "lng": ..}')
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        raise ValueError('Las coordenadas deben ser numéricas')
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('Coordenadas fuera de rango')
+    return lat, lng
+
+
+def parsear_poligono(texto):
+    """
+    Convierte el JSON de `Lote.coordenadas_poligono` en una lista de vértices.
+
+    Acepta una lista de puntos [lat, lng] o {"lat", "lng"}, o un polígono
+    GeoJSON (que usa el orden [lng, lat]). Retorna None si el texto está vacío
+    y lanza ValueError si el polígono no es válido.
+    """
+    if texto is None or not str(texto).strip():
+        return None
+    try:
+        datos = json.loads(texto) if isinstance(texto, str) else texto
+    except json.JSONDecodeError:
+        raise ValueError('El polígono no es un JSON válido')
+
+    if isinstance(datos, dict) and datos.get('type') == 'Feature':
+        datos = datos.get('geometry') or {}
+    if isinstance(datos, dict):
+        if datos.get('type') != 'Polygon' or not datos.get('coordinates'):
+            raise ValueError('Solo se admiten geometrías GeoJSON de tipo Polygon')
+        # GeoJSON: anillo exterior en orden [lng, lat]
+        vertices = [_vertice((p[1], p[0])) for p in datos['coordinates'][0]]
+    elif isinstance(datos, list):
+        vertices = [_vertice(p) for p in datos]
+    else:
+        raise ValueError('Formato de polígono no reconocido')
+
+    if len(vertices) > 1 and vertices[0] == vertices[-1]:
+        vertices = vertices[:-1]
+    if len(vertices) < 3:
+        raise ValueError('El polígono debe tener al menos 3 vértices')
+    return vertices
+
+
+def caja(vertices):
+    """Retorna la caja envolvente (min_lat, min_lng, max_lat, max_lng)"""
+    lats = [v[0] for v in vertices]
+    lngs = [v[1] for v in vertices]
+    return min(lats), min(lngs), max(lats), max(lngs)
+
+
+def cajas_intersectan(a, b):
+    """Indica si dos cajas (min_lat, min_lng, max_lat, max_lng) se tocan"""
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def contiene_punto(vertices, lat, lng):
+    """Prueba de punto en polígono por el método del rayo"""
+    dentro = False
+    j = len(vertices) - 1
+    for i in range(len(vertices)):
+        lat_i, lng_i = vertices[i]
+        lat_j, lng_j = vertices[j]
+        if (lng_i > lng) != (lng_j > lng):
+            lat_cruce = lat_i + (lng - lng_i) * (lat_j - lat_i) / (lng_j - lng_i)
+            if lat < lat_cruce:
+                dentro = not dentro
+        j = i
+    return dentro
+
+
+def _orientacion(p, q, r):
+    valor = (q[1] - p[1]) * (r[0] - q[0]) - (q[0] - p[0]) * (r[1] - q[1])
+    if valor == 0:
+        return 0
+    return 1 if valor > 0 else 2
+
+
+def _en_segmento(p, q, r):
+    return (min(p[0], r[0]) <= q[0] <= max(p[0], r[0])
+            and min(p[1], r[1]) <= q[1] <= max(p[1], r[1]))
+
+
+def segmentos_intersectan(p1, q1, p2, q2):
+    """Indica si los segmentos p1-q1 y p2-q2 se cruzan o se tocan"""
+    o1 = _orientacion(p1, q1, p2)
+    o2 = _orientacion(p1, q1, q2)
+    o3 = _orientacion(p2, q2, p1)
+    o4 = _orientacion(p2, q2, q1)
+    if o1 != o2 and o3 != o4:
+        return True
+    return ((o1 == 0 and _en_segmento(p1, p2, q1))
+            or (o2 == 0 and _en_segmento(p1, q2, q1))
+            or (o3 == 0 and _en_segmento(p2, p1, q2))
+            or (o4 == 0 and _en_segmento(p2, q1, q2)))
+
+
+def poligono_intersecta_caja(vertices, caja_consulta):
+    """Prueba exacta de intersección entre un polígono y una caja"""
+    min_lat, min_lng, max_lat, max_lng = caja_consulta
+    if not cajas_intersectan(caja(vertices), caja_consulta):
+        return False
+    # Algún vértice dentro de la caja
+    for lat, lng in vertices:
+        if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng:
+            return True
+    # La caja completamente dentro del polígono
+    if contiene_punto(vertices, min_lat, min_lng):
+        return True
+    # Cruce entre algún borde del polígono y algún borde de la caja
+    esquinas = [(min_lat, min_lng), (min_lat, max_lng), (max_lat, max_lng), (max_lat, min_lng)]
+    bordes_caja = list(zip(esquinas, esquinas[1:] + esquinas[:1]))
+    for a, b in zip(vertices, vertices[1:] + vertices[:1]):
+        for c, d in bordes_caja:
+            if segmentos_intersectan(a, b, c, d):
+                return True
+    return False
+
+
+def _distancia_segmento(punto, a, b):
+    """Distancia (en grados) del punto al segmento a-b"""
+    d_lat, d_lng = b[0] - a[0], b[1] - a[1]
+    largo = d_lat * d_lat + d_lng * d_lng
+    if largo == 0:
+        t = 0.0
+    else:
+        t = ((punto[0] - a[0]) * d_lat + (punto[1] - a[1]) * d_lng) / largo
+        t = max(0.0, min(1.0, t))
+    cerca_lat, cerca_lng = a[0] + t * d_lat, a[1] + t * d_lng
+    return ((punto[0] - cerca_lat) ** 2 + (punto[1] - cerca_lng) ** 2) ** 0.5
+
+
+def _simplificar_cadena(puntos, tolerancia):
+    """Douglas-Peucker iterativo sobre una cadena abierta; conserva los extremos"""
+    conservar = [False] * len(puntos)
+    conservar[0] = conservar[-1] = True
+    pendientes = [(0, len(puntos) - 1)]
+    while pendientes:
+        inicio, fin = pendientes.pop()
+        maxima, indice = 0.0, None
+        for i in range(inicio + 1, fin):
+            distancia = _distancia_segmento(puntos[i], puntos[inicio], puntos[fin])
+            if distancia > maxima:
+                maxima, indice = distancia, i
+        if indice is not None and maxima > tolerancia:
+            conservar[indice] = True
+            pendientes.append((inicio, indice))
+            pendientes.append((indice, fin))
+    return [p for p, mantener in zip(puntos, conservar) if mantener]
+
+
+def simplificar(vertices, tolerancia):
+    """
+    Simplifica un polígono cerrado con Douglas-Peucker descartando los vértices
+    que se apartan menos de `tolerancia` grados del contorno. Siempre conserva
+    al menos 3 vértices.
+    """
+    if len(vertices) <= 3:
+        return list(vertices)
+    # El anillo se parte en el primer vértice y el más lejano a él
+    opuesto = max(
+        range(1, len(vertices)),
+        key=lambda i: (vertices[i][0] - vertices[0][0]) ** 2 + (vertices[i][1] - vertices[0][1]) ** 2,
+    )
+    ida = _simplificar_cadena(vertices[:opuesto + 1], tolerancia)
+    vuelta = _simplificar_cadena(vertices[opuesto:] + vertices[:1], tolerancia)
+    resultado = ida + vuelta[1:-1]
+    if len(resultado) < 3:
+        # Polígono casi degenerado: se agrega el vértice más alejado del eje
+        tercero = max(
+            (v for v in vertices if v not in resultado),
+            key=lambda v: _distancia_segmento(v, vertices[0], vertices[opuesto]),
+        )
+        resultado = sorted(resultado + [tercero], key=vertices.index)
+    return resultado
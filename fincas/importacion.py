@@ -0,0 +1,213 @@
+"""
+Importación masiva de lotes.
+
+Las filas se validan con una sola instancia de LoteImportacionSerializer (las
+reglas de LoteSerializer, sin consultas); luego los códigos y las fincas referenciadas se verifican con
+pocas consultas por conjuntos, y los lotes válidos se escriben con
+bulk_create/bulk_update por bloques dentro de una sola transacción. Si otra
+petición crea un código entre la verificación y la escritura, la fila se reporta
+como error y se reintenta con las demás. Como bulk_create no ejecuta save() ni señales, al final se
+recalculan los resúmenes de las fincas afectadas, el índice de búsqueda y la
+versión del índice espacial.
+"""
+import csv
+import io
+import json
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from busqueda.indice import reindexar
+from config.versiones import incrementar_version
+
+from .indice_espacial import VERSION_DATOS as VERSION_GEOMETRIA
+from .models import Finca, Lote, ResumenFinca
+from .serializers import LoteImportacionSerializer
+from .tablero import VERSION_LOTES
+
+CAMPOS = [
+    'finca', 'codigo', 'nombre', 'area', 'cultivo_actual', 'fecha_siembra',
+    'estado', 'coordenadas_poligono', 'observaciones',
+]
+# Valores de los campos opcionales omitidos en la fila
+DEFECTOS = {
+    'cultivo_actual': '',
+    'fecha_siembra': None,
+    'estado': Lote._meta.get_field('estado').default,
+    'coordenadas_poligono': '',
+    'observaciones': '',
+}
+TAMANO_BLOQUE = 1000
+CODIGO_EXISTENTE = 'Ya existe un lote con este código.'
+
+
+def leer_archivo(archivo, formato):
+    """Lee las filas de un archivo CSV (con encabezados) o JSON (lista de objetos)"""
+    contenido = archivo.read()
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8-sig')
+    if formato == 'csv':
+        return list(csv.DictReader(io.StringIO(contenido)))
+    datos = json.loads(contenido)
+    if isinstance(datos, dict):
+        datos = datos.get('lotes', [])
+    return datos
+
+
+def validar_fila(fila, serializer=None):
+    """
+    Valida una fila con LoteImportacionSerializer, sin consultar la base de
+    datos. Retorna (datos, errores) con los valores convertidos y los errores
+    por campo.
+
+    Construir los campos de un ModelSerializer es lo más costoso de validar una
+    fila, así que importar_lotes crea un solo `serializer` y lo reutiliza para
+    todas las filas.
+    """
+    if not isinstance(fila, dict):
+        return None, {'fila': ['Cada fila debe ser un objeto.']}
+    # Las celdas vacías del CSV equivalen a campos omitidos (toman su valor por defecto)
+    fila = {campo: valor for campo, valor in fila.items() if valor not in (None, '')}
+    poligono = fila.get('coordenadas_poligono')
+    if poligono is not None and not isinstance(poligono, str):
+        fila['coordenadas_poligono'] = json.dumps(poligono)
+
+    serializer = serializer or LoteImportacionSerializer()
+    try:
+        datos = dict(serializer.run_validation(fila))
+    except serializers.ValidationError as error:
+        errores = {
+            campo: [str(detalle) for detalle in lista] for campo, lista in error.detail.items()
+        }
+        return {'codigo': str(fila.get('codigo', '')).strip()}, errores
+    for campo, valor in DEFECTOS.items():
+        datos.setdefault(campo, valor)
+    return datos, {}
+
+
+def _construir_lote(datos, lote=None):
+    lote = lote or Lote()
+    for campo in ('finca_id', 'codigo', 'nombre', 'area', 'cultivo_actual',
+                  'fecha_siembra', 'estado', 'coordenadas_poligono', 'observaciones'):
+        setattr(lote, campo, datos[campo])
+    return lote
+
+
+def _en_bloques(valores, tamano=TAMANO_BLOQUE):
+    valores = list(valores)
+    for inicio in range(0, len(valores), tamano):
+        yield valores[inicio:inicio + tamano]
+
+
+def importar_lotes(filas, actualizar=False, parcial=False, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Crea (o con `actualizar=True`, crea o actualiza por código) los lotes de
+    `filas`. Si alguna fila tiene errores no se escribe nada, salvo que
+    `parcial=True`, en cuyo caso se escriben las filas válidas.
+
+    Retorna {'creados', 'actualizados', 'errores': [{'fila', 'codigo', 'errores'}]}.
+    """
+    validas = []
+    errores = []
+    vistos = set()
+    serializer = LoteImportacionSerializer()
+    for numero, fila in enumerate(filas, start=1):
+        datos, errores_fila = validar_fila(fila, serializer)
+        if datos and datos['codigo']:
+            if datos['codigo'] in vistos:
+                errores_fila['codigo'] = ['Código repetido en el archivo.']
+            vistos.add(datos['codigo'])
+        if errores_fila:
+            errores.append({
+                'fila': numero,
+                'codigo': datos['codigo'] if datos else None,
+                'errores': errores_fila,
+            })
+        else:
+            validas.append((numero, datos))
+
+    # Fincas y códigos existentes con consultas por conjuntos
+    finca_ids = {datos['finca_id'] for _, datos in validas}
+    fincas_existentes = set()
+    for bloque in _en_bloques(finca_ids, tamano_bloque):
+        fincas_existentes.update(Finca.objects.filter(pk__in=bloque).values_list('pk', flat=True))
+    existentes = _lotes_existentes((datos['codigo'] for _, datos in validas), tamano_bloque)
+
+    nuevos = []
+    modificados = []
+    fincas_afectadas = set()
+    for numero, datos in validas:
+        errores_fila = {}
+        if datos['finca_id'] not in fincas_existentes:
+            errores_fila['finca'] = [f'La finca {datos["finca_id"]} no existe.']
+        if datos['codigo'] in existentes and not actualizar:
+            errores_fila['codigo'] = [CODIGO_EXISTENTE]
+        if errores_fila:
+            errores.append({'fila': numero, 'codigo': datos['codigo'], 'errores': errores_fila})
+            continue
+
+        fincas_afectadas.add(datos['finca_id'])
+        if datos['codigo'] in existentes:
+            lote = existentes[datos['codigo']]
+            fincas_afectadas.add(lote.finca_id)
+            modificados.append(_construir_lote(datos, lote))
+        else:
+            nuevos.append((numero, _construir_lote(datos)))
+
+    while True:
+        errores.sort(key=lambda error: error['fila'])
+        if errores and not parcial:
+            return {'creados': 0, 'actualizados': 0, 'errores': errores}
+        try:
+            _escribir([lote for _, lote in nuevos], modificados, fincas_afectadas, tamano_bloque)
+            break
+        except IntegrityError:
+            # Otra petición creó alguno de los códigos después de la verificación
+            creados = _lotes_existentes((lote.codigo for _, lote in nuevos), tamano_bloque)
+            if not creados:
+                raise
+            errores.extend(
+                {'fila': numero, 'codigo': lote.codigo, 'errores': {'codigo': [CODIGO_EXISTENTE]}}
+                for numero, lote in nuevos if lote.codigo in creados
+            )
+            nuevos = [(numero, lote) for numero, lote in nuevos if lote.codigo not in creados]
+            for _, lote in nuevos:
+                lote.pk = None
+
+    return {'creados': len(nuevos), 'actualizados': len(modificados), 'errores': errores}
+
+
+def _lotes_existentes(codigos, tamano_bloque):
+    """Retorna {codigo: Lote} de los códigos que ya existen"""
+    existentes = {}
+    for bloque in _en_bloques(codigos, tamano_bloque):
+        existentes.update(
+            (lote.codigo, lote) for lote in Lote.objects.filter(codigo__in=bloque)
+        )
+    return existentes
+
+
+def _escribir(nuevos, modificados, fincas_afectadas, tamano_bloque):
+    ahora = timezone.now()
+    with transaction.atomic():
+        for lote in nuevos:
+            lote.fecha_creacion = lote.fecha_actualizacion = ahora
+        Lote.objects.bulk_create(nuevos, batch_size=tamano_bloque)
+
+        for lote in modificados:
+            lote.fecha_actualizacion = ahora
+        Lote.objects.bulk_update(
+            modificados,
+            ['finca', 'nombre', 'area', 'cultivo_actual', 'fecha_siembra', 'estado',
+             'observaciones', 'fecha_actualizacion', *Lote.CAMPOS_GEOMETRIA],
+            batch_size=tamano_bloque,
+        )
+
+        if nuevos or modificados:
+            ResumenFinca.reconciliar(fincas_afectadas)
+            codigos = [lote.codigo for lote in nuevos + modificados]
+            for bloque in _en_bloques(codigos, tamano_bloque):
+                reindexar(Lote, Lote.objects.filter(codigo__in=bloque))
+            incrementar_version(VERSION_GEOMETRIA)
+            incrementar_version(VERSION_LOTES)
@@ -0,0 +1,132 @@
+"""
+Índice espacial en memoria para los polígonos de los lotes.
+
+Divide el mapa en una grilla de celdas de TAMANO_CELDA grados y guarda en cada
+celda los lotes cuya caja envolvente la toca. Las consultas solo hacen la prueba
+exacta sobre los candidatos de las celdas consultadas. El índice se reconstruye
+de forma perezosa cuando cambia la versión de datos 'lotes-geometria'.
+
+La reconstrucción lee la caja guardada en las columnas min_/max_ y el polígono
+codificado como polilínea, sin parsear el JSON de coordenadas; cada polígono se
+decodifica la primera vez que un lote es candidato de una consulta.
+"""
+import math
+import threading
+
+from config.versiones import version_datos
+
+from . import geometria, polilinea
+
+VERSION_DATOS = 'lotes-geometria'
+
+# 0.01° son aproximadamente 1.1 km en el ecuador
+TAMANO_CELDA = 0.01
+
+# Lotes cuya caja cubre más celdas que esto se revisan en todas las consultas
+MAX_CELDAS_POR_LOTE = 400
+
+# Consultas por caja que cubren más celdas que esto recorren los lotes directamente
+MAX_CELDAS_POR_CONSULTA = 10000
+
+
+def _celda(valor):
+    return math.floor(valor / TAMANO_CELDA)
+
+
+def _celdas_en_caja(min_lat, min_lng, max_lat, max_lng):
+    for i in range(_celda(min_lat), _celda(max_lat) + 1):
+        for j in range(_celda(min_lng), _celda(max_lng) + 1):
+            yield i, j
+
+
+def _numero_celdas(min_lat, min_lng, max_lat, max_lng):
+    return ((_celda(max_lat) - _celda(min_lat) + 1)
+            * (_celda(max_lng) - _celda(min_lng) + 1))
+
+
+class IndiceEspacial:
+    """Grilla uniforme de cajas envolventes con los polígonos codificados"""
+
+    def __init__(self, version=None):
+        self.version = version
+        self.celdas = {}
+        self.grandes = []
+        self.lotes = {}
+        self._vertices = {}
+
+    @classmethod
+    def construir(cls, filas, version=None):
+        """
+        Construye el índice desde filas
+        (id, min_lat, min_lng, max_lat, max_lng, poligono_codificado)
+        """
+        indice = cls(version)
+        for lote_id, *caja, codificado in filas:
+            if codificado:
+                indice.agregar(lote_id, tuple(caja), codificado)
+        return indice
+
+    def agregar(self, lote_id, caja, codificado):
+        self.lotes[lote_id] = (caja, codificado)
+        if _numero_celdas(*caja) > MAX_CELDAS_POR_LOTE:
+            self.grandes.append(lote_id)
+            return
+        for celda in _celdas_en_caja(*caja):
+            self.celdas.setdefault(celda, []).append(lote_id)
+
+    def vertices(self, lote_id):
+        """Retorna los vértices del lote, decodificados una sola vez"""
+        vertices = self._vertices.get(lote_id)
+        if vertices is None:
+            vertices = self._vertices[lote_id] = polilinea.decodificar(self.lotes[lote_id][1])
+        return vertices
+
+    def _candidatos(self, caja_consulta):
+        if _numero_celdas(*caja_consulta) > MAX_CELDAS_POR_CONSULTA:
+            return set(self.lotes)
+        candidatos = set(self.grandes)
+        for celda in _celdas_en_caja(*caja_consulta):
+            candidatos.update(self.celdas.get(celda, ()))
+        return candidatos
+
+    def lotes_en_punto(self, lat, lng):
+        """Retorna los ids de los lotes cuyo polígono contiene el punto"""
+        resultado = []
+        for lote_id in self._candidatos((lat, lng, lat, lng)):
+            caja = self.lotes[lote_id][0]
+            if (caja[0] <= lat <= caja[2] and caja[1] <= lng <= caja[3]
+                    and geometria.contiene_punto(self.vertices(lote_id), lat, lng)):
+                resultado.append(lote_id)
+        return resultado
+
+    def lotes_en_caja(self, min_lat, min_lng, max_lat, max_lng):
+        """Retorna los ids de los lotes cuyo polígono intersecta la caja"""
+        caja_consulta = (min_lat, min_lng, max_lat, max_lng)
+        return [
+            lote_id for lote_id in self._candidatos(caja_consulta)
+            if geometria.poligono_intersecta_caja(self.vertices(lote_id), caja_consulta)
+        ]
+
+
+_indice = None
+_bloqueo = threading.Lock()
+
+
+def obtener_indice():
+    """Retorna el índice vigente, reconstruyéndolo si los lotes cambiaron"""
+    global _indice
+    version = version_datos(VERSION_DATOS)
+    if _indice is not None and _indice.version == version:
+        return _indice
+    with _bloqueo:
+        if _indice is None or _indice.version != version:
+            from .models import Lote
+            filas = (
+                Lote.objects.filter(min_lat__isnull=False)
+                .values_list(
+                    'id', 'min_lat', 'min_lng', 'max_lat', 'max_lng', 'poligono_codificado'
+                )
+                .iterator(chunk_size=2000)
+            )
+            _indice = IndiceEspacial.construir(filas, version)
+    return _indice
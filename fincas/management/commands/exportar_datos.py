@@ -0,0 +1,57 @@
+import sys
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from config.exportacion import FORMATOS, campos_exportables, generar_lineas
+
+# Datos exportables: nombre -> (modelo, FilterSet que se aplica con --filtro)
+EXPORTABLES = {
+    'lotes': ('fincas.Lote', None),
+    'tareas': ('tarea.Tarea', None),
+    'movimientos': ('insumos.Movimiento', 'insumos.filters.MovimientoFilter'),
+    'consumos': ('insumos.Consumo', 'insumos.filters.ConsumoFilter'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Exporta lotes, tareas, movimientos o consumos en NDJSON o CSV con memoria constante'
+
+    def add_arguments(self, parser):
+        parser.add_argument('datos', choices=sorted(EXPORTABLES))
+        parser.add_argument('--formato', choices=sorted(FORMATOS), default='ndjson')
+        parser.add_argument('--salida', help='Archivo de salida. Por defecto, la salida estándar.')
+        parser.add_argument(
+            '--filtro', action='append', default=[], metavar='CAMPO=VALOR',
+            help='Filtro del FilterSet (ej. tipo=salida, fecha_after=2025-01-01). Se puede repetir.'
+        )
+        parser.add_argument('--bloque', type=int, default=2000, help='Filas leídas por consulta')
+
+    def handle(self, *args, **options):
+        etiqueta_modelo, ruta_filtro = EXPORTABLES[options['datos']]
+        modelo = apps.get_model(etiqueta_modelo)
+        queryset = modelo.objects.all()
+
+        filtros = {}
+        for filtro in options['filtro']:
+            campo, separador, valor = filtro.partition('=')
+            if not separador:
+                raise CommandError(f'Filtro inválido "{filtro}", use CAMPO=VALOR')
+            filtros[campo] = valor
+        if filtros:
+            if ruta_filtro is None:
+                raise CommandError(f'{options["datos"]} no admite filtros')
+            filterset = import_string(ruta_filtro)(filtros, queryset=queryset)
+            if not filterset.is_valid():
+                raise CommandError(f'Filtros inválidos: {dict(filterset.errors)}')
+            queryset = filterset.qs
+
+        lineas = generar_lineas(
+            queryset, campos_exportables(modelo), options['formato'], options['bloque']
+        )
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8', newline='') as archivo:
+                archivo.writelines(lineas)
+        else:
+            sys.stdout.writelines(lineas)
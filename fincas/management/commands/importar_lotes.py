@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from fincas.importacion import importar_lotes, leer_archivo
+
+
+class Command(BaseCommand):
+    help = 'Importa lotes desde un archivo CSV (con encabezados) o JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument(
+            '--actualizar', action='store_true',
+            help='Actualiza los lotes cuyo código ya existe'
+        )
+        parser.add_argument(
+            '--parcial', action='store_true',
+            help='Guarda las filas válidas aunque otras tengan errores'
+        )
+        parser.add_argument(
+            '--finca', type=int,
+            help='Finca asignada a las filas que no indican una'
+        )
+        parser.add_argument('--bloque', type=int, default=1000, help='Filas por bloque de escritura')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        formato = 'csv' if ruta.lower().endswith('.csv') else 'json'
+        try:
+            with open(ruta, encoding='utf-8-sig') as archivo:
+                filas = leer_archivo(archivo, formato)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'No se pudo leer {ruta}: {error}')
+
+        if options['finca'] is not None:
+            for fila in filas:
+                if isinstance(fila, dict) and not fila.get('finca'):
+                    fila['finca'] = options['finca']
+
+        resultado = importar_lotes(
+            filas,
+            actualizar=options['actualizar'],
+            parcial=options['parcial'],
+            tamano_bloque=options['bloque'],
+        )
+        for error in resultado['errores']:
+            self.stderr.write(f"Fila {error['fila']} ({error['codigo']}): {error['errores']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['creados']} lote(s) creado(s), "
+            f"{resultado['actualizados']} actualizado(s), "
+            f"{len(resultado['errores'])} fila(s) con errores"
+        ))
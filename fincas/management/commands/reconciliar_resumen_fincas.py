@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from config.versiones import incrementar_version
+from fincas.models import ResumenFinca
+from fincas.tablero import VERSION_LOTES
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los resúmenes de lotes por finca y corrige las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--finca', type=int, action='append', dest='fincas',
+            help='ID de finca a reconciliar (se puede repetir). Por defecto, todas.'
+        )
+        parser.add_argument(
+            '--bloque', type=int, default=500,
+            help='Número de fincas procesadas por transacción'
+        )
+
+    def handle(self, *args, **options):
+        corregidos = ResumenFinca.reconciliar(
+            finca_ids=options['fincas'],
+            tamano_bloque=options['bloque'],
+        )
+        if corregidos:
+            incrementar_version(VERSION_LOTES)
+        self.stdout.write(self.style.SUCCESS(f'{corregidos} resumen(es) corregido(s)'))
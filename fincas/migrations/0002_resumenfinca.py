@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_resumenes(apps, schema_editor):
+    """Calcula el resumen inicial de las fincas existentes"""
+    Finca = apps.get_model('fincas', 'Finca')
+    Lote = apps.get_model('fincas', 'Lote')
+    ResumenFinca = apps.get_model('fincas', 'ResumenFinca')
+
+    resumenes = {
+        finca_id: ResumenFinca(finca_id=finca_id)
+        for finca_id in Finca.objects.values_list('pk', flat=True)
+    }
+    agregados = (
+        Lote.objects.values('finca_id', 'estado')
+        .annotate(total=models.Count('id'), area=models.Sum('area'))
+        .order_by()
+    )
+    for fila in agregados:
+        resumen = resumenes[fila['finca_id']]
+        resumen.total_lotes += fila['total']
+        resumen.area_cultivada += fila['area'] or 0
+        setattr(resumen, f"lotes_{fila['estado']}", fila['total'])
+    ResumenFinca.objects.bulk_create(resumenes.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenFinca',
+            fields=[
+                ('finca', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='fincas.finca')),
+                ('total_lotes', models.PositiveIntegerField(default=0)),
+                ('area_cultivada', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('lotes_preparacion', models.PositiveIntegerField(default=0)),
+                ('lotes_sembrado', models.PositiveIntegerField(default=0)),
+                ('lotes_crecimiento', models.PositiveIntegerField(default=0)),
+                ('lotes_cosecha', models.PositiveIntegerField(default=0)),
+                ('lotes_barbecho', models.PositiveIntegerField(default=0)),
+                ('lotes_inactivo', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen de Finca',
+                'verbose_name_plural': 'Resúmenes de Fincas',
+            },
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+from fincas import geometria
+
+
+def calcular_cajas(apps, schema_editor):
+    """Calcula la caja envolvente de los polígonos existentes"""
+    Lote = apps.get_model('fincas', 'Lote')
+    actualizar = []
+    for lote in Lote.objects.exclude(coordenadas_poligono='').only('id', 'coordenadas_poligono'):
+        try:
+            vertices = geometria.parsear_poligono(lote.coordenadas_poligono)
+        except ValueError:
+            continue
+        if vertices:
+            lote.min_lat, lote.min_lng, lote.max_lat, lote.max_lng = geometria.caja(vertices)
+            actualizar.append(lote)
+    Lote.objects.bulk_update(
+        actualizar, ['min_lat', 'min_lng', 'max_lat', 'max_lng'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0002_resumenfinca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lote',
+            name='max_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='max_lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='min_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='min_lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['min_lat', 'max_lat'], name='fincas_lote_min_lat_602002_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['min_lng', 'max_lng'], name='fincas_lote_min_lng_e0964e_idx'),
+        ),
+        migrations.RunPython(calcular_cajas, migrations.RunPython.noop),
+    ]
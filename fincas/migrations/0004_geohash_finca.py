@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+from fincas import geohash
+
+
+def calcular_geohash(apps, schema_editor):
+    """Calcula la celda geohash de las fincas georreferenciadas"""
+    Finca = apps.get_model('fincas', 'Finca')
+    fincas = Finca.objects.filter(latitud__isnull=False, longitud__isnull=False)
+    actualizar = []
+    for finca in fincas.only('id', 'latitud', 'longitud'):
+        finca.geohash = geohash.codificar(float(finca.latitud), float(finca.longitud))
+        actualizar.append(finca)
+    Finca.objects.bulk_update(actualizar, ['geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0003_caja_poligono_lote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='finca',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, help_text='Celda geohash de latitud/longitud, calculada al guardar', max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='finca',
+            index=models.Index(fields=['activa', 'geohash'], name='fincas_finc_activa_64248e_idx'),
+        ),
+        migrations.RunPython(calcular_geohash, migrations.RunPython.noop),
+    ]
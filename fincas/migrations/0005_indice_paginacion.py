@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0004_geohash_finca'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['finca', 'codigo'], name='fincas_lote_finca_i_3558ae_idx'),
+        ),
+    ]
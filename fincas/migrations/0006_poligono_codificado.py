@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+from fincas import geometria, polilinea
+
+
+def codificar_poligonos(apps, schema_editor):
+    """Codifica los polígonos existentes y sus niveles de detalle"""
+    Lote = apps.get_model('fincas', 'Lote')
+    actualizar = []
+    for lote in Lote.objects.exclude(coordenadas_poligono='').only('id', 'coordenadas_poligono'):
+        try:
+            vertices = geometria.parsear_poligono(lote.coordenadas_poligono)
+        except ValueError:
+            continue
+        if vertices:
+            lote.poligono_codificado = polilinea.codificar(vertices)
+            lote.poligono_simplificado = {
+                nivel: polilinea.codificar(geometria.simplificar(vertices, tolerancia))
+                for nivel, tolerancia in geometria.NIVELES_DETALLE.items()
+            }
+            actualizar.append(lote)
+    Lote.objects.bulk_update(
+        actualizar, ['poligono_codificado', 'poligono_simplificado'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0005_indice_paginacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lote',
+            name='poligono_codificado',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='poligono_simplificado',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(codificar_poligonos, migrations.RunPython.noop),
+    ]
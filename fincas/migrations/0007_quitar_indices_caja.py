@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0006_poligono_codificado'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='lote',
+            name='fincas_lote_min_lat_602002_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='lote',
+            name='fincas_lote_min_lng_e0964e_idx',
+        ),
+    ]
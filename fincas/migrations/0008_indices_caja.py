@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0007_quitar_indices_caja'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['min_lat', 'max_lat'], name='fincas_lote_min_lat_602002_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['min_lng', 'max_lng'], name='fincas_lote_min_lng_e0964e_idx'),
+        ),
+    ]
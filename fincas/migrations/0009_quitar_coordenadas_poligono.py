@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:55
+
+import json
+
+from django.db import migrations
+
+from fincas import geometria, polilinea
+
+
+def codificar_pendientes(apps, schema_editor):
+    """Codifica los polígonos que aún no tienen polilínea antes de quitar el JSON"""
+    Lote = apps.get_model('fincas', 'Lote')
+    actualizar = []
+    pendientes = (
+        Lote.objects.filter(poligono_codificado='').exclude(coordenadas_poligono='')
+        .only('id', 'coordenadas_poligono')
+    )
+    for lote in pendientes:
+        try:
+            vertices = geometria.parsear_poligono(lote.coordenadas_poligono)
+        except ValueError:
+            continue
+        if vertices:
+            lote.min_lat, lote.min_lng, lote.max_lat, lote.max_lng = geometria.caja(vertices)
+            lote.poligono_codificado = polilinea.codificar(vertices)
+            lote.poligono_simplificado = {
+                nivel: polilinea.codificar(geometria.simplificar(vertices, tolerancia))
+                for nivel, tolerancia in geometria.NIVELES_DETALLE.items()
+            }
+            actualizar.append(lote)
+    Lote.objects.bulk_update(
+        actualizar,
+        ['min_lat', 'min_lng', 'max_lat', 'max_lng', 'poligono_codificado',
+         'poligono_simplificado'],
+        batch_size=500,
+    )
+
+
+def restaurar_json(apps, schema_editor):
+    """Vuelve a escribir el JSON de puntos [lat, lng] desde la polilínea"""
+    Lote = apps.get_model('fincas', 'Lote')
+    actualizar = []
+    for lote in Lote.objects.exclude(poligono_codificado='').only('id', 'poligono_codificado'):
+        vertices = polilinea.decodificar(lote.poligono_codificado)
+        lote.coordenadas_poligono = json.dumps([list(v) for v in vertices])
+        actualizar.append(lote)
+    Lote.objects.bulk_update(actualizar, ['coordenadas_poligono'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0008_indices_caja'),
+    ]
+
+    operations = [
+        migrations.RunPython(codificar_pendientes, restaurar_json),
+        migrations.RemoveField(
+            model_name='lote',
+            name='coordenadas_poligono',
+        ),
+    ]
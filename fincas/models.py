@@ -1,5 +1,60 @@
-from django.db import models
+import heapq
+import json
+import math
+
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
+from django.utils import timezone
+
+from . import geometria
+from . import geohash as gh
+from . import polilinea
+
+
+class FincaQuerySet(models.QuerySet):
+    """Consultas de fincas con los totales de lotes precalculados"""
+    
+    def con_resumen(self):
+        """Incluye el resumen de lotes (ResumenFinca) en la misma consulta"""
+        return self.select_related('resumen')
+    
+    def en_radio(self, lat, lng, radio_km, limite=None):
+        """
+        Retorna [(finca, distancia_km)] de las fincas a menos de `radio_km`,
+        ordenadas por distancia y como máximo `limite`. Solo lee las fincas de
+        las celdas geohash vecinas.
+        """
+        precision = gh.precision_para_radio(lat, radio_km)
+        candidatas = self.exclude(geohash='')
+        if precision:
+            filtro = models.Q()
+            for celda in gh.celdas_vecinas(lat, lng, precision):
+                filtro |= models.Q(geohash__startswith=celda)
+            candidatas = candidatas.filter(filtro)
+        
+        resultado = []
+        for finca in candidatas.iterator():
+            distancia = gh.distancia_km(
+                lat, lng, float(finca.latitud), float(finca.longitud)
+            )
+            if distancia <= radio_km:
+                resultado.append((finca, distancia))
+        if limite is not None:
+            return heapq.nsmallest(limite, resultado, key=lambda par: par[1])
+        resultado.sort(key=lambda par: par[1])
+        return resultado
+    
+    def mas_cercanas(self, lat, lng, k, radio_inicial_km=1.0):
+        """
+        Retorna [(finca, distancia_km)] de las k fincas más cercanas. Amplía el
+        radio de búsqueda hasta encontrar k fincas o cubrir todo el planeta.
+        """
+        radio = radio_inicial_km
+        while True:
+            resultado = self.en_radio(lat, lng, radio, limite=k)
+            if len(resultado) >= k or radio >= math.pi * gh.RADIO_TIERRA_KM:
+                return resultado
+            radio *= 4
 
 
 class Finca(models.Model):
@@ -27,18 +82,39 @@ class Finca(models.Model):
         blank=True,
         help_text="Longitud (georreferenciación)"
     )
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        editable=False,
+        help_text="Celda geohash de latitud/longitud, calculada al guardar"
+    )
     propietario = models.CharField(max_length=200)
     fecha_registro = models.DateField(auto_now_add=True)
     activa = models.BooleanField(default=True)
     
+    objects = FincaQuerySet.as_manager()
+    
     class Meta:
         ordering = ['nombre']
         verbose_name = 'Finca'
         verbose_name_plural = 'Fincas'
+        indexes = [
+            models.Index(fields=['activa', 'geohash']),
+        ]
     
     def __str__(self):
         return f"{self.nombre} - {self.area_total} ha"
     
+    def save(self, *args, **kwargs):
+        if self.latitud is not None and self.longitud is not None:
+            self.geohash = gh.codificar(float(self.latitud), float(self.longitud))
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitud', 'longitud'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+    
     def total_lotes(self):
         """Retorna el número total de lotes en la finca"""
         return self.lotes.count()
@@ -60,6 +136,13 @@ class Lote(models.Model):
         ('inactivo', 'Inactivo'),
     ]
     
+    # Tolerancia en grados de cada nivel de detalle del polígono simplificado
+    NIVELES_DETALLE = geometria.NIVELES_DETALLE
+    CAMPOS_GEOMETRIA = [
+        'min_lat', 'min_lng', 'max_lat', 'max_lng',
+        'poligono_codificado', 'poligono_simplificado',
+    ]
+    
     finca = models.ForeignKey(
         Finca, 
         on_delete=models.CASCADE, 
@@ -84,10 +167,15 @@ class Lote(models.Model):
         choices=ESTADO_CHOICES, 
         default='preparacion'
     )
-    coordenadas_poligono = models.TextField(
-        blank=True,
-        help_text="Coordenadas del polígono en formato JSON"
-    )
+    # Caja envolvente del polígono, calculada al asignar coordenadas_poligono
+    min_lat = models.FloatField(null=True, blank=True, editable=False)
+    min_lng = models.FloatField(null=True, blank=True, editable=False)
+    max_lat = models.FloatField(null=True, blank=True, editable=False)
+    max_lng = models.FloatField(null=True, blank=True, editable=False)
+    # Polígono en formato compacto (polilínea codificada), completo y por nivel de detalle.
+    # Es el único formato guardado: coordenadas_poligono se reconstruye desde aquí
+    poligono_codificado = models.TextField(blank=True, editable=False)
+    poligono_simplificado = models.JSONField(default=dict, blank=True, editable=False)
     observaciones = models.TextField(blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
@@ -96,6 +184,12 @@ class Lote(models.Model):
         ordering = ['finca', 'codigo']
         verbose_name = 'Lote'
         verbose_name_plural = 'Lotes'
+        indexes = [
+            models.Index(fields=['finca', 'codigo']),
+            # Filtros por rango de la caja envolvente en la base de datos
+            models.Index(fields=['min_lat', 'max_lat']),
+            models.Index(fields=['min_lng', 'max_lng']),
+        ]
     
     def __str__(self):
         return f"{self.codigo} - {self.finca.nombre}"
@@ -107,6 +201,169 @@ class Lote(models.Model):
             return (timezone.now().date() - self.fecha_siembra).days
         return None
     
+    @property
+    def coordenadas_poligono(self):
+        """Polígono como JSON de puntos [lat, lng], reconstruido desde la polilínea"""
+        if not self.poligono_codificado:
+            return ''
+        return json.dumps([list(v) for v in polilinea.decodificar(self.poligono_codificado)])
+    
+    @coordenadas_poligono.setter
+    def coordenadas_poligono(self, texto):
+        """Recibe el JSON del polígono (ver geometria.parsear_poligono) y lo codifica"""
+        try:
+            vertices = geometria.parsear_poligono(texto)
+        except ValueError:
+            vertices = None
+        self.actualizar_geometria(vertices)
+    
+    def actualizar_geometria(self, vertices):
+        """
+        Calcula la caja envolvente y las versiones codificadas del polígono
+        (vacías si no hay vértices).
+        """
+        if vertices:
+            self.min_lat, self.min_lng, self.max_lat, self.max_lng = geometria.caja(vertices)
+            self.poligono_codificado = polilinea.codificar(vertices)
+            self.poligono_simplificado = {
+                nivel: polilinea.codificar(geometria.simplificar(vertices, tolerancia))
+                for nivel, tolerancia in self.NIVELES_DETALLE.items()
+            }
+        else:
+            self.min_lat = self.min_lng = self.max_lat = self.max_lng = None
+            self.poligono_codificado = ''
+            self.poligono_simplificado = {}
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'coordenadas_poligono' in update_fields:
+            kwargs['update_fields'] = (
+                set(update_fields) - {'coordenadas_poligono'} | set(self.CAMPOS_GEOMETRIA)
+            )
+        # El resumen de la finca se actualiza en las señales dentro de la misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     def tareas_pendientes(self):
         """Retorna el número de tareas pendientes en este lote"""
-        return self.tareas.filter(estado='pendiente').count()
\ No newline at end of file
+        return self.tareas.filter(estado='pendiente').count()
+
+
+class ResumenFinca(models.Model):
+    """Totales de lotes por finca, mantenidos de forma incremental"""
+    
+    finca = models.OneToOneField(
+        Finca,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumen'
+    )
+    total_lotes = models.PositiveIntegerField(default=0)
+    area_cultivada = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Número de lotes por cada estado de Lote.ESTADO_CHOICES
+    lotes_preparacion = models.PositiveIntegerField(default=0)
+    lotes_sembrado = models.PositiveIntegerField(default=0)
+    lotes_crecimiento = models.PositiveIntegerField(default=0)
+    lotes_cosecha = models.PositiveIntegerField(default=0)
+    lotes_barbecho = models.PositiveIntegerField(default=0)
+    lotes_inactivo = models.PositiveIntegerField(default=0)
+    
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Resumen de Finca'
+        verbose_name_plural = 'Resúmenes de Fincas'
+    
+    def __str__(self):
+        return f"Resumen {self.finca_id}: {self.total_lotes} lotes"
+    
+    @staticmethod
+    def campo_estado(estado):
+        """Retorna el nombre de la columna que cuenta los lotes en un estado"""
+        return f'lotes_{estado}'
+    
+    def lotes_por_estado(self):
+        """Retorna un diccionario {estado: número de lotes}"""
+        return {
+            estado: getattr(self, self.campo_estado(estado))
+            for estado, _ in Lote.ESTADO_CHOICES
+        }
+    
+    @classmethod
+    def aplicar_lote(cls, finca_id, area, estado, signo):
+        """
+        Suma (signo=1) o resta (signo=-1) la contribución de un lote al resumen
+        de su finca. Retorna False si la finca todavía no tiene resumen.
+        """
+        campo = cls.campo_estado(estado)
+        actualizados = cls.objects.filter(finca_id=finca_id).update(**{
+            'total_lotes': cls._sumar('total_lotes', 1, signo),
+            'area_cultivada': cls._sumar('area_cultivada', area, signo),
+            campo: cls._sumar(campo, 1, signo),
+        })
+        return actualizados > 0
+    
+    @classmethod
+    def _sumar(cls, campo, cantidad, signo):
+        """
+        Expresión que suma o resta `cantidad` a `campo` sin bajar de cero: un
+        resumen desfasado se corrige con reconciliar() en lugar de fallar (las
+        columnas sin signo de MySQL no admiten un resultado negativo).
+        """
+        if signo > 0:
+            return models.F(campo) + cantidad
+        return models.Case(
+            models.When(**{f'{campo}__gte': cantidad}, then=models.F(campo) - cantidad),
+            default=models.Value(0),
+            output_field=cls._meta.get_field(campo),
+        )
+    
+    @classmethod
+    def reconciliar(cls, finca_ids=None, tamano_bloque=500):
+        """
+        Recalcula los resúmenes a partir de los lotes con consultas agrupadas
+        y corrige solo los que difieren. Retorna el número de resúmenes corregidos.
+        """
+        fincas = Finca.objects.order_by('pk')
+        if finca_ids is not None:
+            fincas = fincas.filter(pk__in=finca_ids)
+        ids = list(fincas.values_list('pk', flat=True))
+        
+        corregidos = 0
+        for inicio in range(0, len(ids), tamano_bloque):
+            bloque = ids[inicio:inicio + tamano_bloque]
+            with transaction.atomic():
+                corregidos += cls._reconciliar_bloque(bloque)
+        return corregidos
+    
+    @classmethod
+    def _reconciliar_bloque(cls, finca_ids):
+        calculados = {finca_id: cls(finca_id=finca_id) for finca_id in finca_ids}
+        agregados = (
+            Lote.objects.filter(finca_id__in=finca_ids)
+            .values('finca_id', 'estado')
+            .annotate(total=models.Count('id'), area=models.Sum('area'))
+            .order_by()
+        )
+        for fila in agregados:
+            resumen = calculados[fila['finca_id']]
+            resumen.total_lotes += fila['total']
+            resumen.area_cultivada += fila['area'] or 0
+            setattr(resumen, cls.campo_estado(fila['estado']), fila['total'])
+        
+        campos = ['total_lotes', 'area_cultivada'] + [
+            cls.campo_estado(estado) for estado, _ in Lote.ESTADO_CHOICES
+        ]
+        ahora = timezone.now()
+        existentes = cls.objects.select_for_update().filter(finca_id__in=finca_ids)
+        actualizar = []
+        for actual in existentes:
+            nuevo = calculados.pop(actual.finca_id)
+            if any(getattr(actual, c) != getattr(nuevo, c) for c in campos):
+                nuevo.fecha_actualizacion = ahora
+                actualizar.append(nuevo)
+        
+        cls.objects.bulk_update(actualizar, campos + ['fecha_actualizacion'])
+        cls.objects.bulk_create(calculados.values())
+        return len(actualizar) + len(calculados)
\ No newline at end of file
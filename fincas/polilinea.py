@@ -0,0 +1,55 @@
+"""
+Codificación compacta de polígonos (algoritmo "encoded polyline").
+
+Cada coordenada se redondea a enteros de 1e-6 grados (~0.1 m), se guarda la
+diferencia con el vértice anterior y cada diferencia se escribe en base 64 con
+caracteres ASCII imprimibles. Un polígono de 100 vértices pasa de ~4 KB de JSON
+a unos pocos cientos de bytes, y cualquier cliente de mapas puede decodificarlo.
+"""
+PRECISION = 6
+_FACTOR = 10 ** PRECISION
+
+
+def _codificar_valor(valor):
+    valor = ~(valor << 1) if valor < 0 else valor << 1
+    partes = []
+    while valor >= 0x20:
+        partes.append(chr((0x20 | (valor & 0x1f)) + 63))
+        valor >>= 5
+    partes.append(chr(valor + 63))
+    return ''.join(partes)
+
+
+def codificar(vertices):
+    """Codifica una lista de vértices (lat, lng) como texto"""
+    partes = []
+    previo_lat = previo_lng = 0
+    for lat, lng in vertices:
+        lat, lng = round(lat * _FACTOR), round(lng * _FACTOR)
+        partes.append(_codificar_valor(lat - previo_lat))
+        partes.append(_codificar_valor(lng - previo_lng))
+        previo_lat, previo_lng = lat, lng
+    return ''.join(partes)
+
+
+def decodificar(texto):
+    """Convierte el texto codificado en una lista de vértices (lat, lng)"""
+    vertices = []
+    indice = 0
+    lat = lng = 0
+    while indice < len(texto):
+        deltas = []
+        for _ in range(2):
+            resultado = desplazamiento = 0
+            while True:
+                byte = ord(texto[indice]) - 63
+                indice += 1
+                resultado |= (byte & 0x1f) << desplazamiento
+                desplazamiento += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(resultado >> 1) if resultado & 1 else resultado >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        vertices.append((lat / _FACTOR, lng / _FACTOR))
+    return vertices
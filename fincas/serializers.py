@@ -1,9 +1,49 @@
 from rest_framework import serializers
-from .models import Finca, Lote
+from . import geometria
+from .models import Finca, Lote, ResumenFinca
+
+
+def obtener_resumen(finca):
+    """Retorna el ResumenFinca precalculado o None si la finca aún no lo tiene"""
+    try:
+        return finca.resumen
+    except ResumenFinca.DoesNotExist:
+        return None
+
+
+NIVELES_LOD = ['original', 'completo', *Lote.NIVELES_DETALLE, 'ninguno']
+LOD_DEFECTO = 'original'
+
+
+def lod_solicitado(request):
+    """
+    Lee `?lod=` de la petición (por defecto `original`) y lanza ValidationError
+    si el nivel no existe.
+    """
+    if request is None:
+        return LOD_DEFECTO
+    lod = request.query_params.get('lod', LOD_DEFECTO)
+    if lod not in NIVELES_LOD:
+        raise serializers.ValidationError(
+            {'lod': [f'Nivel no válido. Opciones: {", ".join(NIVELES_LOD)}']}
+        )
+    return lod
 
 
 class LoteSerializer(serializers.ModelSerializer):
-    """Serializador para el modelo Lote"""
+    """
+    Serializador para el modelo Lote.
+    
+    Por defecto el polígono se responde en `coordenadas_poligono` como JSON de
+    puntos [lat, lng]. `?lod=` (también en los lotes anidados de una finca)
+    lo cambia por la polilínea codificada en `poligono`: `completo` a resolución
+    total o `alto`/`medio`/`bajo` simplificado; `ninguno` omite la geometría.
+    El nivel lo valida la vista y llega en el contexto (`lod`).
+    """
+    coordenadas_poligono = serializers.CharField(
+        required=False, allow_blank=True,
+        help_text='Coordenadas del polígono en formato JSON'
+    )
     
     class Meta:
         model = Lote
@@ -13,6 +53,37 @@ class LoteSerializer(serializers.ModelSerializer):
             'fecha_creacion', 'fecha_actualizacion'
         ]
         read_only_fields = ['id', 'fecha_creacion', 'fecha_actualizacion']
+    
+    def validate_coordenadas_poligono(self, value):
+        try:
+            geometria.parsear_poligono(value)
+        except ValueError as error:
+            raise serializers.ValidationError(str(error))
+        return value
+    
+    def to_representation(self, instance):
+        datos = super().to_representation(instance)
+        lod = self.context.get('lod', LOD_DEFECTO)
+        if lod == 'original':
+            return datos
+        del datos['coordenadas_poligono']
+        if lod == 'completo':
+            datos['poligono'] = instance.poligono_codificado or None
+        elif lod != 'ninguno':
+            datos['poligono'] = instance.poligono_simplificado.get(lod)
+        return datos
+
+
+class LoteImportacionSerializer(LoteSerializer):
+    """
+    Valida una fila de la importación masiva con las reglas de LoteSerializer,
+    sin consultas: la existencia de la finca y la unicidad del código se
+    verifican por conjuntos en fincas/importacion.py.
+    """
+    finca = serializers.IntegerField(source='finca_id')
+    
+    class Meta(LoteSerializer.Meta):
+        extra_kwargs = {'codigo': {'validators': []}}
 
 
 class FincaSerializer(serializers.ModelSerializer):
@@ -31,9 +102,16 @@ class FincaSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'fecha_registro']
     
     def get_total_lotes(self, obj):
+        # Usa el resumen precalculado; solo agrega si la finca no lo tiene
+        resumen = obtener_resumen(obj)
+        if resumen is not None:
+            return resumen.total_lotes
         return obj.total_lotes()
     
     def get_area_cultivada(self, obj):
+        resumen = obtener_resumen(obj)
+        if resumen is not None:
+            return resumen.area_cultivada
         return obj.area_cultivada()
 
 
@@ -49,4 +127,7 @@ class FincaListSerializer(serializers.ModelSerializer):
         ]
     
     def get_total_lotes(self, obj):
+        resumen = obtener_resumen(obj)
+        if resumen is not None:
+            return resumen.total_lotes
         return obj.total_lotes()
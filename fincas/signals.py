@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from config.versiones import incrementar_version
+
+from .indice_espacial import VERSION_DATOS as VERSION_GEOMETRIA
+from .models import Finca, Lote, ResumenFinca
+from .tablero import VERSION_LOTES
+
+
+@receiver(post_save, sender=Finca)
+def crear_resumen_finca(sender, instance, created, **kwargs):
+    """Crea el resumen vacío de cada finca nueva"""
+    if created:
+        ResumenFinca.objects.get_or_create(finca=instance)
+
+
+@receiver(pre_save, sender=Lote)
+def guardar_estado_previo_lote(sender, instance, **kwargs):
+    """
+    Guarda los valores anteriores del lote para calcular las diferencias. Lote.save
+    corre en una transacción: la fila queda bloqueada hasta aplicar la diferencia,
+    así dos guardados simultáneos no restan el mismo estado anterior.
+    """
+    instance._previo_resumen = None
+    instance._previo_poligono = None
+    if instance.pk:
+        previo = (
+            Lote.objects.select_for_update().filter(pk=instance.pk)
+            .values_list('finca_id', 'area', 'estado', 'poligono_codificado')
+            .first()
+        )
+        if previo is not None:
+            instance._previo_resumen = previo[:3]
+            instance._previo_poligono = previo[3]
+
+
+@receiver(post_save, sender=Lote)
+def actualizar_resumen_lote_guardado(sender, instance, **kwargs):
+    """Aplica al resumen la diferencia entre el lote anterior y el nuevo"""
+    previo = getattr(instance, '_previo_resumen', None)
+    actual = (instance.finca_id, Decimal(str(instance.area)), instance.estado)
+    if previo == actual:
+        return
+    
+    if previo is not None:
+        ResumenFinca.aplicar_lote(*previo, signo=-1)
+    if not ResumenFinca.aplicar_lote(*actual, signo=1):
+        # La finca no tenía resumen (datos anteriores a la tabla): se calcula completo
+        ResumenFinca.reconciliar([instance.finca_id])
+
+
+@receiver(post_save, sender=Lote)
+def invalidar_indice_espacial_guardado(sender, instance, created, **kwargs):
+    """Marca el índice espacial como desactualizado si cambió el polígono"""
+    if created or instance.poligono_codificado != getattr(instance, '_previo_poligono', None):
+        incrementar_version(VERSION_GEOMETRIA)
+
+
+@receiver(post_delete, sender=Lote)
+def invalidar_indice_espacial_eliminado(sender, instance, **kwargs):
+    incrementar_version(VERSION_GEOMETRIA)
+
+
+@receiver(post_delete, sender=Lote)
+def actualizar_resumen_lote_eliminado(sender, instance, **kwargs):
+    """Descuenta el lote eliminado del resumen de su finca"""
+    # Si la finca se está eliminando en cascada su resumen ya no existe y no se hace nada
+    ResumenFinca.aplicar_lote(
+        instance.finca_id, Decimal(str(instance.area)), instance.estado, signo=-1
+    )
+
+
+@receiver(post_save, sender=Finca)
+@receiver(post_delete, sender=Finca)
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+def invalidar_tablero(sender, instance, **kwargs):
+    """Invalida el tablero de lotes en caché"""
+    incrementar_version(VERSION_LOTES)
@@ -0,0 +1,80 @@
+"""
+Tablero de estado de los lotes de todas las fincas.
+
+Se calcula con tres consultas agrupadas (resúmenes de fincas, área por cultivo
+y tareas pendientes por finca) y se guarda en la caché con las versiones de
+datos 'fincas-lotes' y 'tareas' en la clave: mientras no cambien fincas, lotes
+ni tareas, las cargas siguientes no consultan la base de datos.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from config.versiones import version_datos
+from tarea.models import Tarea
+
+from .models import Finca, Lote
+
+VERSION_LOTES = 'fincas-lotes'
+VERSION_TAREAS = 'tareas'
+
+# Las versiones invalidan el tablero; el tiempo solo limita claves huérfanas
+DURACION_CACHE = 24 * 60 * 60
+
+
+def calcular_tablero():
+    """Retorna {'fincas': [...], 'totales': {...}} consultando la base de datos"""
+    estados = [estado for estado, _ in Lote.ESTADO_CHOICES]
+    fincas = {}
+    for finca in Finca.objects.con_resumen().order_by('nombre'):
+        resumen = getattr(finca, 'resumen', None)
+        fincas[finca.pk] = {
+            'id': finca.pk,
+            'nombre': finca.nombre,
+            'activa': finca.activa,
+            'total_lotes': resumen.total_lotes if resumen else 0,
+            'area_cultivada': str(resumen.area_cultivada) if resumen else '0.00',
+            'lotes_por_estado': (
+                resumen.lotes_por_estado() if resumen else dict.fromkeys(estados, 0)
+            ),
+            'area_por_cultivo': {},
+            'tareas_pendientes': 0,
+        }
+
+    cultivos = (
+        Lote.objects.values('finca_id', 'cultivo_actual')
+        .annotate(area=Sum('area'))
+        .order_by()
+    )
+    for fila in cultivos:
+        cultivo = fila['cultivo_actual'] or 'sin_cultivo'
+        fincas[fila['finca_id']]['area_por_cultivo'][cultivo] = f"{fila['area']:.2f}"
+
+    pendientes = (
+        Tarea.objects.filter(estado='pendiente')
+        .values('lote__finca_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for fila in pendientes:
+        fincas[fila['lote__finca_id']]['tareas_pendientes'] = fila['total']
+
+    filas = list(fincas.values())
+    totales = {
+        'fincas': len(filas),
+        'total_lotes': sum(f['total_lotes'] for f in filas),
+        'lotes_por_estado': {
+            estado: sum(f['lotes_por_estado'][estado] for f in filas) for estado in estados
+        },
+        'tareas_pendientes': sum(f['tareas_pendientes'] for f in filas),
+    }
+    return {'fincas': filas, 'totales': totales}
+
+
+def obtener_tablero():
+    """Retorna el tablero desde la caché o lo calcula si cambiaron los datos"""
+    clave = f'tablero-fincas:{version_datos(VERSION_LOTES)}:{version_datos(VERSION_TAREAS)}'
+    tablero = cache.get(clave)
+    if tablero is None:
+        tablero = calcular_tablero()
+        cache.set(clave, tablero, DURACION_CACHE)
+    return tablero
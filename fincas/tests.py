@@ -1,3 +1,423 @@
+import datetime
+import json
+import random
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from config.versiones import version_datos
+from tarea.models import Tarea, TipoTarea
+
+from . import geohash as gh
+from . import geometria, importacion, indice_espacial
+from .importacion import importar_lotes
+from .models import Finca, Lote, ResumenFinca
+from .tablero import VERSION_LOTES, VERSION_TAREAS
+
+
+class LoteEspacialTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        finca = Finca.objects.create(
+            nombre='Finca Test', ubicacion='Vereda', area_total=100,
+            latitud=4.6, longitud=-74.1, propietario='Propietario'
+        )
+        cls.lote = Lote.objects.create(
+            finca=finca, codigo='L-1', nombre='Lote 1', area=5,
+            coordenadas_poligono=json.dumps([[4.0, -74.0], [4.0, -73.9], [4.1, -73.9], [4.1, -74.0]])
+        )
+
+    def test_punto_y_area(self):
+        respuesta = self.client.get('/api/lotes/en-punto/', {'lat': 4.05, 'lng': -73.95})
+        self.assertEqual([l['id'] for l in respuesta.json()], [self.lote.pk])
+        respuesta = self.client.get('/api/lotes/en-area/', {
+            'min_lat': 3.9, 'min_lng': -74.05, 'max_lat': 4.01, 'max_lng': -73.99
+        })
+        self.assertEqual([l['id'] for l in respuesta.json()], [self.lote.pk])
+
+    def test_indice_se_construye_sin_parsear_el_json(self):
+        indice_espacial._indice = None
+        with mock.patch.object(geometria, 'parsear_poligono', side_effect=AssertionError):
+            indice = indice_espacial.obtener_indice()
+            self.assertEqual(indice.lotes_en_punto(4.05, -73.95), [self.lote.pk])
+            self.assertEqual(indice.lotes_en_punto(4.2, -73.95), [])
+            self.assertEqual(indice.lotes_en_caja(4.09, -73.91, 4.5, -73.5), [self.lote.pk])
+        self.assertEqual(indice.lotes[self.lote.pk][0], (4.0, -74.0, 4.1, -73.9))
+
+    def test_coordenadas_no_finitas_son_400(self):
+        for parametros in (
+            {'lat': 'inf', 'lng': 1},
+            {'lat': 'nan', 'lng': 1},
+        ):
+            respuesta = self.client.get('/api/lotes/en-punto/', parametros)
+            self.assertEqual(respuesta.status_code, 400)
+        respuesta = self.client.get('/api/lotes/en-area/', {
+            'min_lat': '-inf', 'min_lng': 0, 'max_lat': 'inf', 'max_lng': 1
+        })
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ImportacionLotesTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.finca = Finca.objects.create(
+            nombre='Finca Test', ubicacion='Vereda', area_total=100,
+            latitud=4.6, longitud=-74.1, propietario='Propietario'
+        )
+
+    def fila(self, codigo, **datos):
+        return {'finca': self.finca.pk, 'codigo': codigo, 'nombre': f'Lote {codigo}',
+                'area': '2.5', **datos}
+
+    def test_valida_con_las_reglas_del_serializador(self):
+        resultado = importar_lotes([
+            self.fila('L-1', estado=''),
+            self.fila('L-2', area='0'),
+            self.fila('L-3', estado='otro'),
+            self.fila('X' * 51),
+        ], parcial=True)
+        self.assertEqual(resultado['creados'], 1)
+        self.assertEqual(Lote.objects.get().estado, 'preparacion')
+        self.assertEqual(
+            [(e['fila'], list(e['errores'])) for e in resultado['errores']],
+            [(2, ['area']), (3, ['estado']), (4, ['codigo'])]
+        )
+
+    def test_un_solo_serializador_para_todas_las_filas(self):
+        filas = [self.fila(f'L-{i}', area='0' if i % 4 == 0 else '2') for i in range(40)]
+        with mock.patch.object(
+            importacion, 'LoteImportacionSerializer', wraps=importacion.LoteImportacionSerializer
+        ) as serializador:
+            resultado = importar_lotes(filas, parcial=True)
+        self.assertEqual(serializador.call_count, 1)
+        self.assertEqual(resultado['creados'], 30)
+        self.assertEqual([e['fila'] for e in resultado['errores']], list(range(1, 41, 4)))
+
+    def test_codigo_creado_durante_la_importacion_es_error_de_fila(self):
+        existentes = importacion._lotes_existentes
+
+        def sin_ver_el_concurrente(codigos, tamano):
+            # Simula un lote creado por otra petición después de la verificación
+            Lote.objects.create(finca=self.finca, codigo='L-1', nombre='Concurrente', area=1)
+            return {}
+
+        respuestas = iter([sin_ver_el_concurrente, existentes])
+        with mock.patch.object(
+            importacion, '_lotes_existentes', side_effect=lambda *args: next(respuestas)(*args)
+        ):
+            resultado = importar_lotes([self.fila('L-1'), self.fila('L-2')], parcial=True)
+        self.assertEqual(resultado['creados'], 1)
+        self.assertEqual(resultado['errores'][0]['fila'], 1)
+        self.assertEqual(Lote.objects.get(codigo='L-1').nombre, 'Concurrente')
+        self.assertTrue(Lote.objects.filter(codigo='L-2').exists())
+
+
+class LoteDetalleTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.finca = Finca.objects.create(
+            nombre='Finca Test', ubicacion='Vereda', area_total=100,
+            latitud=4.6, longitud=-74.1, propietario='Propietario'
+        )
+        cls.poligono = json.dumps([[4.0, -74.0], [4.0, -73.9], [4.1, -73.9], [4.1, -74.0]])
+
+    def test_coordenadas_por_defecto_y_polilinea_a_pedido(self):
+        lote = Lote.objects.create(
+            finca=self.finca, codigo='L-1', nombre='Lote 1', area=5,
+            coordenadas_poligono=self.poligono
+        )
+        datos = self.client.get(f'/api/lotes/{lote.pk}/').json()
+        self.assertEqual(datos['coordenadas_poligono'], self.poligono)
+        self.assertNotIn('poligono', datos)
+        datos = self.client.get(f'/api/lotes/{lote.pk}/', {'lod': 'completo'}).json()
+        self.assertNotIn('coordenadas_poligono', datos)
+        self.assertEqual(datos['poligono'], lote.poligono_codificado)
+        datos = self.client.get(f'/api/lotes/{lote.pk}/', {'lod': 'bajo'}).json()
+        self.assertEqual(datos['poligono'], lote.poligono_simplificado['bajo'])
+        datos = self.client.get(f'/api/lotes/{lote.pk}/', {'lod': 'ninguno'}).json()
+        self.assertNotIn('coordenadas_poligono', datos)
+        self.assertNotIn('poligono', datos)
+
+    def test_solo_se_guarda_la_polilinea(self):
+        # GeoJSON en orden [lng, lat]: se guarda codificado y se responde como [lat, lng]
+        geojson = {'type': 'Polygon', 'coordinates': [
+            [[-74.0, 4.0], [-73.9, 4.0], [-73.9, 4.1], [-74.0, 4.1], [-74.0, 4.0]]
+        ]}
+        respuesta = self.client.post('/api/lotes/', {
+            'finca': self.finca.pk, 'codigo': 'L-1', 'nombre': 'Lote 1', 'area': '5',
+            'coordenadas_poligono': json.dumps(geojson),
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['coordenadas_poligono'], self.poligono)
+        lote = Lote.objects.get()
+        self.assertNotIn('coordenadas_poligono', [f.name for f in Lote._meta.concrete_fields])
+        self.assertEqual((lote.min_lat, lote.max_lng), (4.0, -73.9))
+
+        respuesta = self.client.patch(
+            f'/api/lotes/{lote.pk}/', {'coordenadas_poligono': ''}, format='json'
+        )
+        self.assertEqual(respuesta.json()['coordenadas_poligono'], '')
+        lote.refresh_from_db()
+        self.assertEqual((lote.poligono_codificado, lote.min_lat), ('', None))
+
+    def test_lod_invalido_no_guarda(self):
+        datos = {'finca': self.finca.pk, 'codigo': 'L-2', 'nombre': 'Lote 2', 'area': '3'}
+        respuesta = self.client.post('/api/lotes/?lod=maximo', datos, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('lod', respuesta.json())
+        self.assertFalse(Lote.objects.exists())
+
+        lote = Lote.objects.create(finca=self.finca, codigo='L-3', nombre='Lote 3', area=1)
+        respuesta = self.client.patch(
+            f'/api/lotes/{lote.pk}/?lod=maximo', {'nombre': 'Cambiado'}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        lote.refresh_from_db()
+        self.assertEqual(lote.nombre, 'Lote 3')
+
+
+class ResumenFincaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fincas = [
+            Finca.objects.create(
+                nombre=f'Finca {i}', ubicacion='Vereda', area_total=100,
+                latitud=4.6, longitud=-74.1, propietario='Propietario'
+            )
+            for i in range(2)
+        ]
+
+    def resumen(self, finca):
+        r = ResumenFinca.objects.get(finca=finca)
+        return r.total_lotes, r.area_cultivada, {e: n for e, n in r.lotes_por_estado().items() if n}
+
+    def crear_lote(self, codigo, area, estado='preparacion', finca=None):
+        return Lote.objects.create(
+            finca=finca or self.fincas[0], codigo=codigo, nombre=codigo, area=area, estado=estado
+        )
+
+    def test_contadores_incrementales(self):
+        primera, segunda = self.fincas
+        lote = self.crear_lote('L-1', '2.50')
+        self.crear_lote('L-2', '1.25', 'sembrado')
+        self.assertEqual(self.resumen(primera),
+                         (2, Decimal('3.75'), {'preparacion': 1, 'sembrado': 1}))
+
+        lote.area = Decimal('4')
+        lote.save()
+        self.assertEqual(self.resumen(primera)[1], Decimal('5.25'))
+
+        lote.estado = 'cosecha'
+        lote.save()
+        self.assertEqual(self.resumen(primera)[2], {'cosecha': 1, 'sembrado': 1})
+
+        lote.finca = segunda
+        lote.save()
+        self.assertEqual(self.resumen(primera), (1, Decimal('1.25'), {'sembrado': 1}))
+        self.assertEqual(self.resumen(segunda), (1, Decimal('4'), {'cosecha': 1}))
+
+        lote.delete()
+        self.assertEqual(self.resumen(segunda), (0, Decimal('0'), {}))
+
+    def test_resumen_desfasado_no_baja_de_cero(self):
+        lote = self.crear_lote('L-1', '2')
+        ResumenFinca.objects.filter(finca=self.fincas[0]).update(
+            total_lotes=0, area_cultivada=1, lotes_preparacion=0
+        )
+        lote.delete()
+        self.assertEqual(self.resumen(self.fincas[0]), (0, Decimal('0'), {}))
+
+    def test_reconciliar_corrige_solo_los_desfasados(self):
+        primera, segunda = self.fincas
+        self.crear_lote('L-1', '2', 'sembrado')
+        self.crear_lote('L-2', '3', 'sembrado', finca=segunda)
+        ResumenFinca.objects.filter(finca=primera).update(total_lotes=7, lotes_sembrado=0)
+        # Finca sin resumen (datos anteriores a la tabla)
+        ResumenFinca.objects.filter(finca=segunda).delete()
+
+        salida = StringIO()
+        call_command('reconciliar_resumen_fincas', stdout=salida)
+        self.assertIn('2 resumen(es) corregido(s)', salida.getvalue())
+        self.assertEqual(self.resumen(primera), (1, Decimal('2'), {'sembrado': 1}))
+        self.assertEqual(self.resumen(segunda), (1, Decimal('3'), {'sembrado': 1}))
+        self.assertEqual(ResumenFinca.reconciliar(), 0)
+
+
+class FincasCercanasTests(APITestCase):
+    url = '/api/fincas/cercanas/'
+
+    def crear_fincas(self, puntos):
+        return Finca.objects.bulk_create([
+            Finca(nombre=f'Finca {i}', ubicacion='Vereda', area_total=10, latitud=lat,
+                  longitud=lng, propietario='Propietario', geohash=gh.codificar(lat, lng))
+            for i, (lat, lng) in enumerate(puntos)
+        ])
+
+    def cercanas(self, finca_query, lat, lng, radio_km):
+        return {f.pk for f, _ in finca_query.en_radio(lat, lng, radio_km)}
+
+    def test_vecinas_cruzan_bordes_de_celda_polo_y_antimeridiano(self):
+        casos = [
+            # Borde de celda en todas las precisiones (ecuador y meridiano 0)
+            ((0.00001, 0.00001), (-0.00001, -0.00001), 0.01),
+            # Antimeridiano
+            ((0.0, 179.9999), (0.0, -179.9999), 0.1),
+            ((10.0, -180.0), (10.0, 179.999), 0.5),
+            # Al otro lado del polo, en la longitud opuesta
+            ((89.99, 10.0), (89.99, -170.0), 5),
+            ((-89.995, -45.0), (-89.995, 135.0), 2),
+        ]
+        for centro, punto, radio in casos:
+            with self.subTest(centro=centro, punto=punto):
+                Finca.objects.all().delete()
+                finca, = self.crear_fincas([punto])
+                distancia = gh.distancia_km(*centro, *punto)
+                self.assertLess(distancia, radio)
+                self.assertNotEqual(gh.codificar(*centro, 3), gh.codificar(*punto, 3))
+                self.assertEqual(self.cercanas(Finca.objects, *centro, radio), {finca.pk})
+
+    def test_k_cercanas_coincide_con_fuerza_bruta(self):
+        azar = random.Random(5)
+        puntos = [(azar.uniform(-5, 5), azar.uniform(-80, -70)) for _ in range(300)]
+        puntos += [(azar.uniform(-90, 90), azar.uniform(-180, 180)) for _ in range(100)]
+        fincas = self.crear_fincas(puntos)
+        for lat, lng, k in [(0.0, -75.0, 10), (4.6, -74.1, 25), (-60.0, 170.0, 5), (88.0, 0.0, 3)]:
+            with self.subTest(lat=lat, lng=lng):
+                esperadas = sorted(
+                    fincas, key=lambda f: gh.distancia_km(lat, lng, float(f.latitud),
+                                                          float(f.longitud))
+                )[:k]
+                respuesta = self.client.get(self.url, {'lat': lat, 'lng': lng, 'k': k})
+                self.assertEqual([f['id'] for f in respuesta.json()], [f.pk for f in esperadas])
+
+    def test_radio_no_valido_y_limite_de_resultados(self):
+        self.crear_fincas([(4.6 + i * 0.001, -74.1) for i in range(120)])
+        for radio in ('inf', 'nan', '-1', '0', '501'):
+            respuesta = self.client.get(self.url, {'lat': 4.6, 'lng': -74.1, 'radio_km': radio})
+            self.assertEqual(respuesta.status_code, 400, radio)
+        respuesta = self.client.get(self.url, {'lat': 4.6, 'lng': -74.1, 'radio_km': 50})
+        distancias = [f['distancia_km'] for f in respuesta.json()]
+        self.assertEqual(len(distancias), 100)
+        self.assertEqual(distancias, sorted(distancias))
+        respuesta = self.client.get(self.url, {'lat': 4.6, 'lng': -74.1, 'radio_km': 50, 'k': 7})
+        self.assertEqual(len(respuesta.json()), 7)
+
+
+class FincaConsultasTests(APITestCase):
+    """El listado y el detalle usan un número fijo de consultas"""
+
+    def crear_fincas(self, cantidad, lotes_por_finca=3):
+        for i in range(Finca.objects.count(), Finca.objects.count() + cantidad):
+            finca = Finca.objects.create(
+                nombre=f'Finca {i}', ubicacion='Vereda', area_total=100,
+                latitud=4.6, longitud=-74.1, propietario='Propietario'
+            )
+            for j in range(lotes_por_finca):
+                Lote.objects.create(finca=finca, codigo=f'L-{i}-{j}', nombre='Lote', area=2)
+        return finca
+
+    def test_listado(self):
+        self.crear_fincas(2)
+        with self.assertNumQueries(1):
+            datos = self.client.get('/api/fincas/').json()['results']
+        self.assertEqual([f['total_lotes'] for f in datos], [3, 3])
+        self.crear_fincas(8)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get('/api/fincas/').json()['results']), 10)
+
+    def test_detalle(self):
+        finca = self.crear_fincas(1, lotes_por_finca=2)
+        with self.assertNumQueries(2):
+            datos = self.client.get(f'/api/fincas/{finca.pk}/').json()
+        self.assertEqual(len(datos['lotes']), 2)
+        self.assertEqual(datos['total_lotes'], 2)
+        finca = self.crear_fincas(1, lotes_por_finca=12)
+        with self.assertNumQueries(2):
+            datos = self.client.get(f'/api/fincas/{finca.pk}/').json()
+        self.assertEqual(len(datos['lotes']), 12)
+
+
+class TableroTests(APITestCase):
+    url = '/api/fincas/tablero/'
+
+    def setUp(self):
+        cache.clear()
+        self.fincas = [
+            Finca.objects.create(
+                nombre=nombre, ubicacion='Vereda', area_total=100,
+                latitud=4.6, longitud=-74.1, propietario='Propietario'
+            )
+            for nombre in ('A Finca', 'B Finca')
+        ]
+        primera, segunda = self.fincas
+        self.lotes = [
+            Lote.objects.create(finca=finca, codigo=codigo, nombre=codigo, area=area,
+                                cultivo_actual=cultivo, estado=estado)
+            for finca, codigo, area, cultivo, estado in [
+                (primera, 'A-1', '2.50', 'Café', 'sembrado'),
+                (primera, 'A-2', '1.25', 'Café', 'cosecha'),
+                (primera, 'A-3', '4', '', 'barbecho'),
+                (segunda, 'B-1', '3', 'Maíz', 'sembrado'),
+            ]
+        ]
+        self.tipo = TipoTarea.objects.create(
+            nombre='Riego', categoria='riego', duracion_estimada_horas=2
+        )
+        for lote, estado in [(self.lotes[0], 'pendiente'), (self.lotes[2], 'pendiente'),
+                             (self.lotes[3], 'completada')]:
+            self.crear_tarea(lote, estado)
+
+    def crear_tarea(self, lote, estado='pendiente'):
+        return Tarea.objects.create(
+            lote=lote, tipo_tarea=self.tipo, titulo='Tarea', descripcion='Descripción',
+            fecha_programada=datetime.date(2025, 1, 1), estado=estado, horas_estimadas=1
+        )
+
+    def test_valores_agregados(self):
+        datos = self.client.get(self.url).json()
+        primera, segunda = datos['fincas']
+        self.assertEqual(primera['nombre'], 'A Finca')
+        self.assertEqual(primera['total_lotes'], 3)
+        self.assertEqual(primera['area_cultivada'], '7.75')
+        self.assertEqual(primera['area_por_cultivo'], {'Café': '3.75', 'sin_cultivo': '4.00'})
+        self.assertEqual(
+            {e: n for e, n in primera['lotes_por_estado'].items() if n},
+            {'sembrado': 1, 'cosecha': 1, 'barbecho': 1}
+        )
+        self.assertEqual(primera['tareas_pendientes'], 2)
+        self.assertEqual(segunda['area_por_cultivo'], {'Maíz': '3.00'})
+        self.assertEqual(segunda['tareas_pendientes'], 0)
+        self.assertEqual(datos['totales']['total_lotes'], 4)
+        self.assertEqual(datos['totales']['lotes_por_estado']['sembrado'], 2)
+        self.assertEqual(datos['totales']['tareas_pendientes'], 2)
+
+    def test_escrituras_invalidan_la_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        version = version_datos(VERSION_LOTES)
+        with self.captureOnCommitCallbacks(execute=True):
+            lote = self.lotes[3]
+            lote.estado = 'cosecha'
+            lote.save()
+        self.assertNotEqual(version_datos(VERSION_LOTES), version)
+        datos = self.client.get(self.url).json()
+        self.assertEqual(datos['totales']['lotes_por_estado']['cosecha'], 2)
 
-# Create your tests here.
+        version = version_datos(VERSION_TAREAS)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_tarea(self.lotes[3])
+        self.assertNotEqual(version_datos(VERSION_TAREAS), version)
+        datos = self.client.get(self.url).json()
+        self.assertEqual(datos['fincas'][1]['tareas_pendientes'], 1)
+        self.assertEqual(datos['totales']['tareas_pendientes'], 3)
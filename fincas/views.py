@@ -1,17 +1,40 @@
-from rest_framework import viewsets, filters, status
+import math
+
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
-from drf_spectacular.utils import extend_schema_view, extend_schema
-from .models import Finca, Lote
-from .serializers import FincaSerializer, FincaListSerializer, LoteSerializer
+from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
+
+from busqueda.filters import IndiceSearchFilter, RelevanciaOrderingFilter
+from config.exportacion import FORMATOS, formato_solicitado, respuesta_exportacion
+
+from .importacion import importar_lotes, leer_archivo
+from .indice_espacial import obtener_indice
+from .models import Finca, Lote, ResumenFinca
+from .serializers import (
+    NIVELES_LOD, FincaSerializer, FincaListSerializer, LoteSerializer, lod_solicitado,
+    obtener_resumen
+)
+from .tablero import obtener_tablero
+
+PARAMETRO_LOD = OpenApiParameter(
+    'lod', str, enum=NIVELES_LOD,
+    description='Formato del polígono: "original" (por defecto) en coordenadas_poligono; '
+                '"completo", "alto", "medio" o "bajo" como polilínea codificada en '
+                'poligono; "ninguno" para omitirlo'
+)
+# Límites de /fincas/cercanas/: número de fincas por respuesta y radio de búsqueda
+MAX_CERCANAS = 100
+MAX_RADIO_KM = 500
 
 
 @extend_schema_view(
     list=extend_schema(tags=['🏠 Gestión de Fincas']),
-    create=extend_schema(tags=['🏠 Gestión de Fincas']),
-    retrieve=extend_schema(tags=['🏠 Gestión de Fincas']),
-    update=extend_schema(tags=['🏠 Gestión de Fincas']),
-    partial_update=extend_schema(tags=['🏠 Gestión de Fincas']),
+    create=extend_schema(tags=['🏠 Gestión de Fincas'], parameters=[PARAMETRO_LOD]),
+    retrieve=extend_schema(tags=['🏠 Gestión de Fincas'], parameters=[PARAMETRO_LOD]),
+    update=extend_schema(tags=['🏠 Gestión de Fincas'], parameters=[PARAMETRO_LOD]),
+    partial_update=extend_schema(tags=['🏠 Gestión de Fincas'], parameters=[PARAMETRO_LOD]),
     destroy=extend_schema(tags=['🏠 Gestión de Fincas']),
 )
 class FincaViewSet(viewsets.ModelViewSet):
@@ -26,43 +49,130 @@ class FincaViewSet(viewsets.ModelViewSet):
     - DELETE /api/fincas/{id}/ - Eliminar una finca
     """
     queryset = Finca.objects.all()
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [IndiceSearchFilter, RelevanciaOrderingFilter]
     search_fields = ['nombre', 'propietario', 'ubicacion']
     ordering_fields = ['nombre', 'fecha_registro', 'area_total']
     ordering = ['nombre']
     
+    def get_queryset(self):
+        """Incluye el resumen precalculado y precarga los lotes para el detalle"""
+        queryset = Finca.objects.all()
+        if self.action in ('list', 'retrieve', 'estadisticas'):
+            queryset = queryset.con_resumen()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related('lotes')
+        return queryset
+    
     def get_serializer_class(self):
         """Usa serializer simplificado para listar, completo para detalle"""
         if self.action == 'list':
             return FincaListSerializer
         return FincaSerializer
     
+    def get_serializer_context(self):
+        """Valida `?lod=` antes de guardar: un nivel inválido responde 400 sin escribir"""
+        contexto = super().get_serializer_context()
+        contexto['lod'] = lod_solicitado(self.request)
+        return contexto
+    
+    @extend_schema(tags=['🏠 Gestión de Fincas'], parameters=[PARAMETRO_LOD])
     @action(detail=True, methods=['get'])
     def lotes(self, request, pk=None):
         """Obtener todos los lotes de una finca específica"""
         finca = self.get_object()
         lotes = finca.lotes.all()
-        serializer = LoteSerializer(lotes, many=True)
+        serializer = LoteSerializer(lotes, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
     
+    @extend_schema(
+        tags=['🏠 Gestión de Fincas'],
+        parameters=[
+            OpenApiParameter('lat', float, required=True),
+            OpenApiParameter('lng', float, required=True),
+            OpenApiParameter(
+                'k', int,
+                description=f'Número máximo de fincas (por defecto 10 sin radio y '
+                            f'{MAX_CERCANAS} con radio; máximo {MAX_CERCANAS})'
+            ),
+            OpenApiParameter(
+                'radio_km', float,
+                description=f'Fincas dentro del radio, hasta {MAX_RADIO_KM} km'
+            ),
+        ],
+    )
+    @action(detail=False, methods=['get'])
+    def cercanas(self, request):
+        """Obtener las fincas activas más cercanas a un punto o dentro de un radio"""
+        try:
+            lat = float(request.query_params['lat'])
+            lng = float(request.query_params['lng'])
+            radio_km = request.query_params.get('radio_km')
+            radio_km = float(radio_km) if radio_km is not None else None
+            k = min(
+                int(request.query_params.get('k', 10 if radio_km is None else MAX_CERCANAS)),
+                MAX_CERCANAS
+            )
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Parámetros inválidos: se requieren lat y lng numéricos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        fuera_de_rango = not (-90 <= lat <= 90 and -180 <= lng <= 180)
+        radio_invalido = radio_km is not None and not (
+            math.isfinite(radio_km) and 0 < radio_km <= MAX_RADIO_KM
+        )
+        if fuera_de_rango or radio_invalido or k < 1:
+            return Response(
+                {'error': f'Coordenadas fuera de rango, k o radio_km (hasta {MAX_RADIO_KM}) '
+                          'no válidos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        fincas = Finca.objects.filter(activa=True).con_resumen()
+        if radio_km is not None:
+            resultado = fincas.en_radio(lat, lng, radio_km, limite=k)
+        else:
+            resultado = fincas.mas_cercanas(lat, lng, k)
+        
+        datos = []
+        for finca, distancia in resultado:
+            fila = FincaListSerializer(finca).data
+            fila['distancia_km'] = round(distancia, 3)
+            datos.append(fila)
+        return Response(datos)
+    
+    @extend_schema(tags=['🏠 Gestión de Fincas'])
+    @action(detail=False, methods=['get'])
+    def tablero(self, request):
+        """
+        Obtener para todas las fincas los lotes por estado, el área por cultivo
+        y las tareas pendientes. Se sirve desde caché mientras no cambien los datos.
+        """
+        return Response(obtener_tablero())
+    
     @action(detail=True, methods=['get'])
     def estadisticas(self, request, pk=None):
         """Obtener estadísticas de una finca"""
         finca = self.get_object()
+        resumen = obtener_resumen(finca)
+        if resumen is None:
+            ResumenFinca.reconciliar([finca.pk])
+            resumen = ResumenFinca.objects.get(finca=finca)
         return Response({
             'nombre': finca.nombre,
             'area_total': str(finca.area_total),
-            'total_lotes': finca.total_lotes(),
-            'area_cultivada': str(finca.area_cultivada()),
+            'total_lotes': resumen.total_lotes,
+            'area_cultivada': str(resumen.area_cultivada),
+            'lotes_por_estado': resumen.lotes_por_estado(),
         })
 
 
 @extend_schema_view(
-    list=extend_schema(tags=['🏠 Gestión de Lotes']),
-    create=extend_schema(tags=['🏠 Gestión de Lotes']),
-    retrieve=extend_schema(tags=['🏠 Gestión de Lotes']),
-    update=extend_schema(tags=['🏠 Gestión de Lotes']),
-    partial_update=extend_schema(tags=['🏠 Gestión de Lotes']),
+    list=extend_schema(tags=['🏠 Gestión de Lotes'], parameters=[PARAMETRO_LOD]),
+    create=extend_schema(tags=['🏠 Gestión de Lotes'], parameters=[PARAMETRO_LOD]),
+    retrieve=extend_schema(tags=['🏠 Gestión de Lotes'], parameters=[PARAMETRO_LOD]),
+    update=extend_schema(tags=['🏠 Gestión de Lotes'], parameters=[PARAMETRO_LOD]),
+    partial_update=extend_schema(tags=['🏠 Gestión de Lotes'], parameters=[PARAMETRO_LOD]),
     destroy=extend_schema(tags=['🏠 Gestión de Lotes']),
 )
 class LoteViewSet(viewsets.ModelViewSet):
@@ -78,11 +188,17 @@ class LoteViewSet(viewsets.ModelViewSet):
     """
     queryset = Lote.objects.all()
     serializer_class = LoteSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [IndiceSearchFilter, RelevanciaOrderingFilter]
     search_fields = ['nombre', 'codigo', 'cultivo_actual', 'finca__nombre']
     ordering_fields = ['codigo', 'fecha_creacion', 'estado']
     ordering = ['finca', 'codigo']
     
+    def get_serializer_context(self):
+        """Valida `?lod=` antes de guardar: un nivel inválido responde 400 sin escribir"""
+        contexto = super().get_serializer_context()
+        contexto['lod'] = lod_solicitado(self.request)
+        return contexto
+    
     @action(detail=True, methods=['get'])
     def tareas_pendientes(self, request, pk=None):
         """Obtener número de tareas pendientes en el lote"""
@@ -102,3 +218,133 @@ class LoteViewSet(viewsets.ModelViewSet):
             'fecha_siembra': lote.fecha_siembra,
             'dias_desde_siembra': dias,
         })
+    
+    def _leer_coordenadas(self, request, nombres):
+        """Lee parámetros numéricos obligatorios (y finitos) de la URL"""
+        valores = []
+        for nombre in nombres:
+            try:
+                valor = float(request.query_params[nombre])
+                if not math.isfinite(valor):
+                    raise ValueError
+                valores.append(valor)
+            except (KeyError, ValueError):
+                return None, Response(
+                    {'error': f'El parámetro "{nombre}" es obligatorio y numérico'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return valores, None
+    
+    @extend_schema(
+        tags=['🏠 Gestión de Lotes'],
+        parameters=[
+            OpenApiParameter('lat', float, required=True),
+            OpenApiParameter('lng', float, required=True),
+            PARAMETRO_LOD,
+        ],
+    )
+    @action(detail=False, methods=['get'], url_path='en-punto')
+    def en_punto(self, request):
+        """Obtener los lotes cuyo polígono contiene el punto (lat, lng)"""
+        valores, error = self._leer_coordenadas(request, ['lat', 'lng'])
+        if error:
+            return error
+        ids = obtener_indice().lotes_en_punto(*valores)
+        lotes = Lote.objects.filter(pk__in=ids).order_by('finca', 'codigo')
+        serializer = self.get_serializer(lotes, many=True)
+        return Response(serializer.data)
+    
+    @extend_schema(
+        tags=['🏠 Gestión de Lotes'],
+        parameters=[
+            OpenApiParameter('min_lat', float, required=True),
+            OpenApiParameter('min_lng', float, required=True),
+            OpenApiParameter('max_lat', float, required=True),
+            OpenApiParameter('max_lng', float, required=True),
+            PARAMETRO_LOD,
+        ],
+    )
+    @action(detail=False, methods=['get'], url_path='en-area')
+    def en_area(self, request):
+        """Obtener los lotes cuyo polígono intersecta la caja del mapa"""
+        valores, error = self._leer_coordenadas(
+            request, ['min_lat', 'min_lng', 'max_lat', 'max_lng']
+        )
+        if error:
+            return error
+        min_lat, min_lng, max_lat, max_lng = valores
+        if min_lat > max_lat or min_lng > max_lng:
+            return Response(
+                {'error': 'Los valores mínimos deben ser menores que los máximos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ids = obtener_indice().lotes_en_caja(min_lat, min_lng, max_lat, max_lng)
+        lotes = Lote.objects.filter(pk__in=ids).order_by('finca', 'codigo')
+        serializer = self.get_serializer(lotes, many=True)
+        return Response(serializer.data)
+    
+    @extend_schema(
+        tags=['🏠 Gestión de Lotes'],
+        parameters=[OpenApiParameter('formato', str, enum=list(FORMATOS))],
+        responses={(200, 'application/x-ndjson'): str, (200, 'text/csv'): str},
+    )
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """Exportar los lotes filtrados en NDJSON o CSV sin cargarlos en memoria"""
+        formato = formato_solicitado(request)
+        if formato is None:
+            return Response(
+                {'error': f'Formato no soportado. Opciones: {", ".join(FORMATOS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        lotes = self.filter_queryset(self.get_queryset())
+        return respuesta_exportacion(lotes, formato, 'lotes')
+    
+    @extend_schema(
+        tags=['🏠 Gestión de Lotes'],
+        parameters=[
+            OpenApiParameter('actualizar', bool,
+                             description='Actualiza los lotes con código existente'),
+            OpenApiParameter('parcial', bool,
+                             description='Guarda las filas válidas aunque otras tengan errores'),
+        ],
+    )
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, MultiPartParser])
+    def importar(self, request):
+        """
+        Crear o actualizar lotes de forma masiva.
+        
+        Recibe una lista JSON de lotes (o {"lotes": [...]}) o un archivo CSV/JSON
+        en el campo "archivo". Retorna el número de lotes creados y actualizados
+        y los errores de cada fila.
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is not None:
+            formato = 'csv' if archivo.name.lower().endswith('.csv') else 'json'
+            try:
+                filas = leer_archivo(archivo, formato)
+            except (ValueError, UnicodeDecodeError):
+                return Response(
+                    {'error': 'No se pudo leer el archivo'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            filas = request.data
+            if isinstance(filas, dict):
+                filas = filas.get('lotes')
+        if not isinstance(filas, list):
+            return Response(
+                {'error': 'Se esperaba una lista de lotes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        def verdadero(nombre):
+            return request.query_params.get(nombre, '').lower() in ('1', 'true', 'si')
+        
+        resultado = importar_lotes(
+            filas, actualizar=verdadero('actualizar'), parcial=verdadero('parcial')
+        )
+        escritos = resultado['creados'] + resultado['actualizados']
+        if resultado['errores'] and not escritos:
+            return Response(resultado, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado, status=status.HTTP_201_CREATED)
@@ -2,5 +2,20 @@ from django.contrib import admin
 from .models import Insumo, Movimiento, Consumo
 
 admin.site.register(Insumo)
-admin.site.register(Movimiento)
-admin.site.register(Consumo)
\ No newline at end of file
+admin.site.register(Consumo)
+
+
+@admin.register(Movimiento)
+class MovimientoAdmin(admin.ModelAdmin):
+    """Solo lectura: los movimientos se registran por la API para aplicarlos al stock"""
+    list_display = ['fecha', 'insumo', 'tipo', 'cantidad', 'responsable']
+    list_filter = ['tipo']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,65 @@
+"""
+Alertas de stock generadas al momento de cada cambio.
+
+El kardex llama a evaluar() con los insumos cuyo stock acaba de cambiar, y la
+señal de Insumo hace lo mismo al crear o editar un insumo (umbrales). Si el
+stock queda bajo `stock_minimo` o sobre `stock_maximo` se abre una alerta; si
+la condición desaparece, la alerta activa se marca resuelta. La clave única
+`clave_activa` ("insumo:tipo", nula al resolver) garantiza una sola alerta
+activa por insumo y tipo aun con escrituras concurrentes, y el listado lee solo
+las alertas activas por el índice (estado, fecha_creacion).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AlertaStock, Insumo
+
+ESTADOS_ACTIVOS = ['abierta', 'reconocida']
+
+
+def _condiciones(stock, minimo, maximo):
+    """{tipo: (se cumple, umbral)} para el stock de un insumo"""
+    return {
+        'stock_bajo': (stock < minimo, minimo),
+        'sobre_stock': (maximo is not None and stock > maximo, maximo),
+    }
+
+
+def evaluar(insumo_ids):
+    """Abre o resuelve las alertas de los insumos según su stock actual"""
+    insumo_ids = list(insumo_ids)
+    with transaction.atomic():
+        activas = dict(
+            AlertaStock.objects.filter(insumo_id__in=insumo_ids, clave_activa__isnull=False)
+            .values_list('clave_activa', 'pk')
+        )
+        nuevas = []
+        resueltas = []
+        filas = Insumo.objects.filter(pk__in=insumo_ids).values_list(
+            'pk', 'stock_actual', 'stock_minimo', 'stock_maximo'
+        )
+        for insumo_id, stock, minimo, maximo in filas:
+            for tipo, (cumple, umbral) in _condiciones(stock, minimo, maximo).items():
+                clave = AlertaStock.clave(insumo_id, tipo)
+                if cumple and clave not in activas:
+                    nuevas.append(AlertaStock(
+                        insumo_id=insumo_id, tipo=tipo, stock=stock, umbral=umbral,
+                        clave_activa=clave,
+                    ))
+                elif not cumple and clave in activas:
+                    resueltas.append(activas[clave])
+
+        # Si otra transacción abrió la misma alerta primero, la clave única la descarta
+        AlertaStock.objects.bulk_create(nuevas, ignore_conflicts=True)
+        if resueltas:
+            AlertaStock.objects.filter(pk__in=resueltas).update(
+                estado='resuelta', clave_activa=None, fecha_resuelta=timezone.now()
+            )
+    return {'abiertas': len(nuevas), 'resueltas': len(resueltas)}
+
+
+def reconocer(alerta_ids):
+    """Marca como reconocidas las alertas abiertas; retorna cuántas cambiaron"""
+    return AlertaStock.objects.filter(pk__in=alerta_ids, estado='abierta').update(
+        estado='reconocida', fecha_reconocida=timezone.now()
+    )
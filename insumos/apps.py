@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class InsumosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'insumos'
+
+    def ready(self):
+        from busqueda.indice import registrar
+        from tarea.costos import registrar as registrar_costo
+        from . import signals  # noqa: F401
+        from .models import Insumo, Consumo
+
+        registrar(Insumo, ['nombre', 'categoria'])
+        registrar_costo(Consumo, 'costo_materiales')
@@ -0,0 +1,173 @@
+"""
+Stock histórico de los insumos a partir de cierres diarios materializados.
+
+ExistenciaDiaria guarda el stock al cierre de cada día en que un insumo tuvo
+movimientos, y el cambio neto de ese día. generar() procesa solo los días
+completos posteriores al último cierre: agrupa los movimientos por insumo y día
+en una consulta y continúa el stock desde el cierre anterior de cada insumo.
+
+El último día cerrado (`corte`) es la fecha máxima de la tabla. Los movimientos
+se fechan al registrarse y no se editan, así que no aparecen movimientos nuevos
+en días ya cerrados. Entonces:
+- para una fecha cerrada, el stock es el del último cierre del insumo hasta esa
+  fecha (una búsqueda en el índice único (insumo, fecha));
+- para una fecha posterior al corte, es Insumo.stock_actual menos los
+  movimientos posteriores a esa fecha, que solo recorre el tramo reciente en el
+  índice (insumo, tipo, fecha).
+El costo de ambas consultas no depende del tamaño del historial.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .kardex import SIGNO, suma_con_signo
+from .models import ExistenciaDiaria, Insumo, Movimiento
+
+MAX_DIAS = 366
+TAMANO_BLOQUE = 1000
+
+
+def _inicio_dia(dia):
+    return timezone.make_aware(datetime.datetime.combine(dia, datetime.time.min))
+
+
+def _movimientos(insumo_id, desde=None, hasta=None):
+    """Movimientos del insumo con fecha en [desde, hasta) (días locales)"""
+    movimientos = Movimiento.objects.filter(insumo_id=insumo_id, tipo__in=list(SIGNO))
+    if desde is not None:
+        movimientos = movimientos.filter(fecha__gte=_inicio_dia(desde))
+    if hasta is not None:
+        movimientos = movimientos.filter(fecha__lt=_inicio_dia(hasta))
+    return movimientos.order_by()
+
+
+def ultimo_corte():
+    """Último día con cierres generados, o None"""
+    return ExistenciaDiaria.objects.aggregate(corte=Max('fecha'))['corte']
+
+
+def generar(hasta=None):
+    """
+    Genera los cierres de los días posteriores al último corte hasta `hasta`
+    (por defecto, ayer). Retorna {'desde', 'hasta', 'cierres'}.
+
+    Solo se cierran días completos: cerrar hoy dejaría fuera los movimientos
+    que aún se registren hoy, y el corte ya no los volvería a leer.
+    """
+    hoy = timezone.localdate()
+    hasta = hasta or hoy - datetime.timedelta(days=1)
+    if hasta >= hoy:
+        raise ValueError(f'Solo se pueden cerrar días completos (hasta antes de {hoy}).')
+    corte = ultimo_corte()
+    desde = corte + datetime.timedelta(days=1) if corte else None
+    if desde is not None and desde > hasta:
+        return {'desde': desde, 'hasta': hasta, 'cierres': 0}
+
+    movimientos = Movimiento.objects.filter(
+        tipo__in=list(SIGNO), fecha__lt=_inicio_dia(hasta + datetime.timedelta(days=1))
+    )
+    if desde is not None:
+        movimientos = movimientos.filter(fecha__gte=_inicio_dia(desde))
+    netos = (
+        movimientos.annotate(dia=TruncDate('fecha'))
+        .values('insumo_id', 'dia')
+        .annotate(neto=suma_con_signo())
+        .order_by('insumo_id', 'dia')
+    )
+
+    with transaction.atomic():
+        ids = set(movimientos.order_by().values_list('insumo_id', flat=True).distinct())
+        # Stock de partida: el último cierre del insumo o, si no tiene, el stock
+        # actual menos todos los movimientos desde el inicio del rango
+        stock = dict(
+            ExistenciaDiaria.objects.filter(insumo_id__in=ids)
+            .values('insumo_id').annotate(ultima=Max('fecha')).order_by()
+            .values_list('insumo_id', 'ultima')
+        )
+        if stock:
+            ultimos = ExistenciaDiaria.objects.filter(
+                insumo_id__in=list(stock), fecha__in=set(stock.values())
+            ).values_list('insumo_id', 'fecha', 'stock')
+            stock = {i: s for i, f, s in ultimos if stock[i] == f}
+        nuevos = ids - set(stock)
+        if nuevos:
+            posteriores = Movimiento.objects.filter(insumo_id__in=nuevos, tipo__in=list(SIGNO))
+            if desde is not None:
+                posteriores = posteriores.filter(fecha__gte=_inicio_dia(desde))
+            desde_rango = dict(
+                posteriores.values('insumo_id').annotate(neto=suma_con_signo())
+                .order_by().values_list('insumo_id', 'neto')
+            )
+            for insumo_id, actual in Insumo.objects.filter(pk__in=nuevos).values_list('pk', 'stock_actual'):
+                stock[insumo_id] = actual - desde_rango.get(insumo_id, 0)
+
+        cierres = []
+        total = 0
+        for fila in netos.iterator():
+            stock[fila['insumo_id']] += fila['neto']
+            cierres.append(ExistenciaDiaria(
+                insumo_id=fila['insumo_id'], fecha=fila['dia'],
+                stock=stock[fila['insumo_id']], neto=fila['neto'],
+            ))
+            if len(cierres) >= TAMANO_BLOQUE:
+                ExistenciaDiaria.objects.bulk_create(cierres)
+                total += len(cierres)
+                cierres = []
+        ExistenciaDiaria.objects.bulk_create(cierres)
+        total += len(cierres)
+
+    return {'desde': desde, 'hasta': hasta, 'cierres': total}
+
+
+def stock_en_fecha(insumo, fecha, corte=None):
+    """Stock del insumo al cierre de `fecha`"""
+    corte = corte if corte is not None else ultimo_corte()
+    if corte is None or fecha >= corte:
+        posteriores = _movimientos(insumo.pk, desde=fecha + datetime.timedelta(days=1))
+        return insumo.stock_actual - (posteriores.aggregate(neto=suma_con_signo())['neto'] or 0)
+
+    cierre = (
+        insumo.existencias.filter(fecha__lte=fecha)
+        .order_by('-fecha').values_list('stock', flat=True).first()
+    )
+    if cierre is not None:
+        return cierre
+    # Antes del primer cierre del insumo: su stock de partida
+    primero = insumo.existencias.order_by('fecha').values_list('stock', 'neto').first()
+    if primero is not None:
+        return primero[0] - primero[1]
+    # Sin cierres: no tuvo movimientos hasta el corte
+    return stock_en_fecha(insumo, corte, corte)
+
+
+def serie(insumo, desde, hasta):
+    """Stock al cierre de cada día entre `desde` y `hasta`: [{'fecha', 'stock'}]"""
+    corte = ultimo_corte()
+    stock = stock_en_fecha(insumo, desde - datetime.timedelta(days=1), corte)
+
+    netos = defaultdict(Decimal)
+    if corte is not None and desde <= corte:
+        netos.update(
+            insumo.existencias.filter(fecha__range=(desde, min(hasta, corte)))
+            .values_list('fecha', 'neto')
+        )
+    if corte is None or hasta > corte:
+        inicio = max(desde, corte + datetime.timedelta(days=1)) if corte else desde
+        recientes = (
+            _movimientos(insumo.pk, desde=inicio, hasta=hasta + datetime.timedelta(days=1))
+            .annotate(dia=TruncDate('fecha')).values('dia').annotate(neto=suma_con_signo())
+        )
+        netos.update((fila['dia'], fila['neto']) for fila in recientes)
+
+    resultado = []
+    dia = desde
+    while dia <= hasta:
+        stock += netos[dia]
+        resultado.append({'fecha': dia, 'stock': f'{stock:.2f}'})
+        dia += datetime.timedelta(days=1)
+    return resultado
@@ -1,14 +1,20 @@
 import django_filters
-from .models import Insumo, Movimiento, Consumo
+from busqueda.indice import buscar
+from .models import Insumo, Movimiento, Consumo, AlertaStock
 
 class InsumoFilter(django_filters.FilterSet):
-    categoria = django_filters.CharFilter(lookup_expr='icontains')
-    nombre = django_filters.CharFilter(lookup_expr='icontains')
+    # Búsqueda parcial sobre el índice de trigramas en lugar de icontains
+    categoria = django_filters.CharFilter(method='filtrar_indice')
+    nombre = django_filters.CharFilter(method='filtrar_indice')
 
     class Meta:
         model = Insumo
         fields = ['categoria', 'nombre', 'proveedor']
 
+    def filtrar_indice(self, queryset, name, value):
+        # El índice reduce los candidatos; icontains conserva la coincidencia del texto completo
+        return buscar(queryset, value, campos=[name]).filter(**{f'{name}__icontains': value})
+
 
 class MovimientoFilter(django_filters.FilterSet):
     fecha = django_filters.DateFromToRangeFilter()
@@ -23,4 +29,10 @@ class ConsumoFilter(django_filters.FilterSet):
 
     class Meta:
         model = Consumo
-        fields = ['insumo', 'tarea']
\ No newline at end of file
+        fields = ['insumo', 'tarea']
+
+
+class AlertaStockFilter(django_filters.FilterSet):
+    class Meta:
+        model = AlertaStock
+        fields = ['estado', 'tipo', 'insumo']
@@ -0,0 +1,145 @@
+"""
+Kardex: aplicación de los movimientos de inventario a Insumo.stock_actual.
+
+Cada tipo de movimiento suma o resta su cantidad al stock (SIGNO); la cantidad
+es siempre positiva, así que un conteo físico que encuentra más o menos stock se
+registra como ajuste_positivo o ajuste_negativo. Un movimiento
+individual se aplica con un UPDATE condicional
+`stock_actual = stock_actual - x WHERE stock_actual >= x`: la base de datos
+serializa las escrituras concurrentes sobre la fila y una salida sin stock
+suficiente no actualiza nada, así que el stock nunca queda negativo y no hace
+falta leerlo antes.
+
+Los lotes bloquean sus insumos con select_for_update en orden de id (dos lotes
+con insumos en común los toman en el mismo orden y no se bloquean entre sí),
+validan los movimientos en memoria en el orden recibido y escriben un UPDATE con
+la diferencia de cada insumo y un bulk_create de los movimientos, todo en una
+transacción. Los movimientos registrados no se modifican: las correcciones se
+hacen con nuevos movimientos. Después de cada cambio se actualiza la valoración
+(insumos/valoracion.py) y se evalúan las alertas de stock de los insumos
+afectados (insumos/alertas.py).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, When
+from django.utils import timezone
+
+from config.versiones import incrementar_version
+
+from . import valoracion
+from .alertas import evaluar as evaluar_alertas
+from .models import Insumo, Movimiento
+from .resumen import VERSION_INVENTARIO
+
+SIGNO = {
+    'entrada': 1,
+    'devolucion': 1,
+    'ajuste_positivo': 1,
+    'salida': -1,
+    'merma': -1,
+    'ajuste_negativo': -1,
+}
+
+TAMANO_BLOQUE = 500
+
+
+def suma_con_signo():
+    """Agregado con el cambio neto de stock de los movimientos (entradas menos salidas)"""
+    return Sum(
+        Case(
+            When(tipo__in=[t for t, signo in SIGNO.items() if signo > 0], then=F('cantidad')),
+            default=-F('cantidad'),
+        ),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+class StockInsuficiente(ValueError):
+    pass
+
+
+def registrar_movimiento(insumo, tipo, cantidad, **datos):
+    """Aplica un movimiento al stock del insumo y lo registra; retorna el Movimiento"""
+    insumo_id = getattr(insumo, 'pk', insumo)
+    with transaction.atomic():
+        filas = Insumo.objects.filter(pk=insumo_id)
+        if SIGNO[tipo] < 0:
+            filas = filas.filter(stock_actual__gte=cantidad)
+        actualizadas = filas.update(
+            stock_actual=F('stock_actual') + SIGNO[tipo] * cantidad,
+            fecha_actualizacion=timezone.now(),
+        )
+        if not actualizadas:
+            if not Insumo.objects.filter(pk=insumo_id).exists():
+                raise Insumo.DoesNotExist(f'El insumo {insumo_id} no existe.')
+            raise StockInsuficiente(
+                'No hay suficiente stock disponible para realizar la salida.'
+            )
+        movimiento = Movimiento.objects.create(
+            insumo_id=insumo_id, tipo=tipo, cantidad=cantidad, **datos
+        )
+        valoracion.aplicar([movimiento])
+        evaluar_alertas([insumo_id])
+        return movimiento
+
+
+def registrar_movimientos(movimientos, parcial=False):
+    """
+    Aplica los movimientos [{'insumo': id, 'tipo', 'cantidad', ...}] en una sola
+    transacción. Si alguno no puede aplicarse no se aplica ninguno, salvo que
+    `parcial=True`.
+
+    Retorna {'aplicados': n, 'errores': [{'indice', 'insumo', 'error'}]}.
+    """
+    ids = sorted({datos['insumo'] for datos in movimientos})
+    errores = []
+    with transaction.atomic():
+        stock = dict(
+            Insumo.objects.select_for_update()
+            .filter(pk__in=ids).order_by('pk')
+            .values_list('pk', 'stock_actual')
+        )
+        diferencias = defaultdict(int)
+        registro = []
+        for indice, datos in enumerate(movimientos):
+            insumo_id = datos['insumo']
+            if insumo_id not in stock:
+                errores.append({'indice': indice, 'insumo': insumo_id, 'error': 'El insumo no existe.'})
+                continue
+            cambio = SIGNO[datos['tipo']] * datos['cantidad']
+            if stock[insumo_id] + cambio < 0:
+                errores.append({
+                    'indice': indice,
+                    'insumo': insumo_id,
+                    'error': f'Stock insuficiente: disponible {stock[insumo_id]}.',
+                })
+                continue
+            stock[insumo_id] += cambio
+            diferencias[insumo_id] += cambio
+            registro.append(Movimiento(
+                insumo_id=insumo_id,
+                **{campo: valor for campo, valor in datos.items() if campo != 'insumo'}
+            ))
+
+        if errores and not parcial:
+            return {'aplicados': 0, 'errores': errores}
+
+        ahora = timezone.now()
+        cambiados = [(i, d) for i, d in sorted(diferencias.items()) if d]
+        for inicio in range(0, len(cambiados), TAMANO_BLOQUE):
+            bloque = cambiados[inicio:inicio + TAMANO_BLOQUE]
+            Insumo.objects.filter(pk__in=[i for i, _ in bloque]).update(
+                stock_actual=Case(
+                    *[When(pk=i, then=F('stock_actual') + d) for i, d in bloque],
+                    output_field=DecimalField(max_digits=10, decimal_places=2),
+                ),
+                fecha_actualizacion=ahora,
+            )
+        Movimiento.objects.bulk_create(registro, batch_size=1000)
+        if registro:
+            valoracion.aplicar(registro)
+            evaluar_alertas(i for i, _ in cambiados)
+            incrementar_version(VERSION_INVENTARIO)
+
+    return {'aplicados': len(registro), 'errores': errores}
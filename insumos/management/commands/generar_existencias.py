@@ -0,0 +1,29 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from insumos.existencias import generar
+
+
+class Command(BaseCommand):
+    help = 'Genera los cierres diarios de stock posteriores al último cierre'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hasta', help='Último día a cerrar (AAAA-MM-DD). Por defecto, ayer.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            hasta = datetime.date.fromisoformat(options['hasta']) if options['hasta'] else None
+        except ValueError:
+            raise CommandError('La fecha debe tener formato AAAA-MM-DD')
+
+        try:
+            resultado = generar(hasta)
+        except ValueError as error:
+            raise CommandError(str(error))
+        desde = resultado['desde'] or 'el inicio'
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado["cierres"]} cierre(s) generado(s) desde {desde} hasta {resultado["hasta"]}'
+        ))
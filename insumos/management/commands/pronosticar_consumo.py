@@ -0,0 +1,33 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from insumos.pronosticos import DIAS_HISTORIA, PLAZO_ENTREGA, calcular
+
+
+class Command(BaseCommand):
+    help = 'Pronostica el consumo diario, el punto de reorden y los días de cobertura de los insumos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--historia', type=int, default=DIAS_HISTORIA,
+            help=f'Días de historia de consumo (por defecto {DIAS_HISTORIA})'
+        )
+        parser.add_argument(
+            '--plazo', type=int, default=PLAZO_ENTREGA,
+            help=f'Plazo de entrega en días (por defecto {PLAZO_ENTREGA})'
+        )
+        parser.add_argument(
+            '--hasta', help='Último día de historia (AAAA-MM-DD). Por defecto, ayer.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            hasta = datetime.date.fromisoformat(options['hasta']) if options['hasta'] else None
+        except ValueError:
+            raise CommandError('La fecha debe tener formato AAAA-MM-DD')
+        if options['historia'] < 1 or options['plazo'] < 1:
+            raise CommandError('La historia y el plazo deben ser de al menos un día')
+
+        total = calcular(options['historia'], options['plazo'], hasta)
+        self.stdout.write(self.style.SUCCESS(f'{total} insumo(s) pronosticado(s)'))
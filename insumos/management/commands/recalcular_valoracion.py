@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from insumos.valoracion import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye las capas FIFO y el costo promedio desde el historial de movimientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--insumo', type=int, action='append', dest='insumos',
+            help='ID de insumo a reconstruir (se puede repetir). Por defecto, todos.'
+        )
+
+    def handle(self, *args, **options):
+        procesados = reconstruir(options['insumos'])
+        self.stdout.write(self.style.SUCCESS(f'{procesados} insumo(s) revalorizado(s)'))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insumos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['-fecha'], name='insumos_mov_fecha_53fb97_idx'),
+        ),
+    ]
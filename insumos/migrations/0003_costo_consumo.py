@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insumos', '0002_indice_paginacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumo',
+            name='costo',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Costo al precio del insumo cuando se registró', max_digits=12),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insumos', '0003_costo_consumo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExistenciaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('stock', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('neto', models.DecimalField(decimal_places=2, help_text='Cambio neto del stock en el día', max_digits=12)),
+                ('insumo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='existencias', to='insumos.insumo')),
+            ],
+            options={
+                'verbose_name': 'Existencia diaria',
+                'verbose_name_plural': 'Existencias diarias',
+                'ordering': ['insumo', 'fecha'],
+                'indexes': [models.Index(fields=['fecha'], name='insumos_exi_fecha_93e99e_idx')],
+                'unique_together': {('insumo', 'fecha')},
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def abrir_alertas(apps, schema_editor):
+    """Alertas de los insumos que ya están fuera de sus umbrales"""
+    Insumo = apps.get_model('insumos', 'Insumo')
+    AlertaStock = apps.get_model('insumos', 'AlertaStock')
+    alertas = []
+    bajos = Insumo.objects.filter(stock_actual__lt=F('stock_minimo'))
+    for pk, stock, minimo in bajos.values_list('pk', 'stock_actual', 'stock_minimo'):
+        alertas.append(AlertaStock(
+            insumo_id=pk, tipo='stock_bajo', stock=stock, umbral=minimo,
+            clave_activa=f'{pk}:stock_bajo',
+        ))
+    sobre = Insumo.objects.filter(stock_actual__gt=F('stock_maximo'))
+    for pk, stock, maximo in sobre.values_list('pk', 'stock_actual', 'stock_maximo'):
+        alertas.append(AlertaStock(
+            insumo_id=pk, tipo='sobre_stock', stock=stock, umbral=maximo,
+            clave_activa=f'{pk}:sobre_stock',
+        ))
+    AlertaStock.objects.bulk_create(alertas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insumos', '0004_existencia_diaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('stock_bajo', 'Stock bajo el mínimo'), ('sobre_stock', 'Stock sobre el máximo')], max_length=20)),
+                ('estado', models.CharField(choices=[('abierta', 'Abierta'), ('reconocida', 'Reconocida'), ('resuelta', 'Resuelta')], default='abierta', max_length=20)),
+                ('stock', models.DecimalField(decimal_places=2, help_text='Stock del insumo cuando se generó la alerta', max_digits=10)),
+                ('umbral', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('clave_activa', models.CharField(blank=True, editable=False, max_length=50, null=True, unique=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_reconocida', models.DateTimeField(blank=True, null=True)),
+                ('fecha_resuelta', models.DateTimeField(blank=True, null=True)),
+                ('insumo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='insumos.insumo')),
+            ],
+            options={
+                'verbose_name': 'Alerta de stock',
+                'verbose_name_plural': 'Alertas de stock',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', '-fecha_creacion'], name='insumos_ale_estado_576698_idx')],
+            },
+        ),
+        migrations.RunPython(abrir_alertas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def valorar_stock(apps, schema_editor):
+    """Valora el stock existente a precio del insumo, en una capa por insumo"""
+    Insumo = apps.get_model('insumos', 'Insumo')
+    CapaCosto = apps.get_model('insumos', 'CapaCosto')
+    ValoracionInsumo = apps.get_model('insumos', 'ValoracionInsumo')
+    valoraciones = []
+    capas = []
+    for pk, stock, precio, creacion in Insumo.objects.values_list(
+        'pk', 'stock_actual', 'precio_unitario', 'fecha_creacion'
+    ).iterator():
+        stock = max(stock, 0)
+        valor = round(stock * precio, 2)
+        valoraciones.append(ValoracionInsumo(
+            insumo_id=pk, cantidad=stock, costo_promedio=precio,
+            valor_promedio=valor, valor_fifo=valor,
+        ))
+        if stock > 0:
+            capas.append(CapaCosto(
+                insumo_id=pk, fecha=creacion, costo_unitario=precio,
+                cantidad_inicial=stock, cantidad_restante=stock,
+            ))
+    ValoracionInsumo.objects.bulk_create(valoraciones, batch_size=1000)
+    CapaCosto.objects.bulk_create(capas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insumos', '0005_alerta_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValoracionInsumo',
+            fields=[
+                ('insumo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='valoracion', serialize=False, to='insumos.insumo')),
+                ('cantidad', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('costo_promedio', models.DecimalField(decimal_places=4, default=0, max_digits=14)),
+                ('valor_promedio', models.DecimalField(decimal_places=2, default=0, help_text='Cantidad por costo promedio ponderado', max_digits=16)),
+                ('valor_fifo', models.DecimalField(decimal_places=2, default=0, help_text='Suma de las capas de costo abiertas', max_digits=16)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Valoración de insumo',
+                'verbose_name_plural': 'Valoraciones de insumos',
+            },
+        ),
+        migrations.CreateModel(
+            name='CapaCosto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('costo_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cantidad_inicial', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('cantidad_restante', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('insumo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capas_costo', to='insumos.insumo')),
+            ],
+            options={
+                'verbose_name': 'Capa de costo',
+                'verbose_name_plural': 'Capas de costo',
+                'ordering': ['insumo', 'fecha', 'id'],
+                'indexes': [models.Index(fields=['insumo', 'fecha'], name='insumos_cap_insumo__e63163_idx')],
+            },
+        ),
+        migrations.RunPython(valorar_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insumos', '0006_valoracion_inventario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='insumo',
+            index=models.Index(fields=['activo', 'fecha_vencimiento'], name='insumos_ins_activo_9f9efe_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insumos', '0007_indice_vencimiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoInsumo',
+            fields=[
+                ('insumo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pronostico', serialize=False, to='insumos.insumo')),
+                ('consumo_diario', models.DecimalField(decimal_places=4, help_text='Consumo diario pronosticado (suavizado exponencial)', max_digits=12)),
+                ('promedio_movil', models.DecimalField(decimal_places=4, help_text='Consumo diario promedio de los últimos días', max_digits=12)),
+                ('desviacion', models.DecimalField(decimal_places=4, help_text='Desviación estándar del consumo diario reciente', max_digits=12)),
+                ('dias_historia', models.IntegerField()),
+                ('plazo_entrega', models.IntegerField(help_text='Días de reposición usados en el cálculo')),
+                ('punto_reorden', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('dias_cobertura', models.DecimalField(blank=True, decimal_places=1, help_text='Días que alcanza el stock al consumo pronosticado; vacío sin consumo', max_digits=10, null=True)),
+                ('fecha_calculo', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Pronóstico de insumo',
+                'verbose_name_plural': 'Pronósticos de insumos',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:38
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def ajustes_con_signo(apps, schema_editor):
+    """
+    Clasifica los ajustes anteriores por el signo de la cantidad registrada: los
+    negativos pasan a ajuste_negativo con la cantidad en valor absoluto.
+    """
+    Movimiento = apps.get_model('insumos', 'Movimiento')
+    ajustes = Movimiento.objects.filter(tipo='ajuste')
+    ajustes.filter(cantidad__lt=0).update(tipo='ajuste_negativo', cantidad=-F('cantidad'))
+    ajustes.update(tipo='ajuste_positivo')
+
+
+def ajustes_sin_signo(apps, schema_editor):
+    Movimiento = apps.get_model('insumos', 'Movimiento')
+    Movimiento.objects.filter(tipo='ajuste_negativo').update(
+        tipo='ajuste', cantidad=-F('cantidad')
+    )
+    Movimiento.objects.filter(tipo='ajuste_positivo').update(tipo='ajuste')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insumos', '0008_pronostico_insumo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimiento',
+            name='tipo',
+            field=models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida'), ('ajuste_positivo', 'Ajuste positivo'), ('ajuste_negativo', 'Ajuste negativo'), ('merma', 'Merma'), ('devolucion', 'Devolución')], max_length=20),
+        ),
+        migrations.RunPython(ajustes_con_signo, ajustes_sin_signo),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from tarea.models import Tarea
 
@@ -96,6 +96,7 @@ class Insumo(models.Model):
         indexes = [
             models.Index(fields=['codigo']),
             models.Index(fields=['categoria', 'activo']),
+            models.Index(fields=['activo', 'fecha_vencimiento']),
         ]
     
     def __str__(self):
@@ -106,7 +107,10 @@ class Insumo(models.Model):
         return self.stock_actual < self.stock_minimo
     
     def valor_inventario(self):
-        """Calcula el valor total del inventario actual"""
+        """Valor del inventario al costo promedio ponderado de sus entradas"""
+        valoracion = getattr(self, 'valoracion', None)
+        if valoracion is not None:
+            return valoracion.valor_promedio
         return self.stock_actual * self.precio_unitario
     
     def consumo_total(self):
@@ -122,7 +126,8 @@ class Movimiento(models.Model):
     TIPO_CHOICES = [
         ('entrada', 'Entrada'),
         ('salida', 'Salida'),
-        ('ajuste', 'Ajuste'),
+        ('ajuste_positivo', 'Ajuste positivo'),
+        ('ajuste_negativo', 'Ajuste negativo'),
         ('merma', 'Merma'),
         ('devolucion', 'Devolución'),
     ]
@@ -160,6 +165,8 @@ class Movimiento(models.Model):
         verbose_name_plural = 'Movimientos'
         indexes = [
             models.Index(fields=['insumo', 'tipo', 'fecha']),
+            # Ordenamiento de la paginación; InnoDB agrega el id al final del índice
+            models.Index(fields=['-fecha']),
         ]
     
     def __str__(self):
@@ -207,6 +214,13 @@ class Consumo(models.Model):
         help_text="Condiciones climáticas durante la aplicación"
     )
     observaciones = models.TextField(blank=True)
+    costo = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text="Costo al precio del insumo cuando se registró"
+    )
     
     class Meta:
         ordering = ['-fecha_consumo']
@@ -222,4 +236,208 @@ class Consumo(models.Model):
     
     def costo_consumo(self):
         """Calcula el costo del consumo"""
-        return self.cantidad * self.insumo.precio_unitario
\ No newline at end of file
+        return self.cantidad * self.insumo.precio_unitario
+    
+    @classmethod
+    def expresion_costo(cls):
+        """costo_consumo() como expresión, para recalcular en la base de datos"""
+        precio = Insumo.objects.filter(pk=models.OuterRef('insumo_id')).values('precio_unitario')
+        return models.ExpressionWrapper(
+            models.F('cantidad') * models.Subquery(precio),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        )
+    
+    def save(self, *args, **kwargs):
+        self.costo = round(self.costo_consumo(), 2)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'cantidad', 'insumo'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'costo'}
+        # El costo de la tarea se actualiza en las señales dentro de la misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class ExistenciaDiaria(models.Model):
+    """Stock de un insumo al cierre de cada día con movimientos (ver insumos/existencias.py)"""
+    
+    insumo = models.ForeignKey(
+        Insumo,
+        on_delete=models.CASCADE,
+        related_name='existencias'
+    )
+    fecha = models.DateField()
+    stock = models.DecimalField(max_digits=12, decimal_places=2)
+    neto = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        help_text="Cambio neto del stock en el día"
+    )
+    
+    class Meta:
+        ordering = ['insumo', 'fecha']
+        verbose_name = 'Existencia diaria'
+        verbose_name_plural = 'Existencias diarias'
+        unique_together = ['insumo', 'fecha']
+        indexes = [
+            models.Index(fields=['fecha']),
+        ]
+    
+    def __str__(self):
+        return f"{self.insumo_id} - {self.fecha}: {self.stock}"
+
+
+class AlertaStock(models.Model):
+    """Alerta de stock bajo el mínimo o sobre el máximo de un insumo (ver insumos/alertas.py)"""
+    
+    TIPO_CHOICES = [
+        ('stock_bajo', 'Stock bajo el mínimo'),
+        ('sobre_stock', 'Stock sobre el máximo'),
+    ]
+    
+    ESTADO_CHOICES = [
+        ('abierta', 'Abierta'),
+        ('reconocida', 'Reconocida'),
+        ('resuelta', 'Resuelta'),
+    ]
+    
+    insumo = models.ForeignKey(
+        Insumo,
+        on_delete=models.CASCADE,
+        related_name='alertas'
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='abierta')
+    stock = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text="Stock del insumo cuando se generó la alerta"
+    )
+    umbral = models.DecimalField(max_digits=10, decimal_places=2)
+    # "insumo:tipo" mientras la alerta no esté resuelta: una sola alerta activa por insumo y tipo
+    clave_activa = models.CharField(
+        max_length=50,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_reconocida = models.DateTimeField(null=True, blank=True)
+    fecha_resuelta = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-fecha_creacion']
+        verbose_name = 'Alerta de stock'
+        verbose_name_plural = 'Alertas de stock'
+        indexes = [
+            models.Index(fields=['estado', '-fecha_creacion']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.insumo_id} ({self.get_estado_display()})"
+    
+    @staticmethod
+    def clave(insumo_id, tipo):
+        return f'{insumo_id}:{tipo}'
+
+
+class CapaCosto(models.Model):
+    """Capa de costo FIFO: cantidad aún en inventario de una entrada a un costo dado"""
+    
+    insumo = models.ForeignKey(
+        Insumo,
+        on_delete=models.CASCADE,
+        related_name='capas_costo'
+    )
+    fecha = models.DateTimeField()
+    costo_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+    cantidad_inicial = models.DecimalField(max_digits=12, decimal_places=2)
+    cantidad_restante = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    class Meta:
+        ordering = ['insumo', 'fecha', 'id']
+        verbose_name = 'Capa de costo'
+        verbose_name_plural = 'Capas de costo'
+        indexes = [
+            models.Index(fields=['insumo', 'fecha']),
+        ]
+    
+    def __str__(self):
+        return f"{self.insumo_id}: {self.cantidad_restante} a {self.costo_unitario}"
+
+
+class ValoracionInsumo(models.Model):
+    """Valoración mantenida de un insumo: costo promedio ponderado y valor FIFO"""
+    
+    insumo = models.OneToOneField(
+        Insumo,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='valoracion'
+    )
+    cantidad = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    costo_promedio = models.DecimalField(max_digits=14, decimal_places=4, default=0)
+    valor_promedio = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        help_text="Cantidad por costo promedio ponderado"
+    )
+    valor_fifo = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        help_text="Suma de las capas de costo abiertas"
+    )
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Valoración de insumo'
+        verbose_name_plural = 'Valoraciones de insumos'
+    
+    def __str__(self):
+        return f"{self.insumo_id}: {self.cantidad} a {self.costo_promedio}"
+
+
+class PronosticoInsumo(models.Model):
+    """Pronóstico de consumo diario, punto de reorden y días de cobertura de un insumo"""
+    
+    insumo = models.OneToOneField(
+        Insumo,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='pronostico'
+    )
+    consumo_diario = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        help_text="Consumo diario pronosticado (suavizado exponencial)"
+    )
+    promedio_movil = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        help_text="Consumo diario promedio de los últimos días"
+    )
+    desviacion = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        help_text="Desviación estándar del consumo diario reciente"
+    )
+    dias_historia = models.IntegerField()
+    plazo_entrega = models.IntegerField(help_text="Días de reposición usados en el cálculo")
+    punto_reorden = models.DecimalField(max_digits=12, decimal_places=2)
+    dias_cobertura = models.DecimalField(
+        max_digits=10,
+        decimal_places=1,
+        null=True,
+        blank=True,
+        help_text="Días que alcanza el stock al consumo pronosticado; vacío sin consumo"
+    )
+    fecha_calculo = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Pronóstico de insumo'
+        verbose_name_plural = 'Pronósticos de insumos'
+    
+    def __str__(self):
+        return f"{self.insumo_id}: {self.consumo_diario}/día, reorden {self.punto_reorden}"
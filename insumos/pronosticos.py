@@ -0,0 +1,203 @@
+"""
+Pronóstico de consumo, punto de reorden y días de cobertura de los insumos.
+
+El consumo diario de cada insumo es la suma de sus Consumo y de sus movimientos
+de salida de cada día. Se lee en una sola consulta (la unión de las dos tablas
+agrupadas por insumo y día, ordenada por insumo) y se recorre por bloques de
+insumos: cada bloque es una matriz insumos × días de NumPy sobre la que se
+ajustan a la vez, con operaciones vectorizadas:
+- el suavizado exponencial simple, como producto de la matriz por los pesos
+  alfa·(1 - alfa)^k (sin recorrer los días);
+- el promedio móvil y la desviación estándar de los últimos días.
+Los días anteriores a la creación del insumo no cuentan como consumo cero.
+
+El punto de reorden cubre el consumo pronosticado durante el plazo de entrega
+más un stock de seguridad Z·σ·√plazo; los días de cobertura son stock / consumo
+pronosticado. El resultado se guarda en PronosticoInsumo, que el listado de
+insumos une con select_related.
+"""
+import datetime
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from config.bd import guardar_por_clave
+
+from .models import Consumo, Insumo, Movimiento, PronosticoInsumo
+
+DIAS_HISTORIA = 3 * 365
+PLAZO_ENTREGA = 7
+ALFA = 0.1
+VENTANA_PROMEDIO = 28
+VENTANA_DESVIACION = 90
+# Nivel de servicio del 95%
+Z_SERVICIO = 1.65
+# Tope de los días de cobertura cuando el consumo pronosticado es casi nulo
+MAX_COBERTURA = 36500
+TAMANO_BLOQUE = 2000
+TAMANO_LECTURA = 5000
+
+
+def _consumo_diario(desde, hasta):
+    """Filas (insumo_id, dia, cantidad) de consumos y salidas en [desde, hasta], por insumo"""
+    inicio = timezone.make_aware(datetime.datetime.combine(desde, datetime.time.min))
+    fin = timezone.make_aware(
+        datetime.datetime.combine(hasta + datetime.timedelta(days=1), datetime.time.min)
+    )
+    consumos = (
+        Consumo.objects.filter(fecha_consumo__gte=inicio, fecha_consumo__lt=fin)
+        .annotate(dia=TruncDate('fecha_consumo'))
+        .values('insumo_id', 'dia').annotate(total=Sum('cantidad')).order_by()
+        .values_list('insumo_id', 'dia', 'total')
+    )
+    salidas = (
+        Movimiento.objects.filter(tipo='salida', fecha__gte=inicio, fecha__lt=fin)
+        .annotate(dia=TruncDate('fecha'))
+        .values('insumo_id', 'dia').annotate(total=Sum('cantidad')).order_by()
+        .values_list('insumo_id', 'dia', 'total')
+    )
+    return consumos.union(salidas, all=True).order_by('insumo_id')
+
+
+def _tandas(desde, hasta):
+    """
+    Lee la consulta por tandas como arreglos (insumos, columnas, cantidades),
+    donde la columna es el número de días desde `desde`. Se usa el cursor
+    directamente: convertir millones de filas a date y Decimal con el ORM
+    cuesta más que la consulta.
+    """
+    consulta = _consumo_diario(desde, hasta)
+    sql, params = consulta.query.get_compiler(consulta.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            filas = cursor.fetchmany(TAMANO_LECTURA)
+            if not filas:
+                break
+            insumos, dias, cantidades = zip(*filas)
+            if isinstance(dias[0], str):
+                # SQLite retorna las fechas como texto AAAA-MM-DD
+                columnas = np.array(dias, dtype='datetime64[D]') - np.datetime64(desde)
+            else:
+                columnas = np.fromiter(
+                    (dia.toordinal() for dia in dias), dtype=np.int64, count=len(dias)
+                ) - desde.toordinal()
+            yield np.array(insumos), columnas.astype(np.int64), np.array(cantidades, dtype=float)
+
+
+def _por_bloques(tandas, ids, tamano):
+    """Reparte las tandas, ordenadas por insumo, entre bloques consecutivos de `ids`"""
+    pendiente = next(tandas, None)
+    for inicio in range(0, len(ids), tamano):
+        bloque = ids[inicio:inicio + tamano]
+        partes = [[np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)]]
+        while pendiente is not None:
+            corte = np.searchsorted(pendiente[0], bloque[-1], side='right')
+            partes.append([columna[:corte] for columna in pendiente])
+            if corte < len(pendiente[0]):
+                pendiente = [columna[corte:] for columna in pendiente]
+                break
+            pendiente = next(tandas, None)
+        yield inicio, bloque, [np.concatenate(columna) for columna in zip(*partes)]
+
+
+def ajustar(matriz, inicios):
+    """
+    Ajusta los modelos sobre la matriz de consumo (insumos × días, el último
+    día al final). `inicios` es el primer día con historia de cada fila.
+    Retorna (suavizado, promedio_movil, desviacion) por fila.
+    """
+    filas, dias = matriz.shape
+    indices = np.arange(filas)
+
+    # Suavizado exponencial con nivel inicial igual al primer día de historia:
+    # nivel = Σ alfa·(1-alfa)^(T-1-t)·x_t + (1-alfa)^(T-inicio)·x_inicio
+    pesos = ALFA * (1 - ALFA) ** (dias - 1 - np.arange(dias))
+    suavizado = matriz @ pesos + (1 - ALFA) ** (dias - inicios) * matriz[indices, inicios]
+
+    historia = dias - inicios
+    ventana = matriz[:, -VENTANA_PROMEDIO:]
+    promedio = ventana.sum(axis=1) / np.minimum(historia, ventana.shape[1])
+
+    ventana = matriz[:, -VENTANA_DESVIACION:]
+    validos = (dias - ventana.shape[1] + np.arange(ventana.shape[1]))[None, :] >= inicios[:, None]
+    n = validos.sum(axis=1)
+    media = ventana.sum(axis=1) / n
+    desviacion = np.sqrt((((ventana - media[:, None]) ** 2) * validos).sum(axis=1) / n)
+    return suavizado, promedio, desviacion
+
+
+def _decimal(valor, decimales):
+    return Decimal(f'{valor:.{decimales}f}')
+
+
+def calcular(dias_historia=DIAS_HISTORIA, plazo=PLAZO_ENTREGA, hasta=None):
+    """
+    Pronostica el consumo de los insumos activos con la historia hasta `hasta`
+    (por defecto, ayer) y guarda PronosticoInsumo. Retorna el número de insumos.
+    """
+    hasta = hasta or timezone.localdate() - datetime.timedelta(days=1)
+    desde = hasta - datetime.timedelta(days=dias_historia - 1)
+    insumos = list(
+        Insumo.objects.filter(activo=True).order_by('pk')
+        .values_list('pk', 'stock_actual', 'fecha_creacion')
+    )
+    if not insumos:
+        return 0
+    ids, stocks, creaciones = zip(*insumos)
+    ids = np.array(ids)
+    stocks = np.array(stocks, dtype=float)
+    # Primer día con historia: la creación del insumo, dentro del rango
+    primeros = np.array(
+        [(timezone.localdate(creacion) - desde).days for creacion in creaciones]
+    )
+    historia = np.clip(dias_historia - primeros, 0, dias_historia)
+    inicios = np.clip(primeros, 0, dias_historia - 1)
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        tandas = _por_bloques(_tandas(desde, hasta), ids, TAMANO_BLOQUE)
+        for inicio, bloque, (insumo_ids, columnas, cantidades) in tandas:
+            matriz = np.zeros((len(bloque), dias_historia))
+            posiciones = np.searchsorted(bloque, insumo_ids)
+            # Los insumos inactivos no tienen fila en el bloque
+            existe = bloque[np.minimum(posiciones, len(bloque) - 1)] == insumo_ids
+            np.add.at(matriz, (posiciones[existe], columnas[existe]), cantidades[existe])
+
+            fin = inicio + len(bloque)
+            suavizado, promedio, desviacion = ajustar(matriz, inicios[inicio:fin])
+            punto = suavizado * plazo + Z_SERVICIO * desviacion * np.sqrt(plazo)
+            demanda = np.round(suavizado, 4)
+            cobertura = np.full(len(bloque), np.nan)
+            np.divide(stocks[inicio:fin], demanda, out=cobertura, where=demanda > 0)
+            cobertura = np.minimum(cobertura, MAX_COBERTURA)
+
+            guardar_por_clave(
+                PronosticoInsumo,
+                [
+                    PronosticoInsumo(
+                        insumo_id=int(bloque[i]),
+                        consumo_diario=_decimal(demanda[i], 4),
+                        promedio_movil=_decimal(promedio[i], 4),
+                        desviacion=_decimal(desviacion[i], 4),
+                        dias_historia=int(historia[inicio + i]),
+                        plazo_entrega=plazo,
+                        punto_reorden=_decimal(punto[i], 2),
+                        dias_cobertura=(
+                            None if np.isnan(cobertura[i]) else _decimal(cobertura[i], 1)
+                        ),
+                        fecha_calculo=ahora,
+                    )
+                    for i in range(len(bloque))
+                ],
+                'insumo',
+                [
+                    'consumo_diario', 'promedio_movil', 'desviacion', 'dias_historia',
+                    'plazo_entrega', 'punto_reorden', 'dias_cobertura', 'fecha_calculo',
+                ],
+            )
+    return len(ids)
@@ -0,0 +1,66 @@
+"""
+Resumen del inventario de insumos.
+
+Se calcula con una sola consulta agrupada por categoría (número de insumos,
+valor del stock al costo promedio de insumos/valoracion.py y cuántos tienen una
+alerta de stock bajo activa, la misma fuente que el listado de alertas) y se
+guarda en la caché con la versión de datos 'inventario' en la clave. Las señales de Insumo, Movimiento y
+Consumo incrementan la versión, así que mientras no cambie el inventario cada
+carga del resumen es una lectura de la caché.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Sum
+from django.db.models.functions import Coalesce
+
+from config.versiones import version_datos
+
+from .models import AlertaStock, Insumo
+
+VERSION_INVENTARIO = 'inventario'
+
+# La versión invalida el resumen; el tiempo solo limita claves huérfanas
+DURACION_CACHE = 24 * 60 * 60
+
+
+def calcular_resumen():
+    """Retorna los totales del inventario y su desglose por categoría"""
+    filas = (
+        Insumo.objects.order_by('categoria').values('categoria')
+        .annotate(
+            total_insumos=Count('id'),
+            valor_inventario=Sum(
+                Coalesce(
+                    F('valoracion__valor_promedio'),
+                    F('stock_actual') * F('precio_unitario'),
+                    output_field=DecimalField(max_digits=20, decimal_places=2)
+                ),
+                output_field=DecimalField(max_digits=20, decimal_places=2)
+            ),
+            insumos_bajo_stock=Count('id', filter=Exists(
+                AlertaStock.objects.filter(
+                    insumo=OuterRef('pk'), tipo='stock_bajo', clave_activa__isnull=False
+                )
+            )),
+        )
+    )
+    por_categoria = [
+        {**fila, 'valor_inventario': fila['valor_inventario'] or Decimal('0')} for fila in filas
+    ]
+    return {
+        'total_insumos': sum(c['total_insumos'] for c in por_categoria),
+        'valor_total_inventario': sum((c['valor_inventario'] for c in por_categoria), Decimal('0')),
+        'insumos_bajo_stock': sum(c['insumos_bajo_stock'] for c in por_categoria),
+        'por_categoria': por_categoria,
+    }
+
+
+def obtener_resumen():
+    """Retorna el resumen desde la caché o lo calcula si cambió el inventario"""
+    clave = f'resumen-inventario:{version_datos(VERSION_INVENTARIO)}'
+    resumen = cache.get(clave)
+    if resumen is None:
+        resumen = calcular_resumen()
+        cache.set(clave, resumen, DURACION_CACHE)
+    return resumen
@@ -1,30 +1,118 @@
+from decimal import Decimal
+
 from rest_framework import serializers
-from .models import Insumo, Movimiento, Consumo
+from .kardex import StockInsuficiente, registrar_movimiento
+from .models import Insumo, Movimiento, Consumo, AlertaStock, PronosticoInsumo
+
+class PronosticoInsumoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PronosticoInsumo
+        exclude = ['insumo']
+
 
 class InsumoSerializer(serializers.ModelSerializer):
+    pronostico = PronosticoInsumoSerializer(read_only=True)
+
     class Meta:
         model = Insumo
         fields = '__all__'
 
+    def validate_stock_actual(self, value):
+        # Después de crear el insumo el stock solo cambia con movimientos (kardex)
+        if self.instance is not None and value != self.instance.stock_actual:
+            raise serializers.ValidationError(
+                "El stock se modifica registrando movimientos de inventario."
+            )
+        return value
+
+
+CANTIDAD_MINIMA = Decimal('0.01')
+# Tipo anterior a los ajustes con signo; se sigue aceptando al registrar movimientos
+TIPO_AJUSTE = 'ajuste'
+TIPOS_ADMITIDOS = [
+    *Movimiento.TIPO_CHOICES, (TIPO_AJUSTE, 'Ajuste (el signo de la cantidad lo define)')
+]
+
+
+def normalizar_ajuste(data):
+    """
+    Convierte `tipo=ajuste` en ajuste_positivo o ajuste_negativo según el signo de
+    la cantidad, que queda en valor absoluto. Valida la cantidad mínima.
+    """
+    if data['tipo'] == TIPO_AJUSTE:
+        data['tipo'] = 'ajuste_negativo' if data['cantidad'] < 0 else 'ajuste_positivo'
+        data['cantidad'] = abs(data['cantidad'])
+    if data['cantidad'] < CANTIDAD_MINIMA:
+        raise serializers.ValidationError(
+            {'cantidad': [f'Asegúrese de que este valor es mayor o igual a {CANTIDAD_MINIMA}.']}
+        )
+    return data
+
 
 class MovimientoSerializer(serializers.ModelSerializer):
+    tipo = serializers.ChoiceField(choices=TIPOS_ADMITIDOS)
+    cantidad = serializers.DecimalField(max_digits=10, decimal_places=2)
+
     class Meta:
         model = Movimiento
         fields = '__all__'
 
     def validate(self, data):
-        insumo = data["insumo"]
-        tipo = data["tipo"]
-        cantidad = data["cantidad"]
+        return normalizar_ajuste(data)
+
+    def create(self, validated_data):
+        # El stock se valida y descuenta en la misma sentencia, sin lecturas previas
+        try:
+            return registrar_movimiento(**validated_data)
+        except StockInsuficiente as error:
+            raise serializers.ValidationError(str(error))
+
 
-        if tipo == "salida" and cantidad > insumo.stock_actual:
+class MovimientoLoteItemSerializer(serializers.Serializer):
+    insumo = serializers.IntegerField()
+    tipo = serializers.ChoiceField(choices=TIPOS_ADMITIDOS)
+    cantidad = serializers.DecimalField(max_digits=10, decimal_places=2)
+    descripcion = serializers.CharField()
+    documento_referencia = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    costo_unitario = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False, allow_null=True
+    )
+    responsable = serializers.CharField(max_length=200)
+
+    def validate(self, data):
+        return normalizar_ajuste(data)
+
+
+class MovimientoLoteSerializer(serializers.Serializer):
+    """Lote de movimientos de varios insumos que se aplican en una sola transacción"""
+    MAX_MOVIMIENTOS = 5000
+
+    movimientos = MovimientoLoteItemSerializer(many=True, allow_empty=False)
+
+    def validate_movimientos(self, value):
+        if len(value) > self.MAX_MOVIMIENTOS:
             raise serializers.ValidationError(
-                "No hay suficiente stock disponible para realizar la salida."
+                f'Máximo {self.MAX_MOVIMIENTOS} movimientos por solicitud.'
             )
-        return data
+        return value
 
 
 class ConsumoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Consumo
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class AlertaStockSerializer(serializers.ModelSerializer):
+    insumo_codigo = serializers.CharField(source='insumo.codigo', read_only=True)
+    insumo_nombre = serializers.CharField(source='insumo.nombre', read_only=True)
+
+    class Meta:
+        model = AlertaStock
+        fields = '__all__'
+
+
+class ReconocerAlertasSerializer(serializers.Serializer):
+    alertas = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from config.versiones import incrementar_version
+
+from . import valoracion
+from .alertas import evaluar as evaluar_alertas
+from .models import Consumo, Insumo, Movimiento
+from .resumen import VERSION_INVENTARIO
+
+
+@receiver(post_save, sender=Insumo)
+def evaluar_alertas_insumo(sender, instance, **kwargs):
+    """Abre o resuelve alertas al crear el insumo o cambiar sus umbrales"""
+    evaluar_alertas([instance.pk])
+
+
+@receiver(post_save, sender=Insumo)
+def inicializar_valoracion(sender, instance, created, **kwargs):
+    """Abre la valoración del insumo nuevo con su stock inicial"""
+    if created:
+        valoracion.inicializar(instance)
+
+
+@receiver(post_save, sender=Insumo)
+@receiver(post_delete, sender=Insumo)
+@receiver(post_save, sender=Movimiento)
+@receiver(post_delete, sender=Movimiento)
+@receiver(post_save, sender=Consumo)
+@receiver(post_delete, sender=Consumo)
+def invalidar_resumen(sender, instance, **kwargs):
+    """Invalida el resumen del inventario en caché"""
+    incrementar_version(VERSION_INVENTARIO)
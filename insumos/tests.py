@@ -1,3 +1,558 @@
-from django.test import TestCase
+import datetime
+import random
+import threading
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from config.versiones import version_datos
+
+from . import existencias, pronosticos, valoracion
+from .kardex import SIGNO, StockInsuficiente, registrar_movimiento, registrar_movimientos
+from .models import (
+    AlertaStock, CapaCosto, Insumo, Movimiento, PronosticoInsumo, ValoracionInsumo
+)
+from .resumen import VERSION_INVENTARIO, calcular_resumen
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class KardexConcurrenciaTests(TransactionTestCase):
+    """Escritores en paralelo nunca dejan el stock negativo ni pierden movimientos"""
+    HILOS = 8
+
+    def crear_insumo(self, codigo, stock):
+        return Insumo.objects.create(
+            codigo=codigo, nombre=f'Insumo {codigo}', categoria='fertilizante',
+            stock_actual=stock, stock_minimo=0, precio_unitario=1
+        )
+
+    def en_paralelo(self, tarea):
+        """Ejecuta `tarea(numero_hilo)` en HILOS hilos a la vez; retorna sus excepciones"""
+        barrera = threading.Barrier(self.HILOS)
+        errores = []
+
+        def ejecutar(numero):
+            try:
+                barrera.wait()
+                tarea(numero)
+            except Exception as error:
+                errores.append(error)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=ejecutar, args=(n,)) for n in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return errores
+
+    def test_salidas_concurrentes_no_sobrevenden(self):
+        insumo = self.crear_insumo('C-1', 100)
+        aplicadas = []
+
+        def retirar(numero):
+            for _ in range(25):
+                try:
+                    registrar_movimiento(
+                        insumo.pk, 'salida', Decimal('1'),
+                        descripcion='Retiro', responsable=f'Hilo {numero}'
+                    )
+                    aplicadas.append(numero)
+                except StockInsuficiente:
+                    pass
+
+        self.assertEqual(self.en_paralelo(retirar), [])
+        insumo.refresh_from_db()
+        # 8 hilos x 25 retiros = 200 solicitudes sobre 100 unidades
+        self.assertEqual(len(aplicadas), 100)
+        self.assertEqual(insumo.stock_actual, 0)
+        self.assertEqual(Movimiento.objects.filter(insumo=insumo).count(), 100)
+
+    def test_lotes_concurrentes_cuadran_con_los_movimientos(self):
+        insumos = [self.crear_insumo(f'L-{i}', 40) for i in range(5)]
+
+        def enviar_lotes(numero):
+            azar = random.Random(numero)
+            for _ in range(10):
+                # Mismos insumos en distinto orden en cada hilo
+                lote = [
+                    {'insumo': insumo.pk, 'tipo': azar.choice(['salida', 'salida', 'merma', 'entrada']),
+                     'cantidad': Decimal(azar.randint(1, 3)), 'descripcion': 'Lote',
+                     'responsable': f'Hilo {numero}'}
+                    for insumo in azar.sample(insumos, len(insumos))
+                ]
+                registrar_movimientos(lote, parcial=True)
+
+        self.assertEqual(self.en_paralelo(enviar_lotes), [])
+        for insumo in insumos:
+            insumo.refresh_from_db()
+            self.assertGreaterEqual(insumo.stock_actual, 0)
+            movimientos = Movimiento.objects.filter(insumo=insumo)
+            saldo = Decimal(40) + sum(
+                (m.cantidad if m.tipo == 'entrada' else -m.cantidad for m in movimientos),
+                Decimal(0)
+            )
+            self.assertEqual(insumo.stock_actual, saldo)
+
+
+class KardexTests(TestCase):
+
+    def crear_insumo(self, codigo, stock):
+        return Insumo.objects.create(
+            codigo=codigo, nombre=f'Insumo {codigo}', categoria='fertilizante',
+            stock_actual=stock, stock_minimo=0, precio_unitario=1
+        )
+
+    def test_lote_sin_parcial_es_todo_o_nada(self):
+        insumo = self.crear_insumo('T-1', 5)
+        resultado = registrar_movimientos([
+            {'insumo': insumo.pk, 'tipo': 'salida', 'cantidad': Decimal('3'),
+             'descripcion': 'a', 'responsable': 'r'},
+            {'insumo': insumo.pk, 'tipo': 'salida', 'cantidad': Decimal('3'),
+             'descripcion': 'b', 'responsable': 'r'},
+        ])
+        self.assertEqual(resultado['aplicados'], 0)
+        self.assertEqual(resultado['errores'][0]['indice'], 1)
+        insumo.refresh_from_db()
+        self.assertEqual(insumo.stock_actual, 5)
+        self.assertFalse(Movimiento.objects.exists())
+
+    def test_movimiento_individual(self):
+        insumo = self.crear_insumo('T-2', 5)
+        registrar_movimiento(insumo, 'entrada', Decimal('4'), descripcion='Compra', responsable='r')
+        registrar_movimiento(insumo, 'salida', Decimal('6'), descripcion='Uso', responsable='r')
+        insumo.refresh_from_db()
+        self.assertEqual(insumo.stock_actual, 3)
+        with self.assertRaises(StockInsuficiente):
+            registrar_movimiento(insumo, 'merma', Decimal('3.01'), descripcion='Daño', responsable='r')
+        insumo.refresh_from_db()
+        self.assertEqual(insumo.stock_actual, 3)
+        self.assertEqual(Movimiento.objects.filter(insumo=insumo).count(), 2)
+
+    def test_ajustes_suben_y_bajan_el_stock(self):
+        insumo = self.crear_insumo('T-3', 10)
+        registrar_movimiento(insumo, 'ajuste_negativo', Decimal('2.5'),
+                             descripcion='Conteo físico', responsable='r')
+        insumo.refresh_from_db()
+        self.assertEqual(insumo.stock_actual, Decimal('7.5'))
+        registrar_movimiento(insumo, 'ajuste_positivo', Decimal('0.5'),
+                             descripcion='Conteo físico', responsable='r')
+        insumo.refresh_from_db()
+        self.assertEqual(insumo.stock_actual, 8)
+        with self.assertRaises(StockInsuficiente):
+            registrar_movimiento(insumo, 'ajuste_negativo', Decimal('9'),
+                                 descripcion='Conteo físico', responsable='r')
+
+    def test_tipo_ajuste_se_clasifica_por_el_signo(self):
+        insumo = self.crear_insumo('T-7', 10)
+        for cantidad, tipo in [('-2.5', 'ajuste_negativo'), ('4', 'ajuste_positivo')]:
+            respuesta = self.client.post('/api/inventario/movimientos/', {
+                'insumo': insumo.pk, 'tipo': 'ajuste', 'cantidad': cantidad,
+                'descripcion': 'Conteo físico', 'responsable': 'r'
+            }, content_type='application/json')
+            self.assertEqual(respuesta.status_code, 201)
+            self.assertEqual(respuesta.json()['tipo'], tipo)
+            self.assertEqual(Decimal(respuesta.json()['cantidad']), abs(Decimal(cantidad)))
+        respuesta = self.client.post('/api/inventario/movimientos/lote/', {'movimientos': [
+            {'insumo': insumo.pk, 'tipo': 'ajuste', 'cantidad': '-1.5',
+             'descripcion': 'Conteo físico', 'responsable': 'r'},
+        ]}, content_type='application/json')
+        self.assertEqual(respuesta.json()['aplicados'], 1)
+        insumo.refresh_from_db()
+        self.assertEqual(insumo.stock_actual, 10)
+        for tipo, cantidad in [('ajuste', '0'), ('salida', '-1')]:
+            respuesta = self.client.post('/api/inventario/movimientos/', {
+                'insumo': insumo.pk, 'tipo': tipo, 'cantidad': cantidad,
+                'descripcion': 'Conteo físico', 'responsable': 'r'
+            }, content_type='application/json')
+            self.assertEqual(respuesta.status_code, 400)
+            self.assertIn('cantidad', respuesta.json())
+
+    def test_lote_aplica_en_orden(self):
+        insumos = [self.crear_insumo('T-4', 2), self.crear_insumo('T-5', 0)]
+        resultado = registrar_movimientos([
+            {'insumo': insumos[0].pk, 'tipo': 'salida', 'cantidad': Decimal('2'),
+             'descripcion': 'a', 'responsable': 'r'},
+            # Solo es válido porque la entrada anterior del lote ya sumó
+            {'insumo': insumos[1].pk, 'tipo': 'entrada', 'cantidad': Decimal('3'),
+             'descripcion': 'b', 'responsable': 'r'},
+            {'insumo': insumos[1].pk, 'tipo': 'ajuste_negativo', 'cantidad': Decimal('1'),
+             'descripcion': 'c', 'responsable': 'r'},
+        ])
+        self.assertEqual(resultado, {'aplicados': 3, 'errores': []})
+        for insumo, stock in zip(insumos, [0, 2]):
+            insumo.refresh_from_db()
+            self.assertEqual(insumo.stock_actual, stock)
+
+    def test_lote_parcial_aplica_los_validos(self):
+        insumo = self.crear_insumo('T-6', 5)
+        resultado = registrar_movimientos([
+            {'insumo': insumo.pk, 'tipo': 'salida', 'cantidad': Decimal('3'),
+             'descripcion': 'a', 'responsable': 'r'},
+            {'insumo': insumo.pk, 'tipo': 'salida', 'cantidad': Decimal('3'),
+             'descripcion': 'b', 'responsable': 'r'},
+            {'insumo': 0, 'tipo': 'entrada', 'cantidad': Decimal('1'),
+             'descripcion': 'c', 'responsable': 'r'},
+            {'insumo': insumo.pk, 'tipo': 'ajuste_negativo', 'cantidad': Decimal('2'),
+             'descripcion': 'd', 'responsable': 'r'},
+        ], parcial=True)
+        self.assertEqual(resultado['aplicados'], 2)
+        self.assertEqual([e['indice'] for e in resultado['errores']], [1, 2])
+        insumo.refresh_from_db()
+        self.assertEqual(insumo.stock_actual, 0)
+        self.assertEqual(
+            list(Movimiento.objects.filter(insumo=insumo).order_by('id').values_list('descripcion', flat=True)),
+            ['a', 'd']
+        )
+
+
+class ExistenciasTests(TestCase):
+    """Los cierres diarios coinciden con reproducir todos los movimientos"""
+
+    def test_cierres_coinciden_con_la_reproduccion_completa(self):
+        hoy = timezone.localdate()
+        insumo = Insumo.objects.create(
+            codigo='E-1', nombre='Urea', categoria='fertilizante',
+            stock_actual=300, stock_minimo=0, precio_unitario=1
+        )
+        azar = random.Random(7)
+        movimientos = []
+        for _ in range(60):
+            dia = hoy - datetime.timedelta(days=azar.randint(0, 12))
+            tipo = azar.choice(['entrada', 'salida', 'merma', 'ajuste_positivo', 'ajuste_negativo'])
+            cantidad = Decimal(azar.randint(1, 4))
+            movimiento = registrar_movimiento(
+                insumo, tipo, cantidad, descripcion='Prueba', responsable='r'
+            )
+            hora = datetime.time(azar.randint(0, 23), azar.randint(0, 59))
+            Movimiento.objects.filter(pk=movimiento.pk).update(
+                fecha=timezone.make_aware(datetime.datetime.combine(dia, hora))
+            )
+            movimientos.append((dia, SIGNO[tipo] * cantidad))
+
+        # Dos corridas incrementales: hasta hace una semana y hasta ayer
+        existencias.generar(hoy - datetime.timedelta(days=7))
+        existencias.generar()
+        self.assertEqual(existencias.ultimo_corte(), hoy - datetime.timedelta(days=1))
+
+        insumo.refresh_from_db()
+        desde = hoy - datetime.timedelta(days=14)
+        esperado = []
+        for dias in range(15):
+            dia = desde + datetime.timedelta(days=dias)
+            stock = Decimal(300) + sum((c for d, c in movimientos if d <= dia), Decimal(0))
+            esperado.append({'fecha': dia, 'stock': f'{stock:.2f}'})
+            self.assertEqual(existencias.stock_en_fecha(insumo, dia), stock)
+        self.assertEqual(existencias.serie(insumo, desde, hoy), esperado)
+
+    def test_no_cierra_el_dia_en_curso(self):
+        with self.assertRaises(ValueError):
+            existencias.generar(timezone.localdate())
+        self.assertIsNone(existencias.ultimo_corte())
+
+
+class AlertasTests(APITestCase):
+    """Las alertas se abren, no se duplican y se resuelven con los movimientos del kardex"""
+
+    def setUp(self):
+        self.insumo = Insumo.objects.create(
+            codigo='A-1', nombre='Urea', categoria='fertilizante',
+            stock_actual=20, stock_minimo=10, stock_maximo=50, precio_unitario=1
+        )
+
+    def mover(self, tipo, cantidad):
+        registrar_movimiento(self.insumo, tipo, Decimal(cantidad), descripcion='Prueba', responsable='r')
+
+    def activas(self):
+        return list(
+            AlertaStock.objects.filter(clave_activa__isnull=False).values_list('tipo', flat=True)
+        )
+
+    def test_abre_deduplica_y_resuelve(self):
+        self.assertEqual(self.activas(), [])
+        self.assertEqual(calcular_resumen()['insumos_bajo_stock'], 0)
+
+        self.mover('salida', 12)
+        self.mover('merma', 2)
+        registrar_movimientos([
+            {'insumo': self.insumo.pk, 'tipo': 'salida', 'cantidad': Decimal('1'),
+             'descripcion': 'Lote', 'responsable': 'r'},
+        ])
+        self.assertEqual(self.activas(), ['stock_bajo'])
+        alerta = AlertaStock.objects.get()
+        self.assertEqual((alerta.stock, alerta.umbral), (Decimal('8'), Decimal('10')))
+        self.assertEqual(calcular_resumen()['insumos_bajo_stock'], 1)
+
+        # Reconocida sigue activa y sigue contando en el resumen
+        respuesta = self.client.post(
+            '/api/inventario/alertas/reconocer/', {'alertas': [alerta.pk]}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        alerta.refresh_from_db()
+        self.assertEqual(alerta.estado, 'reconocida')
+        self.assertEqual(calcular_resumen()['insumos_bajo_stock'], 1)
+
+        self.mover('entrada', 46)
+        alerta.refresh_from_db()
+        self.assertEqual(alerta.estado, 'resuelta')
+        self.assertEqual(self.activas(), ['sobre_stock'])
+        self.assertEqual(calcular_resumen()['insumos_bajo_stock'], 0)
+
+        self.mover('ajuste_negativo', 42)
+        self.assertEqual(self.activas(), ['stock_bajo'])
+        self.assertEqual(AlertaStock.objects.filter(tipo='stock_bajo').count(), 2)
+
+
+class ValoracionTests(TestCase):
+
+    def setUp(self):
+        # Stock inicial: una capa de 10 a precio 2
+        self.insumo = Insumo.objects.create(
+            codigo='V-1', nombre='Urea', categoria='fertilizante',
+            stock_actual=10, stock_minimo=0, precio_unitario=2
+        )
+
+    def mover(self, tipo, cantidad, costo=None):
+        registrar_movimiento(
+            self.insumo, tipo, Decimal(cantidad), costo_unitario=costo,
+            descripcion='Prueba', responsable='r'
+        )
+
+    def estado(self):
+        v = ValoracionInsumo.objects.get(insumo=self.insumo)
+        capas = list(
+            CapaCosto.objects.filter(insumo=self.insumo).order_by('fecha', 'id')
+            .values_list('costo_unitario', 'cantidad_restante')
+        )
+        return (v.cantidad, v.costo_promedio, v.valor_promedio, v.valor_fifo), capas
+
+    def test_salida_consume_varias_capas_fifo(self):
+        self.mover('entrada', 5, Decimal('4'))
+        self.mover('entrada', 5, Decimal('6'))
+        self.mover('salida', 12)
+        totales, capas = self.estado()
+        # Quedan 3 a 4 y 5 a 6; el promedio (2·10 + 4·5 + 6·5) / 20 no cambia al salir
+        self.assertEqual(capas, [(Decimal('4'), Decimal('3')), (Decimal('6'), Decimal('5'))])
+        self.assertEqual(totales, (Decimal('8'), Decimal('3.5'), Decimal('28'), Decimal('42')))
+
+        self.mover('ajuste_negativo', 4)
+        totales, capas = self.estado()
+        self.assertEqual(capas, [(Decimal('6'), Decimal('4'))])
+        self.assertEqual(totales[3], Decimal('24'))
+
+    def test_entrada_a_costo_cero(self):
+        registrar_movimientos([
+            {'insumo': self.insumo.pk, 'tipo': 'entrada', 'cantidad': Decimal('10'),
+             'costo_unitario': Decimal('0'), 'descripcion': 'Donación', 'responsable': 'r'},
+        ])
+        totales, capas = self.estado()
+        self.assertEqual(capas, [(Decimal('2'), Decimal('10')), (Decimal('0'), Decimal('10'))])
+        self.assertEqual(totales, (Decimal('20'), Decimal('1'), Decimal('20'), Decimal('20')))
+
+        valoracion.reconstruir([self.insumo.pk])
+        self.assertEqual(self.estado(), (totales, capas))
+
+    def test_reconstruir_coincide_con_la_aplicacion_incremental(self):
+        azar = random.Random(3)
+        for _ in range(40):
+            tipo = azar.choice(['entrada', 'devolucion', 'ajuste_positivo', 'salida', 'merma'])
+            costo = azar.choice([None, Decimal('0'), Decimal(azar.randint(1, 9))])
+            try:
+                self.mover(tipo, azar.randint(1, 6), costo)
+            except StockInsuficiente:
+                pass
+        incremental = self.estado()
+        self.insumo.refresh_from_db()
+        self.assertEqual(incremental[0][0], self.insumo.stock_actual)
+
+        valoracion.reconstruir([self.insumo.pk])
+        self.assertEqual(self.estado(), incremental)
+
+    def test_guarda_sin_upsert_con_columna_de_conflicto(self):
+        # Como en MySQL: sin ON CONFLICT (columna) se actualiza o inserta aparte
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            self.mover('entrada', 5, Decimal('4'))
+            self.mover('salida', 12)
+            incremental = self.estado()
+            self.assertEqual(incremental[0], (Decimal('3'), Decimal('2.6667'), Decimal('8'),
+                                              Decimal('12')))
+
+            ValoracionInsumo.objects.filter(insumo=self.insumo).delete()
+            valoracion.reconstruir([self.insumo.pk])
+            self.assertEqual(self.estado(), incremental)
+            valoracion.reconstruir([self.insumo.pk])
+            self.assertEqual(self.estado(), incremental)
+        self.assertEqual(ValoracionInsumo.objects.count(), 1)
+
+
+class PorVencerTests(APITestCase):
+    url = '/api/inventario/insumos/por-vencer/'
+
+    def crear_insumo(self, codigo, dias, stock=10, activo=True):
+        return Insumo.objects.create(
+            codigo=codigo, nombre=f'Insumo {codigo}', categoria='fertilizante',
+            stock_actual=stock, stock_minimo=0, precio_unitario=2, activo=activo,
+            fecha_vencimiento=self.hoy + datetime.timedelta(days=dias)
+        )
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+
+    def test_agrupa_por_semana_hasta_el_horizonte(self):
+        incluidos = [self.crear_insumo(f'P-{d}', d) for d in (0, 6, 7, 10)]
+        self.crear_insumo('X-1', 11)
+        self.crear_insumo('X-2', -1)
+        self.crear_insumo('X-3', 3, stock=0)
+        self.crear_insumo('X-4', 3, activo=False)
+
+        datos = self.client.get(self.url, {'dias': 10}).json()
+
+        def dia(dias):
+            return (self.hoy + datetime.timedelta(days=dias)).isoformat()
+
+        self.assertEqual(datos['total_insumos'], 4)
+        self.assertEqual(datos['valor_total'], '80.00')
+        self.assertEqual(
+            [(s['desde'], s['hasta'], s['valor'], [i['insumo'] for i in s['insumos']])
+             for s in datos['semanas']],
+            [
+                (dia(0), dia(6), '40.00', [incluidos[0].pk, incluidos[1].pk]),
+                (dia(7), dia(10), '40.00', [incluidos[2].pk, incluidos[3].pk]),
+            ]
+        )
+        self.assertEqual(datos['hasta'], dia(10))
+
+    def test_dias_invalidos(self):
+        for dias in ('abc', '0', '-3', '367'):
+            respuesta = self.client.get(self.url, {'dias': dias})
+            self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'dias': 366}).status_code, 200)
+
+
+class PronosticoTests(TestCase):
+    """El ajuste vectorizado coincide con recorrer cada insumo día por día"""
+
+    def referencia(self, serie, inicio):
+        """Suavizado, promedio móvil y desviación de una fila con un bucle simple"""
+        historia = serie[inicio:]
+        nivel = historia[0]
+        for valor in historia:
+            nivel = pronosticos.ALFA * valor + (1 - pronosticos.ALFA) * nivel
+        promedio = historia[-pronosticos.VENTANA_PROMEDIO:]
+        ventana = historia[-pronosticos.VENTANA_DESVIACION:]
+        media = sum(ventana) / len(ventana)
+        desviacion = (sum((v - media) ** 2 for v in ventana) / len(ventana)) ** 0.5
+        return nivel, sum(promedio) / len(promedio), desviacion
+
+    def test_ajustar_coincide_con_el_bucle(self):
+        azar = np.random.default_rng(5)
+        dias = 200
+        # Filas con historia completa, creadas a mitad del rango, casi al final y el último día
+        inicios = np.array([0, 0, 57, 150, 185, 199])
+        matriz = azar.poisson(3, size=(len(inicios), dias)).astype(float)
+        matriz[1, ::2] = 0
+        for fila, inicio in enumerate(inicios):
+            matriz[fila, :inicio] = 0
+
+        suavizado, promedio, desviacion = pronosticos.ajustar(matriz, inicios)
+        for fila, inicio in enumerate(inicios):
+            esperado = self.referencia(list(matriz[fila]), inicio)
+            np.testing.assert_allclose(
+                [suavizado[fila], promedio[fila], desviacion[fila]], esperado, rtol=1e-9
+            )
+
+    def test_calcular_con_insumo_creado_en_el_rango(self):
+        hoy = timezone.localdate()
+        hasta = hoy - datetime.timedelta(days=1)
+        insumo = Insumo.objects.create(
+            codigo='F-1', nombre='Urea', categoria='fertilizante',
+            stock_actual=500, stock_minimo=0, precio_unitario=1
+        )
+        creacion = hoy - datetime.timedelta(days=20)
+        Insumo.objects.filter(pk=insumo.pk).update(
+            fecha_creacion=timezone.make_aware(datetime.datetime.combine(creacion, datetime.time(8)))
+        )
+        serie = [0.0] * 20
+        for atras, cantidad in [(20, 4), (15, 2), (15, 3), (9, 6), (1, 1)]:
+            movimiento = registrar_movimiento(
+                insumo, 'salida', Decimal(cantidad), descripcion='Uso', responsable='r'
+            )
+            dia = hoy - datetime.timedelta(days=atras)
+            Movimiento.objects.filter(pk=movimiento.pk).update(
+                fecha=timezone.make_aware(datetime.datetime.combine(dia, datetime.time(12)))
+            )
+            serie[20 - atras] += cantidad
+
+        self.assertEqual(pronosticos.calcular(dias_historia=60, plazo=7, hasta=hasta), 1)
+        pronostico = insumo.pronostico
+        nivel, promedio, desviacion = self.referencia(serie, 0)
+        self.assertEqual(pronostico.dias_historia, 20)
+        self.assertAlmostEqual(float(pronostico.consumo_diario), nivel, places=4)
+        self.assertAlmostEqual(float(pronostico.promedio_movil), promedio, places=4)
+        self.assertAlmostEqual(float(pronostico.desviacion), desviacion, places=4)
+
+        # Como en MySQL: el recálculo actualiza la fila existente sin ON CONFLICT (columna)
+        PronosticoInsumo.objects.filter(insumo=insumo).update(consumo_diario=0, dias_historia=0)
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            self.assertEqual(pronosticos.calcular(dias_historia=60, plazo=7, hasta=hasta), 1)
+        pronostico = PronosticoInsumo.objects.get()
+        self.assertEqual(pronostico.dias_historia, 20)
+        self.assertAlmostEqual(float(pronostico.consumo_diario), nivel, places=4)
+
+
+class ResumenInventarioTests(APITestCase):
+    url = '/api/inventario/insumos/resumen/'
+
+    def setUp(self):
+        cache.clear()
+        self.insumos = [
+            Insumo.objects.create(
+                codigo=codigo, nombre=f'Insumo {codigo}', categoria=categoria,
+                stock_actual=stock, stock_minimo=minimo, precio_unitario=precio
+            )
+            for codigo, categoria, stock, minimo, precio in [
+                ('R-1', 'fertilizante', 10, 5, Decimal('2.50')),
+                ('R-2', 'fertilizante', 4, 1, 10),
+                ('R-3', 'semilla', 20, 15, Decimal('1.25')),
+            ]
+        ]
+
+    def mover(self, insumo, tipo, cantidad, costo=None):
+        registrar_movimiento(insumo, tipo, Decimal(cantidad), costo_unitario=costo,
+                             descripcion='Prueba', responsable='r')
+
+    def test_totales_por_categoria(self):
+        self.mover(self.insumos[0], 'entrada', 10, Decimal('4'))
+        self.mover(self.insumos[2], 'salida', 8)
+        datos = self.client.get(self.url).json()
+        # 10 a 2.50 + 10 a 4 y 4 a 10; 12 a 1.25, bajo el mínimo de 15
+        self.assertEqual(datos['por_categoria'], [
+            {'categoria': 'fertilizante', 'total_insumos': 2, 'valor_inventario': 105.0,
+             'insumos_bajo_stock': 0},
+            {'categoria': 'semilla', 'total_insumos': 1, 'valor_inventario': 15.0,
+             'insumos_bajo_stock': 1},
+        ])
+        self.assertEqual(
+            (datos['total_insumos'], datos['valor_total_inventario'], datos['insumos_bajo_stock']),
+            (3, 120.0, 1)
+        )
+
+    def test_movimiento_invalida_la_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        version = version_datos(VERSION_INVENTARIO)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mover(self.insumos[1], 'salida', 4)
+        self.assertNotEqual(version_datos(VERSION_INVENTARIO), version)
+        datos = self.client.get(self.url).json()
+        self.assertEqual(datos['por_categoria'][0]['valor_inventario'], 25.0)
+        self.assertEqual(datos['insumos_bajo_stock'], 1)
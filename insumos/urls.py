@@ -1,9 +1,11 @@
 from django.urls import path
 from .views import (
-    InsumoListCreateView, InsumoDetailView,
-    MovimientoListCreateView, MovimientoDetailView,
+    InsumoListCreateView, InsumoDetailView, InsumoExistenciasView,
+    MovimientoListCreateView, MovimientoDetailView, MovimientoLoteView,
     ConsumoListCreateView, ConsumoDetailView,
-    resumen_inventario
+    MovimientoExportView, ConsumoExportView,
+    AlertaStockListView, AlertaStockReconocerView,
+    resumen_inventario, valoracion_inventario, insumos_por_vencer
 )
 
 app_name = 'insumos'
@@ -11,12 +13,21 @@ app_name = 'insumos'
 urlpatterns = [
     path('insumos/', InsumoListCreateView.as_view()),
     path('insumos/<int:pk>/', InsumoDetailView.as_view()),
+    path('insumos/<int:pk>/existencias/', InsumoExistenciasView.as_view()),
 
     path('movimientos/', MovimientoListCreateView.as_view()),
     path('movimientos/<int:pk>/', MovimientoDetailView.as_view()),
+    path('movimientos/exportar/', MovimientoExportView.as_view()),
+    path('movimientos/lote/', MovimientoLoteView.as_view()),
 
     path('consumos/', ConsumoListCreateView.as_view()),
     path('consumos/<int:pk>/', ConsumoDetailView.as_view()),
+    path('consumos/exportar/', ConsumoExportView.as_view()),
+
+    path('alertas/', AlertaStockListView.as_view()),
+    path('alertas/reconocer/', AlertaStockReconocerView.as_view()),
 
     path('insumos/resumen/', resumen_inventario),
+    path('insumos/valoracion/', valoracion_inventario),
+    path('insumos/por-vencer/', insumos_por_vencer),
 ]
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+Valoración del inventario por capas FIFO y costo promedio ponderado.
+
+Cada entrada (tipos con signo positivo en el kardex) abre una capa de costo con su
+`costo_unitario` (o el precio del insumo si no lo trae; un costo cero, como el
+de una donación, se respeta) y recalcula el costo promedio ponderado; cada
+salida consume las capas más antiguas y conserva el promedio. ValoracionInsumo
+guarda por insumo la cantidad, el costo promedio, el valor al promedio y el
+valor FIFO (suma de las capas abiertas); las capas agotadas se eliminan, así que
+la tabla solo tiene inventario vigente.
+
+El kardex llama a aplicar() con los movimientos de cada escritura, dentro de su
+transacción. reconstruir() recorre los movimientos de cada insumo en orden de
+fecha con un iterador, de modo que la memoria depende de las capas abiertas de
+un insumo y no del historial. El reporte lee ValoracionInsumo en una consulta.
+"""
+from collections import defaultdict, deque
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from config.bd import guardar_por_clave
+from config.versiones import incrementar_version
+
+from . import kardex
+from .models import CapaCosto, Insumo, Movimiento, ValoracionInsumo
+from .resumen import VERSION_INVENTARIO
+
+CUATRO_DECIMALES = Decimal('0.0001')
+DOS_DECIMALES = Decimal('0.01')
+TAMANO_BLOQUE = 2000
+
+
+class _Estado:
+    """Valoración de un insumo en memoria mientras se aplican sus movimientos"""
+
+    def __init__(self, insumo_id, cantidad=0, costo_promedio=0, valor_fifo=0, capas=()):
+        self.insumo_id = insumo_id
+        self.cantidad = Decimal(cantidad)
+        self.costo_promedio = Decimal(costo_promedio)
+        self.valor_fifo = Decimal(valor_fifo)
+        self.capas = deque(capas)
+        self.agotadas = []
+
+    def entrada(self, cantidad, costo, fecha):
+        total = self.cantidad + cantidad
+        if total > 0:
+            self.costo_promedio = (
+                (self.cantidad * self.costo_promedio + cantidad * costo) / total
+            ).quantize(CUATRO_DECIMALES)
+        self.cantidad = total
+        self.valor_fifo += cantidad * costo
+        self.capas.append(CapaCosto(
+            insumo_id=self.insumo_id, fecha=fecha, costo_unitario=costo,
+            cantidad_inicial=cantidad, cantidad_restante=cantidad,
+        ))
+
+    def salida(self, cantidad):
+        self.cantidad = max(self.cantidad - cantidad, Decimal('0'))
+        pendiente = cantidad
+        while pendiente > 0 and self.capas:
+            capa = self.capas[0]
+            tomado = min(capa.cantidad_restante, pendiente)
+            capa.cantidad_restante -= tomado
+            pendiente -= tomado
+            self.valor_fifo -= tomado * capa.costo_unitario
+            if capa.cantidad_restante == 0:
+                self.capas.popleft()
+                if capa.pk:
+                    self.agotadas.append(capa.pk)
+
+    def aplicar(self, tipo, cantidad, costo, fecha):
+        if kardex.SIGNO[tipo] > 0:
+            self.entrada(cantidad, costo, fecha)
+        else:
+            self.salida(cantidad)
+
+    def valoracion(self):
+        return ValoracionInsumo(
+            insumo_id=self.insumo_id,
+            cantidad=self.cantidad,
+            costo_promedio=self.costo_promedio,
+            valor_promedio=(self.cantidad * self.costo_promedio).quantize(DOS_DECIMALES),
+            valor_fifo=self.valor_fifo.quantize(DOS_DECIMALES),
+            fecha_actualizacion=timezone.now(),
+        )
+
+
+def _estado_inicial(insumo_id, stock, precio, fecha):
+    """Estado de partida: el stock sin movimientos registrados, a precio del insumo"""
+    estado = _Estado(insumo_id)
+    if stock > 0:
+        estado.entrada(stock, precio, fecha)
+    return estado
+
+
+def inicializar(insumo):
+    """Crea la valoración de un insumo nuevo con su stock inicial"""
+    with transaction.atomic():
+        estado = _estado_inicial(
+            insumo.pk, insumo.stock_actual, insumo.precio_unitario, insumo.fecha_creacion
+        )
+        estado.valoracion().save()
+        CapaCosto.objects.bulk_create(estado.capas)
+
+
+def aplicar(movimientos):
+    """
+    Actualiza la valoración con movimientos recién aplicados al stock, en el
+    orden recibido. Debe llamarse dentro de la transacción que los registró.
+    """
+    por_insumo = defaultdict(list)
+    for movimiento in movimientos:
+        por_insumo[movimiento.insumo_id].append(movimiento)
+    ids = sorted(por_insumo)
+
+    with transaction.atomic():
+        insumos = {
+            pk: (stock, precio, creacion)
+            for pk, stock, precio, creacion in Insumo.objects.filter(pk__in=ids).values_list(
+                'pk', 'stock_actual', 'precio_unitario', 'fecha_creacion'
+            )
+        }
+        estados = {
+            v.insumo_id: _Estado(v.insumo_id, v.cantidad, v.costo_promedio, v.valor_fifo)
+            for v in ValoracionInsumo.objects.select_for_update()
+            .filter(insumo_id__in=ids).order_by('insumo_id')
+        }
+        # Solo las salidas necesitan las capas abiertas
+        con_salidas = [
+            i for i in estados
+            if any(kardex.SIGNO[m.tipo] < 0 for m in por_insumo[i])
+        ]
+        for capa in CapaCosto.objects.filter(insumo_id__in=con_salidas).order_by('insumo_id', 'fecha', 'id'):
+            estados[capa.insumo_id].capas.append(capa)
+        for insumo_id in ids:
+            if insumo_id not in estados:
+                # Insumo anterior a la valoración: parte del stock previo a estos movimientos
+                stock, precio, creacion = insumos[insumo_id]
+                previo = stock - sum(kardex.SIGNO[m.tipo] * m.cantidad for m in por_insumo[insumo_id])
+                estados[insumo_id] = _estado_inicial(insumo_id, previo, precio, creacion)
+
+        for insumo_id in ids:
+            estado = estados[insumo_id]
+            precio = insumos[insumo_id][1]
+            for m in por_insumo[insumo_id]:
+                costo = precio if m.costo_unitario is None else m.costo_unitario
+                estado.aplicar(m.tipo, m.cantidad, costo, m.fecha)
+
+        _guardar(estados.values())
+
+
+def _guardar(estados):
+    estados = list(estados)
+    agotadas = [pk for estado in estados for pk in estado.agotadas]
+    capas = [capa for estado in estados for capa in estado.capas]
+    CapaCosto.objects.filter(pk__in=agotadas).delete()
+    CapaCosto.objects.bulk_create([capa for capa in capas if not capa.pk], batch_size=1000)
+    CapaCosto.objects.bulk_update(
+        [capa for capa in capas if capa.pk], ['cantidad_restante'], batch_size=1000
+    )
+    guardar_por_clave(
+        ValoracionInsumo,
+        [estado.valoracion() for estado in estados],
+        'insumo',
+        ['cantidad', 'costo_promedio', 'valor_promedio', 'valor_fifo', 'fecha_actualizacion'],
+    )
+
+
+def reconstruir(insumo_ids=None):
+    """
+    Reconstruye capas y valoración recorriendo los movimientos de cada insumo
+    en orden de fecha. Retorna el número de insumos procesados.
+    """
+    insumos = Insumo.objects.order_by('pk')
+    if insumo_ids is not None:
+        insumos = insumos.filter(pk__in=insumo_ids)
+
+    procesados = 0
+    for insumo_id, stock, precio, creacion in insumos.values_list(
+        'pk', 'stock_actual', 'precio_unitario', 'fecha_creacion'
+    ).iterator():
+        with transaction.atomic():
+            movimientos = Movimiento.objects.filter(insumo_id=insumo_id, tipo__in=list(kardex.SIGNO))
+            neto = movimientos.order_by().aggregate(neto=kardex.suma_con_signo())['neto'] or 0
+            estado = _estado_inicial(insumo_id, stock - neto, precio, creacion)
+            for tipo, cantidad, costo, fecha in (
+                movimientos.order_by('fecha', 'id')
+                .values_list('tipo', 'cantidad', 'costo_unitario', 'fecha')
+                .iterator(chunk_size=TAMANO_BLOQUE)
+            ):
+                estado.aplicar(tipo, cantidad, precio if costo is None else costo, fecha)
+
+            CapaCosto.objects.filter(insumo_id=insumo_id).delete()
+            _guardar([estado])
+        procesados += 1
+    incrementar_version(VERSION_INVENTARIO)
+    return procesados
+
+
+def reporte():
+    """Valoración de todo el catálogo por ambos métodos, en una consulta"""
+    filas = (
+        ValoracionInsumo.objects.order_by('insumo__categoria', 'insumo__nombre')
+        .values_list(
+            'insumo_id', 'insumo__codigo', 'insumo__nombre', 'insumo__categoria',
+            'cantidad', 'costo_promedio', 'valor_promedio', 'valor_fifo',
+        )
+    )
+    insumos = []
+    total_promedio = total_fifo = Decimal('0')
+    for insumo_id, codigo, nombre, categoria, cantidad, promedio, valor_promedio, valor_fifo in filas:
+        total_promedio += valor_promedio
+        total_fifo += valor_fifo
+        insumos.append({
+            'insumo': insumo_id,
+            'codigo': codigo,
+            'nombre': nombre,
+            'categoria': categoria,
+            'cantidad': f'{cantidad:.2f}',
+            'costo_promedio': f'{promedio:.4f}',
+            'valor_promedio': f'{valor_promedio:.2f}',
+            'valor_fifo': f'{valor_fifo:.2f}',
+        })
+    return {
+        'valor_promedio': f'{total_promedio:.2f}',
+        'valor_fifo': f'{total_fifo:.2f}',
+        'insumos': insumos,
+    }
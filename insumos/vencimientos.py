@@ -0,0 +1,97 @@
+"""
+Insumos activos con stock que vencen en los próximos días, agrupados por semana.
+
+La consulta es un rango sobre el índice (activo, fecha_vencimiento):
+`activo = 1 AND fecha_vencimiento BETWEEN hoy AND hoy + dias`, sin importar el
+tamaño del catálogo. El valor de cada insumo es el de su valoración al costo
+promedio (insumos/valoracion.py), o stock × precio si no la tiene, como en el
+resumen del inventario.
+
+El resultado se guarda en la caché por día, horizonte y versión 'inventario':
+la revisión diaria del almacén lo calcula una vez, y cualquier cambio de
+insumos o movimientos lo invalida.
+"""
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import DecimalField, F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from config.versiones import version_datos
+
+from .models import Insumo
+from .resumen import DURACION_CACHE, VERSION_INVENTARIO
+
+DIAS_DEFECTO = 30
+MAX_DIAS = 366
+
+
+def calcular(hoy, dias):
+    """Retorna los insumos que vencen entre `hoy` y `hoy + dias` por semana"""
+    filas = (
+        Insumo.objects.filter(
+            activo=True,
+            fecha_vencimiento__range=(hoy, hoy + datetime.timedelta(days=dias)),
+            stock_actual__gt=0,
+        )
+        .annotate(valor=Coalesce(
+            F('valoracion__valor_promedio'),
+            F('stock_actual') * F('precio_unitario'),
+            output_field=DecimalField(max_digits=20, decimal_places=2)
+        ))
+        .order_by('fecha_vencimiento', 'pk')
+        .values_list(
+            'pk', 'codigo', 'nombre', 'lote_proveedor', 'fecha_vencimiento',
+            'stock_actual', 'valor',
+        )
+    )
+
+    fin = hoy + datetime.timedelta(days=dias)
+    semanas = {}
+    total = Decimal('0')
+    for pk, codigo, nombre, lote, vencimiento, stock, valor in filas:
+        numero = (vencimiento - hoy).days // 7
+        semana = semanas.get(numero)
+        if semana is None:
+            inicio = hoy + datetime.timedelta(days=7 * numero)
+            semana = semanas[numero] = {
+                'desde': inicio,
+                # La última semana termina en el horizonte
+                'hasta': min(inicio + datetime.timedelta(days=6), fin),
+                'valor': Decimal('0'),
+                'insumos': [],
+            }
+        semana['valor'] += valor
+        total += valor
+        semana['insumos'].append({
+            'insumo': pk,
+            'codigo': codigo,
+            'nombre': nombre,
+            'lote_proveedor': lote,
+            'fecha_vencimiento': vencimiento,
+            'stock': f'{stock:.2f}',
+            'valor': f'{valor:.2f}',
+        })
+
+    for semana in semanas.values():
+        semana['valor'] = f"{semana['valor']:.2f}"
+    return {
+        'desde': hoy,
+        'hasta': fin,
+        'total_insumos': sum(len(s['insumos']) for s in semanas.values()),
+        'valor_total': f'{total:.2f}',
+        'semanas': list(semanas.values()),
+    }
+
+
+def por_vencer(dias=DIAS_DEFECTO):
+    """Retorna los insumos por vencer desde la caché o los calcula"""
+    hoy = timezone.localdate()
+    clave = f'por-vencer:{hoy}:{dias}:{version_datos(VERSION_INVENTARIO)}'
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = calcular(hoy, dias)
+        cache.set(clave, resultado, DURACION_CACHE)
+    return resultado
@@ -1,20 +1,31 @@
-from rest_framework import generics
+import datetime
+
+from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
-from django.db import models
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+
+from config.exportacion import FORMATOS, formato_solicitado, respuesta_exportacion
 
-from .models import Insumo, Movimiento, Consumo
-from .serializers import InsumoSerializer, MovimientoSerializer, ConsumoSerializer
-from .filters import InsumoFilter, MovimientoFilter, ConsumoFilter
+from .models import Insumo, Movimiento, Consumo, AlertaStock
+from . import existencias, valoracion, vencimientos
+from .alertas import ESTADOS_ACTIVOS, reconocer
+from .kardex import registrar_movimientos
+from .serializers import (
+    InsumoSerializer, MovimientoSerializer, ConsumoSerializer, MovimientoLoteSerializer,
+    AlertaStockSerializer, ReconocerAlertasSerializer
+)
+from .filters import InsumoFilter, MovimientoFilter, ConsumoFilter, AlertaStockFilter
+from .resumen import obtener_resumen
 
 
 # ===== INSUMOS =====
 
 @extend_schema(tags=['📦 Insumos'])
 class InsumoListCreateView(generics.ListCreateAPIView):
-    queryset = Insumo.objects.all()
+    queryset = Insumo.objects.select_related('pronostico')
     serializer_class = InsumoSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = InsumoFilter
@@ -22,10 +33,55 @@ class InsumoListCreateView(generics.ListCreateAPIView):
 
 @extend_schema(tags=['📦 Insumos'])
 class InsumoDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Insumo.objects.all()
+    queryset = Insumo.objects.select_related('pronostico')
     serializer_class = InsumoSerializer
 
 
+@extend_schema(
+    tags=['📦 Insumos'],
+    parameters=[
+        OpenApiParameter('fecha', datetime.date, description='Stock al cierre de ese día'),
+        OpenApiParameter('desde', datetime.date, description='Serie diaria (con hasta)'),
+        OpenApiParameter('hasta', datetime.date),
+    ],
+    responses=OpenApiTypes.OBJECT,
+)
+class InsumoExistenciasView(generics.GenericAPIView):
+    """
+    Stock histórico del insumo: al cierre de una fecha (?fecha=) o la serie
+    diaria de un rango (?desde=&hasta=), desde los cierres diarios más los
+    movimientos posteriores al último cierre.
+    """
+    queryset = Insumo.objects.all()
+
+    def get(self, request, pk):
+        insumo = self.get_object()
+        parametros = request.query_params
+        try:
+            if 'fecha' in parametros:
+                fecha = datetime.date.fromisoformat(parametros['fecha'])
+                stock = existencias.stock_en_fecha(insumo, fecha)
+                return Response({'insumo': insumo.pk, 'fecha': fecha, 'stock': f'{stock:.2f}'})
+            desde = datetime.date.fromisoformat(parametros['desde'])
+            hasta = datetime.date.fromisoformat(parametros['hasta'])
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Se requiere fecha, o desde y hasta (AAAA-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= (hasta - desde).days < existencias.MAX_DIAS:
+            return Response(
+                {'error': f'El rango debe tener entre 1 y {existencias.MAX_DIAS} días'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({
+            'insumo': insumo.pk,
+            'desde': desde,
+            'hasta': hasta,
+            'serie': existencias.serie(insumo, desde, hasta),
+        })
+
+
 # ===== MOVIMIENTOS =====
 
 @extend_schema(tags=['📦 Movimientos'])
@@ -37,11 +93,42 @@ class MovimientoListCreateView(generics.ListCreateAPIView):
 
 
 @extend_schema(tags=['📦 Movimientos'])
-class MovimientoDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MovimientoDetailView(generics.RetrieveAPIView):
+    """Los movimientos ya aplicados al stock no se editan ni se eliminan"""
     queryset = Movimiento.objects.all()
     serializer_class = MovimientoSerializer
 
 
+@extend_schema(
+    tags=['📦 Movimientos'],
+    parameters=[
+        OpenApiParameter('parcial', bool,
+                         description='Aplica los movimientos válidos aunque otros sean rechazados'),
+    ],
+    responses=OpenApiTypes.OBJECT,
+)
+class MovimientoLoteView(generics.GenericAPIView):
+    """
+    Registrar muchos movimientos de varios insumos en una sola transacción.
+
+    Los movimientos se validan en el orden recibido contra el stock de cada
+    insumo. Si alguno no puede aplicarse no se aplica ninguno, salvo con
+    ?parcial=true.
+    """
+    serializer_class = MovimientoLoteSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        parcial = request.query_params.get('parcial', '').lower() in ('1', 'true', 'si')
+        resultado = registrar_movimientos(
+            serializer.validated_data['movimientos'], parcial=parcial
+        )
+        if resultado['errores'] and not resultado['aplicados']:
+            return Response(resultado, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado, status=status.HTTP_201_CREATED)
+
+
 # ===== CONSUMOS =====
 
 @extend_schema(tags=['📦 Consumos'])
@@ -58,17 +145,106 @@ class ConsumoDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ConsumoSerializer
 
 
+# ===== ALERTAS =====
+
+@extend_schema(tags=['📦 Alertas de Stock'])
+class AlertaStockListView(generics.ListAPIView):
+    """Alertas de stock; sin ?estado= solo las activas (abiertas o reconocidas)"""
+    serializer_class = AlertaStockSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AlertaStockFilter
+
+    def get_queryset(self):
+        alertas = AlertaStock.objects.select_related('insumo')
+        if 'estado' not in self.request.query_params:
+            alertas = alertas.filter(estado__in=ESTADOS_ACTIVOS)
+        return alertas
+
+
+@extend_schema(tags=['📦 Alertas de Stock'], responses=OpenApiTypes.OBJECT)
+class AlertaStockReconocerView(generics.GenericAPIView):
+    """Marcar alertas abiertas como reconocidas; se resuelven solas al normalizarse el stock"""
+    serializer_class = ReconocerAlertasSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'reconocidas': reconocer(serializer.validated_data['alertas'])})
+
+
+# ===== EXPORTACIONES =====
+
+class ExportacionView(generics.GenericAPIView):
+    """Exporta el queryset filtrado en NDJSON o CSV sin cargarlo en memoria"""
+    filter_backends = [DjangoFilterBackend]
+    nombre_archivo = None
+
+    def get(self, request):
+        formato = formato_solicitado(request)
+        if formato is None:
+            return Response(
+                {'error': f'Formato no soportado. Opciones: {", ".join(FORMATOS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        return respuesta_exportacion(queryset, formato, self.nombre_archivo)
+
+
+@extend_schema(
+    tags=['📦 Movimientos'],
+    parameters=[OpenApiParameter('formato', str, enum=list(FORMATOS))],
+    responses={(200, 'application/x-ndjson'): str, (200, 'text/csv'): str},
+)
+class MovimientoExportView(ExportacionView):
+    queryset = Movimiento.objects.all()
+    filterset_class = MovimientoFilter
+    nombre_archivo = 'movimientos'
+
+
+@extend_schema(
+    tags=['📦 Consumos'],
+    parameters=[OpenApiParameter('formato', str, enum=list(FORMATOS))],
+    responses={(200, 'application/x-ndjson'): str, (200, 'text/csv'): str},
+)
+class ConsumoExportView(ExportacionView):
+    queryset = Consumo.objects.all()
+    filterset_class = ConsumoFilter
+    nombre_archivo = 'consumos'
+
+
 # ===== ENDPOINT EXTRA =====
 
+@extend_schema(tags=['📦 Resumen Inventario'], responses=OpenApiTypes.OBJECT)
 @api_view(['GET'])
-@extend_schema(tags=['📦 Resumen Inventario'])
 def resumen_inventario(request):
-    total_insumos = Insumo.objects.count()
-    valor_total = sum(i.valor_inventario() for i in Insumo.objects.all())
-    insumos_bajo_stock = Insumo.objects.filter(stock_actual__lt=models.F('stock_minimo')).count()
-
-    return Response({
-        "total_insumos": total_insumos,
-        "valor_total_inventario": valor_total,
-        "insumos_bajo_stock": insumos_bajo_stock,
-    })
\ No newline at end of file
+    """Totales del inventario y su desglose por categoría, desde la caché"""
+    return Response(obtener_resumen())
+
+
+@extend_schema(tags=['📦 Resumen Inventario'], responses=OpenApiTypes.OBJECT)
+@api_view(['GET'])
+def valoracion_inventario(request):
+    """Valor del inventario por costo promedio ponderado y por FIFO, por insumo y total"""
+    return Response(valoracion.reporte())
+
+
+@extend_schema(
+    tags=['📦 Resumen Inventario'],
+    parameters=[OpenApiParameter(
+        'dias', int, description=f'Horizonte en días (por defecto {vencimientos.DIAS_DEFECTO})'
+    )],
+    responses=OpenApiTypes.OBJECT,
+)
+@api_view(['GET'])
+def insumos_por_vencer(request):
+    """Insumos activos que vencen en los próximos días, por semana y con su valor"""
+    try:
+        dias = int(request.query_params.get('dias', vencimientos.DIAS_DEFECTO))
+    except ValueError:
+        return Response({'error': 'dias debe ser un entero'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < dias <= vencimientos.MAX_DIAS:
+        return Response(
+            {'error': f'El horizonte debe tener entre 1 y {vencimientos.MAX_DIAS} días'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(vencimientos.por_vencer(dias))
@@ -1,5 +1,7 @@
-from django.contrib import admin
-from .models import TipoTarea, Tarea
+from django.contrib import admin, messages
+
+from .models import TipoTarea, Tarea, TransicionTarea, PlantillaRecurrente
+from .transiciones import aplicar_transiciones
 
 
 @admin.register(TipoTarea)
@@ -15,17 +17,54 @@ class TareaAdmin(admin.ModelAdmin):
     list_display = ['titulo', 'lote', 'estado', 'prioridad', 'fecha_programada']
     list_filter = ['estado', 'prioridad', 'fecha_programada']
     search_fields = ['titulo', 'lote__codigo']
-    readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    # El estado cambia con las acciones, que pasan por las transiciones permitidas
+    readonly_fields = ['estado', 'fecha_creacion', 'fecha_actualizacion']
     date_hierarchy = 'fecha_programada'
     
     actions = ['marcar_completada', 'marcar_cancelada']
     
+    def _cambiar_estado(self, request, queryset, estado, participio):
+        ids = list(queryset.values_list('pk', flat=True))
+        resultado = aplicar_transiciones(
+            [(pk, estado) for pk in ids], observaciones='Acción del admin', parcial=True
+        )
+        self.message_user(request, f'{resultado["aplicadas"]} tarea(s) {participio}')
+        if resultado['errores']:
+            self.message_user(
+                request,
+                f'{len(resultado["errores"])} tarea(s) no admiten el cambio de estado',
+                level=messages.WARNING,
+            )
+    
     def marcar_completada(self, request, queryset):
-        queryset.update(estado='completada')
-        self.message_user(request, f'{queryset.count()} tarea(s) completada(s)')
+        self._cambiar_estado(request, queryset, 'completada', 'completada(s)')
     marcar_completada.short_description = 'Marcar como Completadas'
     
     def marcar_cancelada(self, request, queryset):
-        queryset.update(estado='cancelada')
-        self.message_user(request, f'{queryset.count()} tarea(s) cancelada(s)')
+        self._cambiar_estado(request, queryset, 'cancelada', 'cancelada(s)')
     marcar_cancelada.short_description = 'Marcar como Canceladas'
+
+
+@admin.register(PlantillaRecurrente)
+class PlantillaRecurrenteAdmin(admin.ModelAdmin):
+    list_display = ['nombre', 'tipo_tarea', 'intervalo_dias', 'fecha_inicio', 'fecha_fin', 'activa']
+    list_filter = ['activa', 'tipo_tarea']
+    search_fields = ['nombre', 'titulo']
+    filter_horizontal = ['lotes']
+
+
+@admin.register(TransicionTarea)
+class TransicionTareaAdmin(admin.ModelAdmin):
+    list_display = ['tarea', 'estado_anterior', 'estado_nuevo', 'fecha']
+    list_filter = ['estado_nuevo', 'fecha']
+    search_fields = ['tarea__titulo']
+    
+    # El registro es de solo inserción
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,130 @@
+"""
+Analítica de eficiencia de tareas con operaciones vectorizadas.
+
+Las horas y costos de las tareas del rango se leen como columnas con
+`values_list` (sin instanciar modelos) y se convierten en arreglos de NumPy. La
+eficiencia se calcula igual que Tarea.eficiencia_tiempo()/eficiencia_costo()
+(estimado / real * 100) para todas las filas a la vez, y se resume por categoría
+de tipo de tarea, lote y finca: media, percentiles y valores atípicos (fuera de
+1.5 veces el rango intercuartílico). El resultado se guarda en caché por rango
+de fechas y versión de los datos de tareas.
+"""
+import numpy as np
+from django.core.cache import cache
+
+from config.versiones import version_datos
+from fincas.tablero import VERSION_TAREAS
+
+from .models import Tarea
+
+PERCENTILES = [10, 25, 50, 75, 90]
+MAX_ATIPICOS = 20
+DURACION_CACHE = 24 * 60 * 60
+
+AGRUPACIONES = {
+    'por_categoria': 'categoria',
+    'por_lote': 'lote',
+    'por_finca': 'finca',
+}
+
+
+def _columnas(queryset):
+    filas = list(queryset.order_by().values_list(
+        'id', 'tipo_tarea__categoria', 'lote_id', 'lote__finca_id',
+        'horas_estimadas', 'horas_reales', 'costo_estimado', 'costo_real',
+    ))
+    if not filas:
+        return None
+    ids, categorias, lotes, fincas, *valores = zip(*filas)
+    horas_est, horas_real, costo_est, costo_real = (
+        np.array(columna, dtype=float) for columna in valores
+    )
+    return {
+        'id': np.array(ids),
+        'categoria': np.array(categorias),
+        'lote': np.array(lotes),
+        'finca': np.array(fincas),
+        'tiempo': _eficiencia(horas_est, horas_real),
+        'costo': _eficiencia(costo_est, costo_real),
+    }
+
+
+def _eficiencia(estimado, real):
+    """estimado / real * 100; NaN donde falta alguno de los dos o es cero"""
+    validos = (estimado > 0) & (real > 0)
+    resultado = np.full(estimado.shape, np.nan)
+    np.divide(estimado, real, out=resultado, where=validos)
+    return resultado * 100
+
+
+def _distribucion(valores, ids):
+    """Resume los valores (ya sin NaN y ordenados) de un grupo"""
+    if valores.size == 0:
+        return None
+    cuartiles = np.percentile(valores, PERCENTILES)
+    p25, p75 = cuartiles[1], cuartiles[3]
+    rango = p75 - p25
+    atipicos = (valores < p25 - 1.5 * rango) | (valores > p75 + 1.5 * rango)
+    return {
+        'n': int(valores.size),
+        'media': round(float(valores.mean()), 2),
+        'percentiles': {
+            f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, cuartiles)
+        },
+        'atipicos': int(atipicos.sum()),
+        'tareas_atipicas': ids[atipicos][:MAX_ATIPICOS].tolist(),
+    }
+
+
+def _agrupar(columnas, clave):
+    """Distribuciones de eficiencia por cada valor de la columna `clave`"""
+    grupos, inverso = np.unique(columnas[clave], return_inverse=True)
+    totales = np.bincount(inverso, minlength=len(grupos))
+    resultado = {
+        grupo: {'clave': grupo.item(), 'tareas': int(total)}
+        for grupo, total in zip(grupos, totales)
+    }
+    for metrica in ('tiempo', 'costo'):
+        valores = columnas[metrica]
+        validos = ~np.isnan(valores)
+        grupo_valido = inverso[validos]
+        # Ordena por grupo y luego por valor: cada grupo queda en un tramo contiguo
+        orden = np.lexsort((valores[validos], grupo_valido))
+        valores_ordenados = valores[validos][orden]
+        ids_ordenados = columnas['id'][validos][orden]
+        cortes = np.cumsum(np.bincount(grupo_valido, minlength=len(grupos)))
+        inicio = 0
+        for indice, fin in enumerate(cortes):
+            resultado[grupos[indice]][metrica] = _distribucion(
+                valores_ordenados[inicio:fin], ids_ordenados[inicio:fin]
+            )
+            inicio = fin
+    return list(resultado.values())
+
+
+def calcular_eficiencia(desde, hasta, finca_id=None):
+    """Retorna las distribuciones de eficiencia de las tareas programadas en el rango"""
+    tareas = Tarea.objects.filter(fecha_programada__range=(desde, hasta))
+    if finca_id is not None:
+        tareas = tareas.filter(lote__finca_id=finca_id)
+    columnas = _columnas(tareas)
+    resultado = {'desde': desde, 'hasta': hasta, 'finca': finca_id}
+    if columnas is None:
+        resultado['total_tareas'] = 0
+        resultado.update({nombre: [] for nombre in AGRUPACIONES})
+        return resultado
+
+    resultado['total_tareas'] = int(columnas['id'].size)
+    for nombre, clave in AGRUPACIONES.items():
+        resultado[nombre] = _agrupar(columnas, clave)
+    return resultado
+
+
+def obtener_eficiencia(desde, hasta, finca_id=None):
+    """Retorna la analítica desde la caché o la calcula si cambiaron las tareas"""
+    clave = f'eficiencia-tareas:{version_datos(VERSION_TAREAS)}:{desde}:{hasta}:{finca_id}'
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = calcular_eficiencia(desde, hasta, finca_id)
+        cache.set(clave, resultado, DURACION_CACHE)
+    return resultado
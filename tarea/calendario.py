@@ -0,0 +1,66 @@
+"""
+Agenda de tareas por día para un rango de fechas.
+
+La consulta filtra por rango sobre `fecha_programada` (índice
+fecha_programada, estado). Antes de leer las tareas se calcula un ETag del
+rango (última modificación, número de tareas y suma de ids) con una sola
+consulta agregada: si el cliente ya tiene esa versión se responde 304 sin
+leer ni serializar las tareas. No se responde Last-Modified: la última
+modificación de las tareas que quedan en el rango no cambia cuando una tarea
+se elimina o se mueve fuera de él.
+"""
+import datetime
+import hashlib
+from decimal import Decimal
+
+from django.db.models import Count, Max, Sum
+
+# Rango máximo de la agenda (un trimestre)
+MAX_DIAS = 93
+
+CAMPOS = [
+    'id', 'titulo', 'lote_id', 'lote__codigo', 'lote__finca_id', 'tipo_tarea__nombre',
+    'fecha_programada', 'estado', 'prioridad', 'horas_estimadas',
+]
+
+
+def etag(queryset, parametros):
+    """
+    Retorna el ETag de las tareas del queryset. `parametros` distingue
+    agendas distintas con los mismos datos.
+    """
+    datos = queryset.order_by().aggregate(
+        ultima=Max('fecha_actualizacion'), total=Count('id'), suma_ids=Sum('id')
+    )
+    ultima = datos['ultima']
+    firma = f'{parametros}|{ultima.isoformat() if ultima else ""}|{datos["total"]}|{datos["suma_ids"]}'
+    return hashlib.sha1(firma.encode()).hexdigest()
+
+
+def agenda(queryset, desde, hasta):
+    """Retorna la lista de días del rango con sus tareas y el total de horas estimadas"""
+    dias = {}
+    dia = desde
+    while dia <= hasta:
+        dias[dia] = {'fecha': dia, 'total_tareas': 0, 'horas_estimadas': Decimal('0.00'), 'tareas': []}
+        dia += datetime.timedelta(days=1)
+
+    filas = queryset.order_by('fecha_programada', 'prioridad', 'id').values(*CAMPOS)
+    for fila in filas:
+        dia = dias[fila['fecha_programada']]
+        dia['total_tareas'] += 1
+        dia['horas_estimadas'] += fila['horas_estimadas']
+        dia['tareas'].append({
+            'id': fila['id'],
+            'titulo': fila['titulo'],
+            'lote': fila['lote_id'],
+            'lote_codigo': fila['lote__codigo'],
+            'finca': fila['lote__finca_id'],
+            'tipo_tarea_nombre': fila['tipo_tarea__nombre'],
+            'estado': fila['estado'],
+            'prioridad': fila['prioridad'],
+            'horas_estimadas': str(fila['horas_estimadas']),
+        })
+    for dia in dias.values():
+        dia['horas_estimadas'] = f"{dia['horas_estimadas']:.2f}"
+    return list(dias.values())
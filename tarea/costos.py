@@ -0,0 +1,157 @@
+"""
+Costo real de las tareas a partir de consumos de insumos y asignaciones.
+
+Cada Consumo y Asignacion guarda su `costo` al registrarse (cantidad × precio del
+insumo, horas × valor hora del trabajador). Tarea.costo_materiales y
+Tarea.costo_mano_obra son la suma de esos costos y se mantienen con señales que
+aplican solo la diferencia de cada escritura, con un UPDATE ... = campo + x.
+recalcular() los reconstruye con un UPDATE por tabla usando subconsultas
+agregadas, y los reportes por lote y finca suman las columnas de las tareas del
+rango sin tocar consumos ni asignaciones.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from .models import Tarea
+
+TAMANO_BLOQUE = 1000
+
+AGRUPACIONES = {
+    'lote': {'lote_id': 'lote', 'lote__codigo': 'codigo', 'lote__finca_id': 'finca'},
+    'finca': {'lote__finca_id': 'finca', 'lote__finca__nombre': 'nombre'},
+}
+
+# {modelo: campo de Tarea que acumula su costo}
+_registro = {}
+
+
+def registrar(modelo, campo):
+    """
+    Mantiene `Tarea.<campo>` igual a la suma de `modelo.costo` de cada tarea.
+    El modelo debe tener `tarea`, `costo` y el método de clase expresion_costo().
+    """
+    _registro[modelo] = campo
+    uid = f'costos-{modelo._meta.label_lower}'
+    pre_save.connect(_guardar_previo, sender=modelo, weak=False,
+                     dispatch_uid=f'{uid}-previo')
+    post_save.connect(_aplicar_guardado, sender=modelo, weak=False,
+                      dispatch_uid=f'{uid}-guardar')
+    post_delete.connect(_aplicar_eliminado, sender=modelo, weak=False,
+                        dispatch_uid=f'{uid}-eliminar')
+
+
+def _guardar_previo(sender, instance, **kwargs):
+    """Guarda la tarea y el costo anteriores para calcular la diferencia"""
+    instance._costo_previo = None
+    if not instance._state.adding:
+        instance._costo_previo = (
+            sender.objects.filter(pk=instance.pk).values_list('tarea_id', 'costo').first()
+        )
+
+
+def _sumar(campo, tarea_id, diferencia):
+    if diferencia:
+        Tarea.objects.filter(pk=tarea_id).update(**{campo: F(campo) + diferencia})
+
+
+def _aplicar_guardado(sender, instance, **kwargs):
+    campo = _registro[sender]
+    previo = getattr(instance, '_costo_previo', None)
+    if previo is None:
+        _sumar(campo, instance.tarea_id, instance.costo)
+    elif previo[0] == instance.tarea_id:
+        _sumar(campo, instance.tarea_id, instance.costo - previo[1])
+    else:
+        _sumar(campo, previo[0], -previo[1])
+        _sumar(campo, instance.tarea_id, instance.costo)
+
+
+def _aplicar_eliminado(sender, instance, **kwargs):
+    _sumar(_registro[sender], instance.tarea_id, -instance.costo)
+
+
+def _suma(modelo):
+    """Subconsulta con la suma de `modelo.costo` de cada tarea"""
+    total = (
+        modelo.objects.filter(tarea=OuterRef('pk'))
+        .order_by().values('tarea').annotate(total=Sum('costo')).values('total')
+    )
+    return Coalesce(
+        Subquery(total), Value(Decimal('0')),
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+def _bloques(ids):
+    ids = list(ids)
+    for inicio in range(0, len(ids), TAMANO_BLOQUE):
+        yield ids[inicio:inicio + TAMANO_BLOQUE]
+
+
+def _reprecificar(filtro):
+    for modelo in _registro:
+        modelo.objects.filter(**filtro).update(costo=modelo.expresion_costo())
+
+
+def recalcular(tarea_ids=None, reprecificar=False):
+    """
+    Reconstruye los costos de todas las tareas (o de `tarea_ids`). Con
+    `reprecificar=True` primero recalcula el costo de cada consumo y asignación
+    con los precios actuales. Retorna el número de tareas actualizadas.
+    """
+    totales = {campo: _suma(modelo) for modelo, campo in _registro.items()}
+    with transaction.atomic():
+        if tarea_ids is None:
+            if reprecificar:
+                _reprecificar({})
+            return Tarea.objects.update(**totales)
+
+        actualizadas = 0
+        for bloque in _bloques(tarea_ids):
+            if reprecificar:
+                _reprecificar({'tarea_id__in': bloque})
+            actualizadas += Tarea.objects.filter(pk__in=bloque).update(**totales)
+        return actualizadas
+
+
+def reporte(desde, hasta, agrupar='lote', finca_id=None):
+    """Costos de las tareas programadas en el rango, agrupados por lote o finca"""
+    campos = AGRUPACIONES[agrupar]
+    tareas = Tarea.objects.filter(fecha_programada__range=(desde, hasta))
+    if finca_id is not None:
+        tareas = tareas.filter(lote__finca_id=finca_id)
+    filas = (
+        tareas.order_by().values(*campos)
+        .annotate(
+            tareas=Count('id'),
+            materiales=Sum('costo_materiales'),
+            mano_obra=Sum('costo_mano_obra'),
+        )
+        .order_by(*campos)
+    )
+
+    grupos = []
+    total_materiales = total_mano_obra = Decimal('0')
+    for fila in filas:
+        total_materiales += fila['materiales']
+        total_mano_obra += fila['mano_obra']
+        grupos.append({
+            **{nombre: fila[campo] for campo, nombre in campos.items()},
+            'tareas': fila['tareas'],
+            'costo_materiales': f"{fila['materiales']:.2f}",
+            'costo_mano_obra': f"{fila['mano_obra']:.2f}",
+            'costo_total': f"{fila['materiales'] + fila['mano_obra']:.2f}",
+        })
+    return {
+        'desde': desde,
+        'hasta': hasta,
+        'agrupar': agrupar,
+        'costo_materiales': f'{total_materiales:.2f}',
+        'costo_mano_obra': f'{total_mano_obra:.2f}',
+        'costo_total': f'{total_materiales + total_mano_obra:.2f}',
+        'grupos': grupos,
+    }
@@ -0,0 +1,40 @@
+import django_filters
+from django.db.models import Q
+
+from .models import Tarea, TipoTarea
+
+
+class NumeroEnFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    """Lista de ids separados por coma: ?finca__in=1,2"""
+
+
+class TareaFilter(django_filters.FilterSet):
+    # Igualdad sobre columnas indexadas en lugar de icontains; fecha con rango _after/_before
+    fecha_programada = django_filters.DateFromToRangeFilter()
+    finca = django_filters.NumberFilter(field_name='lote__finca_id')
+    finca__in = NumeroEnFilter(field_name='lote__finca_id', lookup_expr='in')
+    # Compatibilidad con el antiguo ?search=: estado o nombre de tipo exactos
+    search = django_filters.CharFilter(method='buscar')
+
+    class Meta:
+        model = Tarea
+        fields = {
+            'estado': ['exact', 'in'],
+            'prioridad': ['exact', 'in'],
+            'lote': ['exact', 'in'],
+            'tipo_tarea': ['exact', 'in'],
+        }
+
+    def buscar(self, queryset, name, value):
+        """
+        Resuelve `?search=` como igualdad sobre estado (clave o nombre visible) y
+        sobre los ids de los tipos con ese nombre, en lugar de icontains con join
+        """
+        valor = value.strip().lower()
+        if not valor:
+            return queryset
+        estados = [
+            clave for clave, etiqueta in Tarea.ESTADO_CHOICES if valor in (clave, etiqueta.lower())
+        ]
+        tipos = list(TipoTarea.objects.filter(nombre__iexact=valor).values_list('pk', flat=True))
+        return queryset.filter(Q(estado__in=estados) | Q(tipo_tarea__in=tipos))
@@ -0,0 +1,38 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tarea.recurrencia import materializar
+
+
+class Command(BaseCommand):
+    help = 'Crea las tareas de las plantillas recurrentes activas hasta una fecha'
+
+    def add_arguments(self, parser):
+        parser.add_argument('hasta', help='Fecha final (AAAA-MM-DD)')
+        parser.add_argument('--desde', help='Fecha inicial (AAAA-MM-DD). Por defecto, hoy.')
+        parser.add_argument(
+            '--plantilla', type=int, action='append', dest='plantillas',
+            help='ID de plantilla a materializar (se puede repetir). Por defecto, todas.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true', help='Solo cuenta las tareas a crear'
+        )
+        parser.add_argument('--bloque', type=int, default=1000, help='Tareas por bloque de inserción')
+
+    def handle(self, *args, **options):
+        try:
+            hasta = datetime.date.fromisoformat(options['hasta'])
+            desde = (
+                datetime.date.fromisoformat(options['desde'])
+                if options['desde'] else datetime.date.today()
+            )
+        except ValueError:
+            raise CommandError('Las fechas deben tener formato AAAA-MM-DD')
+
+        resultado = materializar(
+            desde, hasta, options['plantillas'],
+            aplicar=not options['dry_run'], tamano_bloque=options['bloque'],
+        )
+        accion = 'por crear' if options['dry_run'] else 'creada(s)'
+        self.stdout.write(self.style.SUCCESS(f'{resultado["creadas"]} tarea(s) {accion}'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from tarea.costos import recalcular
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el costo de materiales y mano de obra de las tareas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tarea', type=int, action='append', dest='tareas',
+            help='ID de tarea a recalcular (se puede repetir). Por defecto, todas.'
+        )
+        parser.add_argument(
+            '--reprecificar', action='store_true',
+            help='Recalcula cada consumo y asignación con los precios actuales'
+        )
+
+    def handle(self, *args, **options):
+        actualizadas = recalcular(options['tareas'], reprecificar=options['reprecificar'])
+        self.stdout.write(self.style.SUCCESS(f'{actualizadas} tarea(s) recalculada(s)'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0005_indice_paginacion'),
+        ('tarea', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['-fecha_programada', 'prioridad'], name='tarea_tarea_fecha_p_2ae803_idx'),
+        ),
+    ]
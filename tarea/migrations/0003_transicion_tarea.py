@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tarea', '0002_indice_paginacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransicionTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_progreso', 'En Progreso'), ('completada', 'Completada'), ('cancelada', 'Cancelada'), ('pausada', 'Pausada')], max_length=20)),
+                ('estado_nuevo', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_progreso', 'En Progreso'), ('completada', 'Completada'), ('cancelada', 'Cancelada'), ('pausada', 'Pausada')], max_length=20)),
+                ('fecha', models.DateTimeField()),
+                ('observaciones', models.TextField(blank=True)),
+                ('tarea', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transiciones', to='tarea.tarea')),
+            ],
+            options={
+                'verbose_name': 'Transición de Tarea',
+                'verbose_name_plural': 'Transiciones de Tareas',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['tarea', 'fecha'], name='tarea_trans_tarea_i_0965aa_idx')],
+            },
+        ),
+    ]
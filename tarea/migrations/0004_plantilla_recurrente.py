@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:53
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0006_poligono_codificado'),
+        ('tarea', '0003_transicion_tarea'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarea',
+            name='clave_recurrencia',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='PlantillaRecurrente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200, unique=True)),
+                ('titulo', models.CharField(help_text='Título de las tareas generadas', max_length=200)),
+                ('descripcion', models.TextField(blank=True)),
+                ('intervalo_dias', models.PositiveIntegerField(help_text='Días entre una tarea y la siguiente', validators=[django.core.validators.MinValueValidator(1)])),
+                ('fecha_inicio', models.DateField(help_text='Fecha de la primera ocurrencia')),
+                ('fecha_fin', models.DateField(blank=True, null=True)),
+                ('prioridad', models.CharField(choices=[('baja', 'Baja'), ('media', 'Media'), ('alta', 'Alta'), ('urgente', 'Urgente')], default='media', max_length=20)),
+                ('horas_estimadas', models.DecimalField(blank=True, decimal_places=2, help_text='Por defecto, la duración estimada del tipo de tarea', max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0.1)])),
+                ('activa', models.BooleanField(default=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('lotes', models.ManyToManyField(related_name='plantillas_recurrentes', to='fincas.lote')),
+                ('tipo_tarea', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='plantillas', to='tarea.tipotarea')),
+            ],
+            options={
+                'verbose_name': 'Plantilla Recurrente',
+                'verbose_name_plural': 'Plantillas Recurrentes',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.AddField(
+            model_name='tarea',
+            name='plantilla',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tareas', to='tarea.plantillarecurrente'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:59
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+
+
+def _suma(modelo):
+    total = (
+        modelo.objects.filter(tarea=OuterRef('pk'))
+        .order_by().values('tarea').annotate(total=Sum('costo')).values('total')
+    )
+    return Coalesce(
+        Subquery(total), Value(Decimal('0')),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+def calcular_costos(apps, schema_editor):
+    """Costo de los consumos y asignaciones existentes y totales por tarea"""
+    Tarea = apps.get_model('tarea', 'Tarea')
+    Consumo = apps.get_model('insumos', 'Consumo')
+    Insumo = apps.get_model('insumos', 'Insumo')
+    Asignacion = apps.get_model('trabajadores', 'Asignacion')
+    Trabajador = apps.get_model('trabajadores', 'Trabajador')
+    decimal = models.DecimalField(max_digits=12, decimal_places=2)
+
+    precio = Insumo.objects.filter(pk=OuterRef('insumo_id')).values('precio_unitario')
+    Consumo.objects.update(
+        costo=models.ExpressionWrapper(F('cantidad') * Subquery(precio), output_field=decimal)
+    )
+    valor_hora = Trabajador.objects.filter(pk=OuterRef('trabajador_id')).values('valor_hora')
+    horas = Coalesce(NullIf('horas_trabajadas', Value(0)), 'horas_asignadas')
+    Asignacion.objects.update(
+        costo=models.ExpressionWrapper(horas * Subquery(valor_hora), output_field=decimal)
+    )
+    Tarea.objects.update(
+        costo_materiales=_suma(Consumo), costo_mano_obra=_suma(Asignacion)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tarea', '0004_plantilla_recurrente'),
+        ('insumos', '0003_costo_consumo'),
+        ('trabajadores', '0003_costo_asignacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarea',
+            name='costo_mano_obra',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='tarea',
+            name='costo_materiales',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(calcular_costos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fincas', '0006_poligono_codificado'),
+        ('tarea', '0005_costos_tarea'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['estado', '-fecha_programada', 'prioridad'], name='tarea_tarea_estado_626e02_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['lote', 'estado', '-fecha_programada', 'prioridad'], name='tarea_tarea_lote_id_f163fd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['tipo_tarea', '-fecha_programada', 'prioridad'], name='tarea_tarea_tipo_ta_e8db9e_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='tarea',
+            name='tarea_tarea_lote_id_4cd226_idx',
+        ),
+    ]
@@ -1,5 +1,8 @@
+import datetime
+
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Coalesce
 from fincas.models import Lote
 
 
@@ -39,6 +42,29 @@ class TipoTarea(models.Model):
         return f"{self.nombre} ({self.get_categoria_display()})"
 
 
+class TareaQuerySet(models.QuerySet):
+    """Consultas de tareas con los totales de asignaciones y consumos"""
+    
+    def _conteo(self, relacion):
+        # Subconsulta por tarea: no multiplica las filas como un JOIN con COUNT
+        campo = self.model._meta.get_field(relacion)
+        conteo = (
+            campo.related_model.objects.filter(**{campo.field.name: models.OuterRef('pk')})
+            .order_by()
+            .values(campo.field.name)
+            .annotate(total=models.Count('pk'))
+            .values('total')
+        )
+        return Coalesce(models.Subquery(conteo, output_field=models.IntegerField()), 0)
+    
+    def con_totales(self):
+        """Anota num_trabajadores y num_insumos en la misma consulta"""
+        return self.annotate(
+            num_trabajadores=self._conteo('asignaciones'),
+            num_insumos=self._conteo('consumos'),
+        )
+
+
 class Tarea(models.Model):
     """Modelo para representar tareas agrícolas"""
     
@@ -50,6 +76,17 @@ class Tarea(models.Model):
         ('pausada', 'Pausada'),
     ]
     
+    # Estados a los que puede pasar una tarea desde cada estado
+    TRANSICIONES = {
+        'pendiente': {'en_progreso', 'completada', 'cancelada'},
+        'en_progreso': {'pausada', 'completada', 'cancelada'},
+        'pausada': {'en_progreso', 'cancelada'},
+        'completada': set(),
+        'cancelada': {'pendiente'},
+    }
+    # Los mantiene tarea/costos.py con UPDATE; save() no los sobrescribe
+    CAMPOS_COSTO = ['costo_materiales', 'costo_mano_obra']
+    
     PRIORIDAD_CHOICES = [
         ('baja', 'Baja'),
         ('media', 'Media'),
@@ -108,17 +145,53 @@ class Tarea(models.Model):
         blank=True,
         validators=[MinValueValidator(0)]
     )
+    # Totales de consumos y asignaciones, mantenidos por tarea/costos.py
+    costo_materiales = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+    costo_mano_obra = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
     observaciones = models.TextField(blank=True)
+    # Tareas generadas por una plantilla recurrente: "plantilla:lote:fecha"
+    plantilla = models.ForeignKey(
+        'PlantillaRecurrente',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='tareas'
+    )
+    clave_recurrencia = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False
+    )
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     
+    objects = TareaQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-fecha_programada', 'prioridad']
         verbose_name = 'Tarea'
         verbose_name_plural = 'Tareas'
         indexes = [
             models.Index(fields=['fecha_programada', 'estado']),
-            models.Index(fields=['lote', 'estado']),
+            # Ordenamiento de la paginación; InnoDB agrega el id al final del índice
+            models.Index(fields=['-fecha_programada', 'prioridad']),
+            # Filtros de TareaFilter seguidos del ordenamiento por defecto, para
+            # que cada página se lea en orden desde el índice sin ordenar en memoria
+            models.Index(fields=['estado', '-fecha_programada', 'prioridad']),
+            models.Index(fields=['lote', 'estado', '-fecha_programada', 'prioridad']),
+            models.Index(fields=['tipo_tarea', '-fecha_programada', 'prioridad']),
         ]
     
     def __str__(self):
@@ -126,12 +199,33 @@ class Tarea(models.Model):
     
     def total_trabajadores(self):
         """Retorna el número de trabajadores asignados"""
+        if hasattr(self, 'num_trabajadores'):
+            return self.num_trabajadores
         return self.asignaciones.count()
     
     def total_insumos(self):
         """Retorna el número de insumos utilizados"""
+        if hasattr(self, 'num_insumos'):
+            return self.num_insumos
         return self.consumos.count()
     
+    def save(self, *args, **kwargs):
+        # Una instancia leída antes de un consumo o asignación trae totales viejos
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [
+                    f.attname for f in self._meta.concrete_fields if not f.primary_key
+                ]
+            kwargs['update_fields'] = [
+                campo for campo in update_fields if campo not in self.CAMPOS_COSTO
+            ]
+        super().save(*args, **kwargs)
+    
+    def costo_calculado(self):
+        """Retorna el costo de materiales más el de mano de obra"""
+        return self.costo_materiales + self.costo_mano_obra
+    
     def eficiencia_tiempo(self):
         """Calcula la eficiencia en tiempo (% horas reales vs estimadas)"""
         if self.horas_reales and self.horas_estimadas:
@@ -142,4 +236,91 @@ class Tarea(models.Model):
         """Calcula la eficiencia en costo (% costo real vs estimado)"""
         if self.costo_real and self.costo_estimado:
             return round((self.costo_estimado / self.costo_real) * 100, 2)
-        return None
\ No newline at end of file
+        return None
+
+
+class PlantillaRecurrente(models.Model):
+    """Regla para generar una tarea cada N días en un conjunto de lotes"""
+    
+    nombre = models.CharField(max_length=200, unique=True)
+    tipo_tarea = models.ForeignKey(
+        TipoTarea,
+        on_delete=models.PROTECT,
+        related_name='plantillas'
+    )
+    lotes = models.ManyToManyField(Lote, related_name='plantillas_recurrentes')
+    titulo = models.CharField(max_length=200, help_text="Título de las tareas generadas")
+    descripcion = models.TextField(blank=True)
+    intervalo_dias = models.PositiveIntegerField(
+        validators=[MinValueValidator(1)],
+        help_text="Días entre una tarea y la siguiente"
+    )
+    fecha_inicio = models.DateField(help_text="Fecha de la primera ocurrencia")
+    fecha_fin = models.DateField(null=True, blank=True)
+    prioridad = models.CharField(
+        max_length=20,
+        choices=Tarea.PRIORIDAD_CHOICES,
+        default='media'
+    )
+    horas_estimadas = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0.1)],
+        help_text="Por defecto, la duración estimada del tipo de tarea"
+    )
+    activa = models.BooleanField(default=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['nombre']
+        verbose_name = 'Plantilla Recurrente'
+        verbose_name_plural = 'Plantillas Recurrentes'
+    
+    def __str__(self):
+        return f"{self.nombre} (cada {self.intervalo_dias} días)"
+    
+    def fechas(self, desde, hasta):
+        """Retorna las fechas de las ocurrencias entre desde y hasta"""
+        inicio = max(desde, self.fecha_inicio)
+        fin = min(hasta, self.fecha_fin) if self.fecha_fin else hasta
+        # Primera ocurrencia alineada con fecha_inicio
+        desfase = (inicio - self.fecha_inicio).days % self.intervalo_dias
+        if desfase:
+            inicio += datetime.timedelta(days=self.intervalo_dias - desfase)
+        fechas = []
+        while inicio <= fin:
+            fechas.append(inicio)
+            inicio += datetime.timedelta(days=self.intervalo_dias)
+        return fechas
+    
+    def clave(self, lote_id, fecha):
+        """Clave de idempotencia de la ocurrencia de un lote en una fecha"""
+        return f'{self.pk}:{lote_id}:{fecha.isoformat()}'
+
+
+class TransicionTarea(models.Model):
+    """Registro de solo inserción de los cambios de estado de las tareas"""
+    
+    tarea = models.ForeignKey(
+        Tarea,
+        on_delete=models.CASCADE,
+        related_name='transiciones'
+    )
+    estado_anterior = models.CharField(max_length=20, choices=Tarea.ESTADO_CHOICES)
+    estado_nuevo = models.CharField(max_length=20, choices=Tarea.ESTADO_CHOICES)
+    fecha = models.DateTimeField()
+    observaciones = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name = 'Transición de Tarea'
+        verbose_name_plural = 'Transiciones de Tareas'
+        indexes = [
+            models.Index(fields=['tarea', 'fecha']),
+        ]
+    
+    def __str__(self):
+        return f"{self.tarea_id}: {self.estado_anterior} → {self.estado_nuevo}"
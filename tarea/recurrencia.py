@@ -0,0 +1,101 @@
+"""
+Generación de tareas a partir de plantillas recurrentes.
+
+Cada ocurrencia (plantilla, lote, fecha) tiene una clave única
+`Tarea.clave_recurrencia`. Las claves ya generadas del rango se leen por prefijo
+sobre su índice único, de modo que volver a materializar la misma ventana no
+duplica tareas; las nuevas se insertan con bulk_create por lotes en una sola
+transacción (ignorando conflictos por si otra materialización concurrente ganó
+la carrera, en cuyo caso esas filas no se cuentan como creadas).
+"""
+import itertools
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from config.versiones import incrementar_version
+from fincas.models import Lote
+from fincas.tablero import VERSION_TAREAS
+
+from .models import PlantillaRecurrente, Tarea
+
+TAMANO_BLOQUE = 1000
+# Rango máximo de una materialización desde la API (un año)
+MAX_DIAS = 366
+
+
+def _filas_plantilla(plantilla, desde, hasta):
+    """Genera (lote_id, clave, fecha) de las ocurrencias nuevas de una plantilla"""
+    fechas = plantilla.fechas(desde, hasta)
+    if not fechas:
+        return
+    existentes = set(
+        Tarea.objects.filter(
+            clave_recurrencia__startswith=f'{plantilla.pk}:',
+            fecha_programada__range=(fechas[0], fechas[-1]),
+        ).values_list('clave_recurrencia', flat=True)
+    )
+    lotes = [lote.pk for lote in plantilla.lotes.all() if lote.estado != 'inactivo']
+    for lote_id in lotes:
+        for fecha in fechas:
+            clave = plantilla.clave(lote_id, fecha)
+            if clave not in existentes:
+                yield lote_id, clave, fecha
+
+
+def _tareas(plantilla, filas):
+    """Instancias de Tarea de las filas (lote_id, clave, fecha) de una plantilla"""
+    descripcion = plantilla.descripcion or f'Generada por la plantilla "{plantilla.nombre}"'
+    horas = plantilla.horas_estimadas or plantilla.tipo_tarea.duracion_estimada_horas
+    return [
+        Tarea(
+            lote_id=lote_id, tipo_tarea_id=plantilla.tipo_tarea_id, plantilla_id=plantilla.pk,
+            clave_recurrencia=clave, fecha_programada=fecha, titulo=plantilla.titulo,
+            descripcion=descripcion, prioridad=plantilla.prioridad, horas_estimadas=horas,
+        )
+        for lote_id, clave, fecha in filas
+    ]
+
+
+def materializar(desde, hasta, plantilla_ids=None, aplicar=True, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Crea las tareas de las plantillas activas (o de `plantilla_ids`) programadas
+    entre `desde` y `hasta` que aún no existen. Con `aplicar=False` solo las cuenta.
+
+    Retorna {'creadas': n, 'por_plantilla': {id: n}}.
+    """
+    plantillas = (
+        PlantillaRecurrente.objects.filter(activa=True)
+        .select_related('tipo_tarea')
+        .prefetch_related(Prefetch('lotes', queryset=Lote.objects.only('pk', 'estado')))
+    )
+    if plantilla_ids is not None:
+        plantillas = plantillas.filter(pk__in=plantilla_ids)
+
+    por_plantilla = {}
+    with transaction.atomic():
+        for plantilla in plantillas:
+            filas = _filas_plantilla(plantilla, desde, hasta)
+            if not aplicar:
+                por_plantilla[plantilla.pk] = sum(1 for _ in filas)
+                continue
+            total = 0
+            while True:
+                bloque = list(itertools.islice(filas, tamano_bloque))
+                if not bloque:
+                    break
+                # Se cuentan las filas de las claves antes y después de insertar: las
+                # que otra materialización creó primero se ignoran y no suman
+                claves = Tarea.objects.filter(clave_recurrencia__in=[c for _, c, _ in bloque])
+                antes = claves.count()
+                Tarea.objects.bulk_create(
+                    _tareas(plantilla, bloque), batch_size=tamano_bloque, ignore_conflicts=True
+                )
+                total += claves.count() - antes
+            por_plantilla[plantilla.pk] = total
+
+        creadas = sum(por_plantilla.values())
+        if aplicar and creadas:
+            incrementar_version(VERSION_TAREAS)
+
+    return {'creadas': creadas, 'por_plantilla': por_plantilla}
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import TipoTarea, Tarea
+from .models import TipoTarea, Tarea, PlantillaRecurrente
 
 class TipoTareaSerializer(serializers.ModelSerializer):
 
@@ -15,6 +15,72 @@ class TipoTareaSerializer(serializers.ModelSerializer):
 
 
 class TareaSerializer(serializers.ModelSerializer):
+    """El estado solo cambia por /tareas/transicion/, que valida y registra cada cambio"""
+    lote_codigo = serializers.CharField(source='lote.codigo', read_only=True)
+    tipo_tarea_nombre = serializers.CharField(source='tipo_tarea.nombre', read_only=True)
+    total_trabajadores = serializers.IntegerField(read_only=True)
+    total_insumos = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Tarea
         fields = '__all__'
+        read_only_fields = ['estado']
+
+
+class TareaListSerializer(serializers.ModelSerializer):
+    """Serializador simplificado para listar tareas"""
+    lote_codigo = serializers.CharField(source='lote.codigo', read_only=True)
+    tipo_tarea_nombre = serializers.CharField(source='tipo_tarea.nombre', read_only=True)
+    total_trabajadores = serializers.IntegerField(read_only=True)
+    total_insumos = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Tarea
+        fields = [
+            'id', 'titulo', 'lote', 'lote_codigo', 'tipo_tarea', 'tipo_tarea_nombre',
+            'fecha_programada', 'estado', 'prioridad', 'total_trabajadores',
+            'total_insumos',
+        ]
+
+
+class PlantillaRecurrenteSerializer(serializers.ModelSerializer):
+    tipo_tarea_nombre = serializers.CharField(source='tipo_tarea.nombre', read_only=True)
+
+    class Meta:
+        model = PlantillaRecurrente
+        fields = '__all__'
+
+    def validate(self, attrs):
+        inicio = attrs.get('fecha_inicio', getattr(self.instance, 'fecha_inicio', None))
+        fin = attrs.get('fecha_fin', getattr(self.instance, 'fecha_fin', None))
+        if inicio and fin and fin < inicio:
+            raise serializers.ValidationError({'fecha_fin': ['Debe ser posterior a fecha_inicio.']})
+        return attrs
+
+
+class CambioEstadoSerializer(serializers.Serializer):
+    tarea = serializers.IntegerField()
+    estado = serializers.ChoiceField(choices=Tarea.ESTADO_CHOICES)
+
+
+class TransicionSerializer(serializers.Serializer):
+    """Cambio de estado masivo: `tareas` + `estado`, o `cambios` con un estado por tarea"""
+    MAX_CAMBIOS = 5000
+
+    tareas = serializers.ListField(child=serializers.IntegerField(), required=False)
+    estado = serializers.ChoiceField(choices=Tarea.ESTADO_CHOICES, required=False)
+    cambios = CambioEstadoSerializer(many=True, required=False)
+    observaciones = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        cambios = [(c['tarea'], c['estado']) for c in attrs.get('cambios', [])]
+        if attrs.get('tareas'):
+            if 'estado' not in attrs:
+                raise serializers.ValidationError({'estado': ['Requerido junto con tareas.']})
+            cambios += [(tarea, attrs['estado']) for tarea in attrs['tareas']]
+        if not cambios:
+            raise serializers.ValidationError('Envíe tareas y estado, o cambios.')
+        if len(cambios) > self.MAX_CAMBIOS:
+            raise serializers.ValidationError(f'Máximo {self.MAX_CAMBIOS} cambios por solicitud.')
+        attrs['lista_cambios'] = cambios
+        return attrs
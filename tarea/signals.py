@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from config.versiones import incrementar_version
+from fincas.tablero import VERSION_TAREAS
+
+from .models import Tarea
+
+
+@receiver(post_save, sender=Tarea)
+@receiver(post_delete, sender=Tarea)
+def invalidar_tablero(sender, instance, **kwargs):
+    """Invalida el tablero de lotes en caché"""
+    incrementar_version(VERSION_TAREAS)
@@ -1,3 +1,355 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from rest_framework.test import APITestCase
+
+from fincas.models import Finca, Lote
+from insumos.models import Consumo, Insumo
+from trabajadores.models import Asignacion, Trabajador
+
+from . import recurrencia
+from .costos import recalcular
+from .models import PlantillaRecurrente, Tarea, TipoTarea
+
+
+class TareasBase(APITestCase):
+    """Finca, lotes, trabajadores e insumo comunes; crear_tareas() agrega tareas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        finca = Finca.objects.create(
+            nombre='Finca Test', ubicacion='Vereda', area_total=100,
+            latitud=4.6, longitud=-74.1, propietario='Propietario'
+        )
+        cls.lote = Lote.objects.create(finca=finca, codigo='L-1', nombre='Lote 1', area=5)
+        cls.otro_lote = Lote.objects.create(finca=finca, codigo='L-2', nombre='Lote 2', area=3)
+        cls.tipo = TipoTarea.objects.create(
+            nombre='Riego', categoria='riego', duracion_estimada_horas=2
+        )
+        cls.trabajadores = [
+            Trabajador.objects.create(
+                numero_identificacion=str(1000 + i), nombres=f'Nombre {i}', apellidos='Apellido',
+                fecha_nacimiento=datetime.date(1990, 1, 1), rol='operario',
+                fecha_ingreso=datetime.date(2020, 1, 1), salario_base=1000, valor_hora=10
+            )
+            for i in range(3)
+        ]
+        cls.insumo = Insumo.objects.create(
+            codigo='INS-1', nombre='Urea', categoria='fertilizante',
+            stock_actual=100, stock_minimo=10, precio_unitario=5
+        )
+
+    def crear_tareas(self, cantidad, lote=None, estado='pendiente'):
+        for i in range(cantidad):
+            tarea = Tarea.objects.create(
+                lote=lote or self.lote, tipo_tarea=self.tipo, titulo=f'Tarea {i}',
+                descripcion='Descripción', fecha_programada=datetime.date(2025, 1, 1 + i % 28),
+                estado=estado, horas_estimadas=2
+            )
+            for trabajador in self.trabajadores[:2]:
+                Asignacion.objects.create(trabajador=trabajador, tarea=tarea, horas_asignadas=2)
+            Consumo.objects.create(insumo=self.insumo, tarea=tarea, cantidad=1)
+
+
+class TareaConsultasTests(TareasBase):
+    """El número de consultas de los listados no depende del número de tareas"""
+
+    def test_listado_con_consultas_constantes(self):
+        self.crear_tareas(3)
+        with self.assertNumQueries(1):
+            respuesta = self.client.get('/api/operaciones/tareas/')
+        self.assertEqual(respuesta.status_code, 200)
+
+        self.crear_tareas(12)
+        with self.assertNumQueries(1):
+            respuesta = self.client.get('/api/operaciones/tareas/')
+        resultados = respuesta.json()['results']
+        self.assertEqual(len(resultados), 15)
+        self.assertEqual(resultados[0]['total_trabajadores'], 2)
+        self.assertEqual(resultados[0]['total_insumos'], 1)
+        self.assertEqual(resultados[0]['lote_codigo'], 'L-1')
+        self.assertNotIn('descripcion', resultados[0])
+
+    def test_detalle_con_una_consulta(self):
+        self.crear_tareas(1)
+        tarea = Tarea.objects.get()
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(f'/api/operaciones/tareas/{tarea.pk}/')
+        datos = respuesta.json()
+        self.assertEqual(datos['descripcion'], 'Descripción')
+        self.assertEqual(datos['total_trabajadores'], 2)
+        self.assertEqual(datos['tipo_tarea_nombre'], 'Riego')
+
+    def test_tareas_por_lote_paginado_y_filtrado(self):
+        self.crear_tareas(4)
+        self.crear_tareas(2, estado='completada')
+        self.crear_tareas(3, lote=self.otro_lote)
+        url = f'/api/operaciones/tareas/por-lote/{self.lote.pk}/'
+
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(url, {'estado': 'pendiente'})
+        datos = respuesta.json()
+        self.assertEqual(len(datos['results']), 4)
+        self.assertTrue(all(t['estado'] == 'pendiente' for t in datos['results']))
+
+        with self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'PAGE_SIZE': 4}):
+            primera = self.client.get(url).json()
+            self.assertEqual(len(primera['results']), 4)
+            with self.assertNumQueries(1):
+                segunda = self.client.get(primera['next']).json()
+        self.assertEqual(len(segunda['results']), 2)
+        self.assertIsNone(segunda['next'])
+        ids = {t['id'] for t in primera['results'] + segunda['results']}
+        self.assertEqual(ids, set(Tarea.objects.filter(lote=self.lote).values_list('pk', flat=True)))
+
+    def test_calendario_cambia_al_eliminar_o_mover_tareas(self):
+        self.crear_tareas(3)
+        url = '/api/operaciones/tareas/calendario/'
+        rango = {'desde': '2025-01-01', 'hasta': '2025-01-31'}
+        respuesta = self.client.get(url, rango)
+        self.assertNotIn('Last-Modified', respuesta)
+        etag = respuesta['ETag']
+        self.assertEqual(self.client.get(url, rango, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Tarea.objects.filter(fecha_programada=datetime.date(2025, 1, 3)).delete()
+        respuesta = self.client.get(url, rango, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(sum(d['total_tareas'] for d in respuesta.json()['dias']), 2)
+
+        etag = respuesta['ETag']
+        Tarea.objects.filter(fecha_programada=datetime.date(2025, 1, 2)).update(
+            fecha_programada=datetime.date(2025, 3, 1)
+        )
+        respuesta = self.client.get(url, rango, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(sum(d['total_tareas'] for d in respuesta.json()['dias']), 1)
+
+    def test_estado_solo_cambia_por_transicion(self):
+        self.crear_tareas(1)
+        tarea = Tarea.objects.get()
+        url = f'/api/operaciones/tareas/{tarea.pk}/'
+        respuesta = self.client.patch(url, {'estado': 'completada'}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, 'pendiente')
+
+        respuesta = self.client.post(
+            '/api/operaciones/tareas/transicion/',
+            {'tareas': [tarea.pk], 'estado': 'en_progreso'}, format='json'
+        )
+        self.assertEqual(respuesta.json()['aplicadas'], 1)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, 'en_progreso')
+        self.assertEqual(tarea.transiciones.get().estado_anterior, 'pendiente')
+
+
+class EficienciaTests(APITestCase):
+    """La analítica vectorizada coincide con el cálculo a mano por tarea"""
+
+    @classmethod
+    def setUpTestData(cls):
+        finca = Finca.objects.create(
+            nombre='Finca Test', ubicacion='Vereda', area_total=100,
+            latitud=4.6, longitud=-74.1, propietario='Propietario'
+        )
+        cls.lote = Lote.objects.create(finca=finca, codigo='L-1', nombre='Lote 1', area=5)
+        cls.otro_lote = Lote.objects.create(finca=finca, codigo='L-2', nombre='Lote 2', area=3)
+        riego = TipoTarea.objects.create(nombre='Riego', categoria='riego', duracion_estimada_horas=2)
+        poda = TipoTarea.objects.create(nombre='Poda', categoria='poda', duracion_estimada_horas=2)
+        # (lote, tipo, horas estimadas, horas reales, costo estimado, costo real)
+        filas = [
+            (cls.lote, riego, 1, 2, 100, 100),
+            (cls.lote, riego, 2, 2, 100, 50),
+            (cls.lote, riego, 3, 3, 100, 0),
+            (cls.lote, riego, 4, 2, 100, 200),
+            (cls.lote, riego, 8, 2, 100, None),
+            (cls.otro_lote, poda, 3, None, 90, 60),
+            (cls.otro_lote, poda, 3, 4, 0, 10),
+        ]
+        cls.tareas = [
+            Tarea.objects.create(
+                lote=lote, tipo_tarea=tipo, titulo=f'Tarea {i}', descripcion='',
+                fecha_programada=datetime.date(2025, 2, 1 + i), horas_estimadas=he,
+                horas_reales=hr, costo_estimado=ce, costo_real=cr
+            )
+            for i, (lote, tipo, he, hr, ce, cr) in enumerate(filas)
+        ]
+
+    def test_distribucion_por_lote_y_categoria(self):
+        respuesta = self.client.get('/api/operaciones/tareas/eficiencia/', {
+            'desde': '2025-02-01', 'hasta': '2025-02-28'
+        })
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['total_tareas'], 7)
+        lotes = {grupo['clave']: grupo for grupo in datos['por_lote']}
+
+        # Tiempo del lote 1: [50, 100, 100, 200, 400]; el 400 supera p75 + 1.5·RIC = 350
+        tiempo = lotes[self.lote.pk]['tiempo']
+        self.assertEqual(
+            sorted(float(t.eficiencia_tiempo()) for t in self.tareas[:5]),
+            [50, 100, 100, 200, 400]
+        )
+        self.assertEqual(tiempo['n'], 5)
+        self.assertEqual(tiempo['media'], 170)
+        self.assertEqual(tiempo['percentiles'], {
+            'p10': 70, 'p25': 100, 'p50': 100, 'p75': 200, 'p90': 320
+        })
+        self.assertEqual(tiempo['atipicos'], 1)
+        self.assertEqual(tiempo['tareas_atipicas'], [self.tareas[4].pk])
+
+        # Costo del lote 1: sin costo real (0 o nulo) no cuenta: [50, 100, 200]
+        costo = lotes[self.lote.pk]['costo']
+        self.assertEqual(costo['n'], 3)
+        self.assertEqual(costo['media'], round((50 + 100 + 200) / 3, 2))
+        self.assertEqual(costo['percentiles']['p50'], 100)
+        self.assertEqual(costo['atipicos'], 0)
+
+        # Lote 2: una tarea sin horas reales y otra sin costo estimado
+        otro = lotes[self.otro_lote.pk]
+        self.assertEqual(otro['tareas'], 2)
+        self.assertEqual(otro['tiempo']['media'], 75)
+        self.assertEqual(otro['costo']['media'], 150)
+
+        categorias = {grupo['clave']: grupo for grupo in datos['por_categoria']}
+        self.assertEqual(categorias['poda']['tiempo']['n'], 1)
+        fincas = datos['por_finca']
+        self.assertEqual(len(fincas), 1)
+        self.assertEqual(fincas[0]['tiempo']['n'], 6)
+
+
+class MaterializarTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        finca = Finca.objects.create(
+            nombre='Finca Test', ubicacion='Vereda', area_total=100,
+            latitud=4.6, longitud=-74.1, propietario='Propietario'
+        )
+        lotes = [
+            Lote.objects.create(finca=finca, codigo=f'L-{i}', nombre=f'Lote {i}', area=5)
+            for i in range(3)
+        ]
+        tipo = TipoTarea.objects.create(nombre='Riego', categoria='riego', duracion_estimada_horas=2)
+        cls.plantilla = PlantillaRecurrente.objects.create(
+            nombre='Riego semanal', tipo_tarea=tipo, titulo='Riego', intervalo_dias=7,
+            fecha_inicio=datetime.date(2025, 1, 1)
+        )
+        cls.plantilla.lotes.set(lotes)
+        cls.url = '/api/operaciones/plantillas-recurrentes/materializar/'
+
+    def materializar(self, hasta, **parametros):
+        return self.client.post(
+            f'{self.url}?desde=2025-01-01&hasta={hasta}'
+            + ''.join(f'&{k}={v}' for k, v in parametros.items())
+        )
+
+    def test_materializar_dos_veces_crea_cada_ocurrencia_una_vez(self):
+        # 2025-01-01 a 2025-03-31: 13 fechas por lote
+        simulacion = self.materializar('2025-03-31', dry_run='true').json()
+        self.assertEqual(simulacion['creadas'], 39)
+        self.assertFalse(Tarea.objects.exists())
+
+        respuesta = self.materializar('2025-03-31')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['creadas'], simulacion['creadas'])
+        self.assertEqual(Tarea.objects.count(), 39)
+        tarea = Tarea.objects.order_by('fecha_programada', 'lote').first()
+        self.assertEqual(tarea.clave_recurrencia, self.plantilla.clave(tarea.lote_id, tarea.fecha_programada))
+        self.assertEqual(tarea.horas_estimadas, 2)
+
+        # Repetir y ampliar la ventana solo crea las fechas nuevas
+        self.assertEqual(self.materializar('2025-03-31').json()['creadas'], 0)
+        self.assertEqual(self.materializar('2025-04-07', dry_run='true').json()['creadas'], 3)
+        self.assertEqual(self.materializar('2025-04-07').json()['creadas'], 3)
+        self.assertEqual(Tarea.objects.count(), 42)
+        self.assertEqual(
+            Tarea.objects.values('clave_recurrencia').distinct().count(), 42
+        )
+
+    def test_cuenta_solo_las_filas_insertadas(self):
+        self.assertEqual(self.materializar('2025-03-31').json()['creadas'], 39)
+
+        # Como si otra materialización hubiera creado las tareas después de leer
+        # las claves existentes: todas las filas chocan con el índice único
+        def sin_existentes(plantilla, desde, hasta):
+            return (
+                (lote.pk, plantilla.clave(lote.pk, fecha), fecha)
+                for lote in plantilla.lotes.all() for fecha in plantilla.fechas(desde, hasta)
+            )
+
+        with mock.patch.object(recurrencia, '_filas_plantilla', side_effect=sin_existentes):
+            segunda = self.materializar('2025-04-07').json()
+        self.assertEqual(segunda['creadas'], 3)
+        self.assertEqual(segunda['por_plantilla'], {str(self.plantilla.pk): 3})
+        self.assertEqual(Tarea.objects.count(), 42)
+
+    def test_rango_limitado(self):
+        respuesta = self.materializar('2026-01-02')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Tarea.objects.exists())
+
+
+class CostosTests(TareasBase):
+    """Los totales incrementales coinciden con recalcular() y save() no los pisa"""
+
+    def totales(self):
+        return dict(
+            (pk, (materiales, mano_obra)) for pk, materiales, mano_obra in
+            Tarea.objects.order_by('pk').values_list('pk', 'costo_materiales', 'costo_mano_obra')
+        )
+
+    def test_recalcular_coincide_con_los_incrementos(self):
+        self.crear_tareas(4)
+        primera, segunda, tercera, _ = Tarea.objects.order_by('pk')
+        consumo = Consumo.objects.filter(tarea=primera).get()
+        consumo.cantidad = 3
+        consumo.save()
+        Consumo.objects.filter(tarea=segunda).get().delete()
+        asignacion = Asignacion.objects.create(
+            trabajador=self.trabajadores[2], tarea=tercera, horas_asignadas=1
+        )
+        asignacion.tarea = segunda
+        asignacion.save()
+
+        incrementales = self.totales()
+        self.assertEqual(incrementales[primera.pk], (Decimal('15.00'), Decimal('40.00')))
+        self.assertEqual(incrementales[segunda.pk], (Decimal('0.00'), Decimal('50.00')))
+        self.assertEqual(incrementales[tercera.pk], (Decimal('5.00'), Decimal('40.00')))
+        Tarea.objects.update(costo_materiales=0, costo_mano_obra=0)
+        recalcular()
+        self.assertEqual(self.totales(), incrementales)
+
+    def test_guardar_una_tarea_leida_antes_no_pisa_los_totales(self):
+        self.crear_tareas(1)
+        tarea = Tarea.objects.get()
+        Consumo.objects.create(insumo=self.insumo, tarea=tarea, cantidad=2)
+        tarea.titulo = 'Renombrada'
+        tarea.save()
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.titulo, 'Renombrada')
+        self.assertEqual(tarea.costo_materiales, Decimal('15.00'))
+        self.assertEqual(tarea.costo_mano_obra, Decimal('40.00'))
+
+
+class TareaBusquedaTests(TareasBase):
+
+    def test_search_y_filtros(self):
+        self.crear_tareas(2)
+        self.crear_tareas(1, estado='completada')
+        poda = TipoTarea.objects.create(nombre='Poda', categoria='poda', duracion_estimada_horas=1)
+        Tarea.objects.filter(estado='completada').update(tipo_tarea=poda)
+
+        def ids(parametros):
+            respuesta = self.client.get('/api/operaciones/tareas/', parametros)
+            return {t['id'] for t in respuesta.json()['results']}
+
+        completada = Tarea.objects.get(estado='completada').pk
+        self.assertEqual(ids({'search': 'poda'}), {completada})
+        self.assertEqual(ids({'search': 'Completada'}), {completada})
+        # Ya no es una búsqueda de subcadenas
+        self.assertEqual(ids({'search': 'complet'}), set())
+        self.assertEqual(ids({'estado': 'completada'}), {completada})
+        self.assertEqual(len(ids({'search': 'riego', 'estado': 'pendiente'})), 2)
@@ -0,0 +1,91 @@
+"""
+Cambios de estado masivos de tareas.
+
+Los estados actuales se leen y bloquean con una sola consulta, las transiciones
+se validan contra Tarea.TRANSICIONES en memoria y se aplican con un UPDATE por
+estado destino. El registro de transiciones se escribe con bulk_create; todo
+ocurre en una sola transacción.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from config.versiones import incrementar_version
+from fincas.tablero import VERSION_TAREAS
+
+from .models import Tarea, TransicionTarea
+
+
+def _campos_fecha(estado, ahora):
+    """Fechas que se sellan al pasar a `estado`"""
+    if estado == 'en_progreso':
+        return {'fecha_inicio': Coalesce(F('fecha_inicio'), ahora)}
+    if estado == 'completada':
+        return {'fecha_inicio': Coalesce(F('fecha_inicio'), ahora), 'fecha_fin': ahora}
+    if estado == 'cancelada':
+        return {'fecha_fin': ahora}
+    if estado == 'pendiente':
+        return {'fecha_inicio': None, 'fecha_fin': None}
+    return {}
+
+
+def aplicar_transiciones(cambios, observaciones='', parcial=False):
+    """
+    Aplica los cambios [(tarea_id, estado_nuevo)]. Si alguno no es válido no se
+    aplica ninguno, salvo que `parcial=True`.
+
+    Retorna {'aplicadas': n, 'errores': [{'tarea', 'error'}]}.
+    """
+    estados_validos = dict(Tarea.ESTADO_CHOICES)
+    errores = []
+    destinos = {}
+    for tarea_id, estado in cambios:
+        if estado not in estados_validos:
+            errores.append({'tarea': tarea_id, 'error': f'"{estado}" no es un estado válido.'})
+        elif tarea_id in destinos:
+            errores.append({'tarea': tarea_id, 'error': 'La tarea aparece más de una vez.'})
+        else:
+            destinos[tarea_id] = estado
+
+    with transaction.atomic():
+        actuales = dict(
+            Tarea.objects.select_for_update()
+            .filter(pk__in=list(destinos))
+            .values_list('pk', 'estado')
+        )
+        por_destino = defaultdict(list)
+        registro = []
+        ahora = timezone.now()
+        for tarea_id, estado in destinos.items():
+            anterior = actuales.get(tarea_id)
+            if anterior is None:
+                errores.append({'tarea': tarea_id, 'error': 'La tarea no existe.'})
+            elif estado == anterior:
+                continue
+            elif estado not in Tarea.TRANSICIONES[anterior]:
+                errores.append({
+                    'tarea': tarea_id,
+                    'error': f'No se permite pasar de "{anterior}" a "{estado}".',
+                })
+            else:
+                por_destino[estado].append(tarea_id)
+                registro.append(TransicionTarea(
+                    tarea_id=tarea_id, estado_anterior=anterior, estado_nuevo=estado,
+                    fecha=ahora, observaciones=observaciones,
+                ))
+
+        if errores and not parcial:
+            return {'aplicadas': 0, 'errores': errores}
+
+        for estado, ids in por_destino.items():
+            Tarea.objects.filter(pk__in=ids).update(
+                estado=estado, fecha_actualizacion=ahora, **_campos_fecha(estado, ahora)
+            )
+        TransicionTarea.objects.bulk_create(registro, batch_size=1000)
+        if registro:
+            incrementar_version(VERSION_TAREAS)
+
+    return {'aplicadas': len(registro), 'errores': errores}
@@ -1,9 +1,10 @@
 from rest_framework.routers import DefaultRouter
-from .views import TipoTareaViewSet, TareaViewSet
+from .views import TipoTareaViewSet, TareaViewSet, PlantillaRecurrenteViewSet
 
 router = DefaultRouter()
 router.register('tipos-tarea', TipoTareaViewSet, basename='tipotarea')
 router.register('tareas', TareaViewSet, basename='tarea')
+router.register('plantillas-recurrentes', PlantillaRecurrenteViewSet, basename='plantillarecurrente')
 
 app_name = 'tarea'
 urlpatterns = router.urls
@@ -1,10 +1,23 @@
-from rest_framework import viewsets, filters
+import datetime
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from drf_spectacular.utils import extend_schema_view, extend_schema
+from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
+
+from config.exportacion import FORMATOS, formato_solicitado, respuesta_exportacion
 
-from .models import TipoTarea, Tarea
-from .serializer import TipoTareaSerializer, TareaSerializer
+from . import analitica, calendario, costos, recurrencia
+from .filters import TareaFilter
+from .models import TipoTarea, Tarea, PlantillaRecurrente
+from .serializer import (
+    TipoTareaSerializer, TareaSerializer, TareaListSerializer, TransicionSerializer,
+    PlantillaRecurrenteSerializer
+)
+from .transiciones import aplicar_transiciones
 
 
 @extend_schema_view(
@@ -38,13 +51,270 @@ class TareaViewSet(viewsets.ModelViewSet):
     serializer_class = TareaSerializer
 
     # 2 filtros obligatorios
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['estado', 'tipo_tarea__nombre']
-    ordering_fields = ['fecha']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    # TareaFilter también atiende ?search= con igualdades sobre columnas indexadas
+    filterset_class = TareaFilter
+    # Columnas no nulas (requisito de la paginación por cursor) con índice
+    ordering_fields = ['fecha_programada', 'prioridad', 'estado']
+
+    def get_queryset(self):
+        """Incluye lote, tipo de tarea y totales en la misma consulta"""
+        queryset = Tarea.objects.select_related('lote', 'tipo_tarea')
+        if self.action in ('list', 'retrieve', 'tareas_por_lote'):
+            queryset = queryset.con_totales()
+        return queryset
+
+    def get_serializer_class(self):
+        """Usa serializer simplificado para listar, completo para detalle"""
+        if self.action in ('list', 'tareas_por_lote'):
+            return TareaListSerializer
+        return TareaSerializer
 
     # ENDPOINT EXTRA OBLIGATORIO
-    @action(detail=False, methods=['get'], url_path="por-lote/(?P<lote_id>[^/.]+)")
+    @extend_schema(
+        tags=['🌾 Operaciones - Tareas'],
+        parameters=[OpenApiParameter('estado', str, enum=[e for e, _ in Tarea.ESTADO_CHOICES])],
+    )
+    @action(detail=False, methods=['get'], url_path="por-lote/(?P<lote_id>[0-9]+)")
     def tareas_por_lote(self, request, lote_id=None):
-        tareas = Tarea.objects.filter(lote_id=lote_id)
-        serializer = self.get_serializer(tareas, many=True)
-        return Response(serializer.data)
+        """Obtener las tareas de un lote, opcionalmente en un estado (índice lote, estado)"""
+        tareas = self.get_queryset().filter(lote_id=lote_id)
+        estado = request.query_params.get('estado')
+        if estado:
+            tareas = tareas.filter(estado=estado)
+        pagina = self.paginate_queryset(tareas)
+        serializer = self.get_serializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        tags=['🌾 Operaciones - Tareas'],
+        parameters=[OpenApiParameter('formato', str, enum=list(FORMATOS))],
+        responses={(200, 'application/x-ndjson'): str, (200, 'text/csv'): str},
+    )
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """Exportar las tareas filtradas en NDJSON o CSV sin cargarlas en memoria"""
+        formato = formato_solicitado(request)
+        if formato is None:
+            return Response(
+                {'error': f'Formato no soportado. Opciones: {", ".join(FORMATOS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        tareas = self.filter_queryset(self.get_queryset())
+        return respuesta_exportacion(tareas, formato, 'tareas')
+
+    @extend_schema(
+        tags=['🌾 Operaciones - Tareas'],
+        parameters=[
+            OpenApiParameter('desde', datetime.date, required=True),
+            OpenApiParameter('hasta', datetime.date, required=True,
+                             description=f'Máximo {calendario.MAX_DIAS} días después de desde'),
+            OpenApiParameter('finca', int),
+            OpenApiParameter('lote', int),
+            OpenApiParameter('estado', str, enum=[e for e, _ in Tarea.ESTADO_CHOICES]),
+        ],
+    )
+    @action(detail=False, methods=['get'])
+    def calendario(self, request):
+        """
+        Obtener la agenda de tareas por día en un rango de fechas con el total
+        de horas estimadas de cada día. Responde ETag; si la agenda no cambió
+        desde la última consulta retorna 304.
+        """
+        parametros = request.query_params
+        try:
+            desde = datetime.date.fromisoformat(parametros['desde'])
+            hasta = datetime.date.fromisoformat(parametros['hasta'])
+            finca = int(parametros['finca']) if parametros.get('finca') else None
+            lote = int(parametros['lote']) if parametros.get('lote') else None
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Se requieren desde y hasta (AAAA-MM-DD); finca y lote deben ser ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= (hasta - desde).days < calendario.MAX_DIAS:
+            return Response(
+                {'error': f'El rango debe tener entre 1 y {calendario.MAX_DIAS} días'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        estado = parametros.get('estado')
+
+        tareas = Tarea.objects.filter(fecha_programada__range=(desde, hasta))
+        if estado:
+            tareas = tareas.filter(estado=estado)
+        if lote is not None:
+            tareas = tareas.filter(lote_id=lote)
+        if finca is not None:
+            tareas = tareas.filter(lote__finca_id=finca)
+
+        etag = quote_etag(calendario.etag(tareas, (desde, hasta, finca, lote, estado)))
+        respuesta = get_conditional_response(request, etag=etag)
+        if respuesta is None:
+            respuesta = Response({
+                'desde': desde,
+                'hasta': hasta,
+                'dias': calendario.agenda(tareas, desde, hasta),
+            })
+        respuesta['ETag'] = etag
+        patch_cache_control(respuesta, private=True, no_cache=True)
+        return respuesta
+
+    @extend_schema(
+        tags=['🌾 Operaciones - Tareas'],
+        request=TransicionSerializer,
+        parameters=[
+            OpenApiParameter('parcial', bool,
+                             description='Aplica los cambios válidos aunque otros sean rechazados'),
+        ],
+    )
+    @action(detail=False, methods=['post'])
+    def transicion(self, request):
+        """
+        Cambiar el estado de muchas tareas en una sola transacción.
+        
+        Valida cada cambio contra las transiciones permitidas, sella
+        fecha_inicio/fecha_fin y registra cada transición. Si algún cambio no
+        es válido no se aplica ninguno, salvo con ?parcial=true.
+        """
+        serializer = TransicionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        parcial = request.query_params.get('parcial', '').lower() in ('1', 'true', 'si')
+        resultado = aplicar_transiciones(
+            serializer.validated_data['lista_cambios'],
+            observaciones=serializer.validated_data['observaciones'],
+            parcial=parcial,
+        )
+        if resultado['errores'] and not resultado['aplicadas']:
+            return Response(resultado, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado)
+
+    @extend_schema(
+        tags=['🌾 Operaciones - Tareas'],
+        parameters=[
+            OpenApiParameter('desde', datetime.date, required=True),
+            OpenApiParameter('hasta', datetime.date, required=True),
+            OpenApiParameter('finca', int),
+        ],
+    )
+    @action(detail=False, methods=['get'])
+    def eficiencia(self, request):
+        """
+        Obtener la distribución de la eficiencia en tiempo y costo (media,
+        percentiles y tareas atípicas) por categoría, lote y finca de las
+        tareas programadas en el rango.
+        """
+        parametros = request.query_params
+        try:
+            desde = datetime.date.fromisoformat(parametros['desde'])
+            hasta = datetime.date.fromisoformat(parametros['hasta'])
+            finca = int(parametros['finca']) if parametros.get('finca') else None
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Se requieren desde y hasta (AAAA-MM-DD); finca debe ser un id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if hasta < desde:
+            return Response(
+                {'error': 'hasta debe ser posterior a desde'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(analitica.obtener_eficiencia(desde, hasta, finca))
+
+    @extend_schema(
+        tags=['🌾 Operaciones - Tareas'],
+        parameters=[
+            OpenApiParameter('desde', datetime.date, required=True),
+            OpenApiParameter('hasta', datetime.date, required=True),
+            OpenApiParameter('agrupar', str, enum=list(costos.AGRUPACIONES)),
+            OpenApiParameter('finca', int),
+        ],
+    )
+    @action(detail=False, methods=['get'])
+    def costos(self, request):
+        """
+        Obtener el costo de materiales y mano de obra de las tareas programadas
+        en el rango, agrupado por lote (por defecto) o por finca.
+        """
+        parametros = request.query_params
+        agrupar = parametros.get('agrupar', 'lote')
+        try:
+            desde = datetime.date.fromisoformat(parametros['desde'])
+            hasta = datetime.date.fromisoformat(parametros['hasta'])
+            finca = int(parametros['finca']) if parametros.get('finca') else None
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Se requieren desde y hasta (AAAA-MM-DD); finca debe ser un id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if agrupar not in costos.AGRUPACIONES:
+            return Response(
+                {'error': f'agrupar debe ser uno de: {", ".join(costos.AGRUPACIONES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if hasta < desde:
+            return Response(
+                {'error': 'hasta debe ser posterior a desde'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(costos.reporte(desde, hasta, agrupar, finca))
+
+
+@extend_schema_view(
+    list=extend_schema(tags=['🌾 Plantillas Recurrentes']),
+    create=extend_schema(tags=['🌾 Plantillas Recurrentes']),
+    retrieve=extend_schema(tags=['🌾 Plantillas Recurrentes']),
+    update=extend_schema(tags=['🌾 Plantillas Recurrentes']),
+    partial_update=extend_schema(tags=['🌾 Plantillas Recurrentes']),
+    destroy=extend_schema(tags=['🌾 Plantillas Recurrentes']),
+)
+class PlantillaRecurrenteViewSet(viewsets.ModelViewSet):
+    queryset = PlantillaRecurrente.objects.select_related('tipo_tarea').prefetch_related('lotes')
+    serializer_class = PlantillaRecurrenteSerializer
+
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['nombre', 'tipo_tarea__nombre']
+    ordering_fields = ['nombre', 'fecha_inicio']
+
+    @extend_schema(
+        tags=['🌾 Plantillas Recurrentes'],
+        parameters=[
+            OpenApiParameter('hasta', datetime.date, required=True,
+                             description=f'Máximo {recurrencia.MAX_DIAS} días después de desde'),
+            OpenApiParameter('desde', datetime.date, description='Por defecto, hoy'),
+            OpenApiParameter('plantilla', int, many=True,
+                             description='Solo estas plantillas (se puede repetir)'),
+            OpenApiParameter('dry_run', bool, description='Solo cuenta las tareas a crear'),
+        ],
+        request=None,
+    )
+    @action(detail=False, methods=['post'])
+    def materializar(self, request):
+        """
+        Crear las tareas de las plantillas activas hasta la fecha indicada.
+        Las ocurrencias que ya existen se omiten, así que se puede repetir.
+        """
+        parametros = request.query_params
+        try:
+            hasta = datetime.date.fromisoformat(parametros['hasta'])
+            desde = (
+                datetime.date.fromisoformat(parametros['desde'])
+                if parametros.get('desde') else datetime.date.today()
+            )
+            plantillas = [int(p) for p in parametros.getlist('plantilla')] or None
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Se requiere hasta (AAAA-MM-DD); desde y plantilla son opcionales'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= (hasta - desde).days < recurrencia.MAX_DIAS:
+            return Response(
+                {'error': f'El rango debe tener entre 1 y {recurrencia.MAX_DIAS} días'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        simulacion = parametros.get('dry_run', '').lower() in ('1', 'true', 'si')
+        resultado = recurrencia.materializar(desde, hasta, plantillas, aplicar=not simulacion)
+        resultado['dry_run'] = simulacion
+        return Response(
+            resultado,
+            status=status.HTTP_200_OK if simulacion else status.HTTP_201_CREATED
+        )
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class TrabajadoresConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trabajadores'
+
+    def ready(self):
+        from busqueda.indice import registrar
+        from tarea.costos import registrar as registrar_costo
+        from .models import Asignacion, Trabajador
+
+        registrar(Trabajador, ['nombres', 'apellidos'])
+        registrar_costo(Asignacion, 'costo_mano_obra')
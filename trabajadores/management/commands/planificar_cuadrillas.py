@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from trabajadores.planificacion import planificar, rango_fechas
+
+
+class Command(BaseCommand):
+    help = 'Asigna trabajadores a las tareas pendientes de un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('desde', help='Fecha inicial (AAAA-MM-DD)')
+        parser.add_argument('hasta', help='Fecha final (AAAA-MM-DD)')
+        parser.add_argument('--finca', type=int, help='Solo las tareas de esta finca')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Calcula y muestra la propuesta sin crear asignaciones'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            desde, hasta = rango_fechas(options['desde'], options['hasta'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        resultado = planificar(
+            desde, hasta, finca_id=options['finca'], aplicar=not options['dry_run']
+        )
+        for faltante in resultado['sin_asignar']:
+            self.stdout.write(
+                f'Tarea {faltante["tarea"]}: {faltante["motivo"]} '
+                f'({faltante["horas_faltantes"]} h sin asignar)'
+            )
+        accion = 'propuesta(s)' if options['dry_run'] else 'creada(s)'
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(resultado["asignaciones"])} asignación(es) {accion}; '
+            f'{resultado["tareas_completas"]} tarea(s) cubiertas, '
+            f'{len(resultado["sin_asignar"])} sin cubrir'
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:49
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajadores', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajador',
+            name='horas_diarias',
+            field=models.DecimalField(decimal_places=2, default=8, help_text='Capacidad de horas de trabajo por día', max_digits=4, validators=[django.core.validators.MinValueValidator(0.5), django.core.validators.MaxValueValidator(24)]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trabajadores', '0002_capacidad_trabajador'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asignacion',
+            name='costo',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Costo al valor hora del trabajador cuando se registró', max_digits=12),
+        ),
+    ]
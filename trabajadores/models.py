@@ -1,8 +1,9 @@
 
 
 # Create your models here.
-from django.db import models
-from django.core.validators import MinValueValidator, RegexValidator
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, NullIf
+from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
 from tarea.models import Tarea 
 
 
@@ -67,6 +68,13 @@ class Trabajador(models.Model):
         validators=[MinValueValidator(0)],
         help_text="Valor por hora trabajada"
     )
+    horas_diarias = models.DecimalField(
+        max_digits=4,
+        decimal_places=2,
+        default=8,
+        validators=[MinValueValidator(0.5), MaxValueValidator(24)],
+        help_text="Capacidad de horas de trabajo por día"
+    )
     
     # Habilidades y certificaciones
     especialidades = models.TextField(
@@ -158,6 +166,13 @@ class Asignacion(models.Model):
     )
     observaciones = models.TextField(blank=True)
     completada = models.BooleanField(default=False)
+    costo = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text="Costo al valor hora del trabajador cuando se registró"
+    )
     
     class Meta:
         ordering = ['-fecha_asignacion']
@@ -178,6 +193,25 @@ class Asignacion(models.Model):
             return self.horas_trabajadas * self.trabajador.valor_hora
         return self.horas_asignadas * self.trabajador.valor_hora
     
+    @classmethod
+    def expresion_costo(cls):
+        """costo_mano_obra() como expresión, para recalcular en la base de datos"""
+        valor_hora = Trabajador.objects.filter(pk=models.OuterRef('trabajador_id')).values('valor_hora')
+        horas = Coalesce(NullIf('horas_trabajadas', models.Value(0)), 'horas_asignadas')
+        return models.ExpressionWrapper(
+            horas * models.Subquery(valor_hora),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        )
+    
+    def save(self, *args, **kwargs):
+        self.costo = round(self.costo_mano_obra(), 2)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'horas_asignadas', 'horas_trabajadas', 'trabajador'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'costo'}
+        # El costo de la tarea se actualiza en las señales dentro de la misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     def eficiencia(self):
         """Calcula la eficiencia (% horas trabajadas vs asignadas)"""
         if self.horas_trabajadas and self.horas_asignadas:
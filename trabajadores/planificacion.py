@@ -0,0 +1,277 @@
+"""
+Planificación automática de cuadrillas.
+
+Asigna trabajadores a las tareas pendientes de un rango de fechas respetando:
+- la capacidad diaria de cada trabajador (`Trabajador.horas_diarias`), descontando
+  las horas que ya tiene asignadas ese día;
+- el rol del trabajador según la categoría del tipo de tarea (ROLES_POR_CATEGORIA);
+- las tareas que requieren maquinaria, que llevan al menos un maquinista.
+
+Las tareas se atienden por fecha y prioridad. Para cada día y rol hay un montículo
+de trabajadores ordenado por capacidad restante, así que elegir al trabajador más
+libre cuesta O(log n) y una temporada de miles de tareas se planifica en segundos.
+Las horas se manejan en centésimas enteras para evitar errores de redondeo.
+Ninguna asignación baja del mínimo del modelo (0.1 h): los trabajadores con
+menos capacidad libre no se eligen y un faltante menor se da por cubierto.
+
+Al aplicar, las tareas y los trabajadores planificables se bloquean con
+select_for_update, así que dos planificaciones simultáneas se ejecutan una tras
+otra y la segunda ve las asignaciones de la primera.
+"""
+import datetime
+import heapq
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from tarea.costos import recalcular as recalcular_costos
+from tarea.models import Tarea
+
+from .models import Asignacion, Trabajador
+
+ROLES_POR_CATEGORIA = {
+    'preparacion': {'operario', 'maquinista'},
+    'siembra': {'operario', 'tecnico'},
+    'mantenimiento': {'operario', 'tecnico'},
+    'fertilizacion': {'operario', 'tecnico', 'especialista'},
+    'control_plagas': {'tecnico', 'especialista'},
+    'riego': {'operario', 'tecnico'},
+    'poda': {'operario', 'especialista'},
+    'cosecha': {'operario', 'maquinista'},
+    'postcosecha': {'operario', 'tecnico'},
+}
+ROL_MAQUINARIA = 'maquinista'
+
+ORDEN_PRIORIDAD = {'urgente': 0, 'alta': 1, 'media': 2, 'baja': 3}
+# Mínimo de Asignacion.horas_asignadas, en centésimas
+MIN_CENTESIMAS = 10
+
+
+def _centesimas(horas):
+    return int(Decimal(horas) * 100)
+
+
+def _horas(centesimas):
+    return Decimal(centesimas) / 100
+
+
+class _Disponibilidad:
+    """Capacidad restante de los trabajadores por día, en montículos por rol"""
+
+    def __init__(self, trabajadores, ocupadas):
+        self.trabajadores = trabajadores
+        self.ocupadas = ocupadas
+        self.dias = {}
+
+    def monticulos(self, dia):
+        if dia not in self.dias:
+            por_rol = defaultdict(list)
+            for trabajador in self.trabajadores:
+                if trabajador['fecha_ingreso'] > dia:
+                    continue
+                if trabajador['fecha_salida'] and trabajador['fecha_salida'] <= dia:
+                    continue
+                libre = trabajador['capacidad'] - self.ocupadas.get((trabajador['id'], dia), 0)
+                if libre >= MIN_CENTESIMAS:
+                    por_rol[trabajador['rol']].append((-libre, trabajador['id']))
+            for monticulo in por_rol.values():
+                heapq.heapify(monticulo)
+            self.dias[dia] = por_rol
+        return self.dias[dia]
+
+    def tomar(self, dia, roles, excluir):
+        """
+        Saca del montículo al trabajador con más capacidad libre entre `roles`
+        que no esté en `excluir`. Retorna (trabajador_id, rol, libre) o None.
+        """
+        por_rol = self.monticulos(dia)
+        apartados = []
+        elegido = None
+        while elegido is None:
+            mejor = None
+            for rol in roles:
+                monticulo = por_rol.get(rol)
+                if monticulo and (mejor is None or monticulo[0] < por_rol[mejor][0]):
+                    mejor = rol
+            if mejor is None:
+                break
+            libre, trabajador_id = heapq.heappop(por_rol[mejor])
+            if trabajador_id in excluir:
+                apartados.append((mejor, (libre, trabajador_id)))
+            else:
+                elegido = (trabajador_id, mejor, -libre)
+        for rol, item in apartados:
+            heapq.heappush(por_rol[rol], item)
+        return elegido
+
+    def devolver(self, dia, rol, trabajador_id, libre):
+        if libre >= MIN_CENTESIMAS:
+            heapq.heappush(self.monticulos(dia)[rol], (-libre, trabajador_id))
+
+
+def _porcion(libre, faltante):
+    """
+    Horas que toma un trabajador con `libre` disponibles. Si dejaría un faltante
+    menor que el mínimo, lo deja en el mínimo para el siguiente trabajador
+    cuando la porción propia sigue alcanzando el mínimo.
+    """
+    horas = min(libre, faltante)
+    resto = faltante - horas
+    if 0 < resto < MIN_CENTESIMAS and horas - (MIN_CENTESIMAS - resto) >= MIN_CENTESIMAS:
+        horas -= MIN_CENTESIMAS - resto
+    return horas
+
+
+def planificar(desde, hasta, finca_id=None, aplicar=True):
+    """
+    Asigna trabajadores a las tareas pendientes programadas entre `desde` y
+    `hasta`. Con `aplicar=False` solo calcula la propuesta (simulación).
+
+    Retorna {'asignaciones': [{'tarea', 'trabajador', 'horas'}],
+    'tareas_completas', 'sin_asignar': [{'tarea', 'motivo', 'horas_faltantes'}]}.
+    """
+    with transaction.atomic():
+        return _planificar(desde, hasta, finca_id, aplicar)
+
+
+def _planificar(desde, hasta, finca_id, aplicar):
+    tareas = Tarea.objects.filter(
+        estado='pendiente', fecha_programada__range=(desde, hasta)
+    )
+    if finca_id is not None:
+        tareas = tareas.filter(lote__finca_id=finca_id)
+    roles_planificables = set().union(*ROLES_POR_CATEGORIA.values(), {ROL_MAQUINARIA})
+    trabajadores = Trabajador.objects.filter(activo=True, rol__in=roles_planificables)
+    if aplicar:
+        # Se bloquean antes de leer las asignaciones existentes
+        tareas = tareas.select_for_update(of=('self',))
+        trabajadores = trabajadores.select_for_update()
+        list(trabajadores.order_by('pk').values_list('pk'))
+    tareas = list(tareas.values(
+        'id', 'fecha_programada', 'prioridad', 'horas_estimadas',
+        'tipo_tarea__categoria', 'tipo_tarea__requiere_maquinaria',
+    ))
+    tareas.sort(key=lambda t: (
+        t['fecha_programada'], ORDEN_PRIORIDAD.get(t['prioridad'], 9), t['id']
+    ))
+
+    # Horas ya asignadas: por tarea, por trabajador y día, y parejas existentes
+    asignadas = Asignacion.objects.filter(
+        tarea__fecha_programada__range=(desde, hasta)
+    ).exclude(tarea__estado='cancelada')
+    por_tarea = defaultdict(int)
+    equipo = defaultdict(set)
+    con_maquinista = set()
+    ocupadas = defaultdict(int)
+    for trabajador_id, rol, tarea_id, dia, horas in asignadas.values_list(
+        'trabajador_id', 'trabajador__rol', 'tarea_id', 'tarea__fecha_programada',
+        'horas_asignadas'
+    ):
+        centesimas = _centesimas(horas)
+        por_tarea[tarea_id] += centesimas
+        equipo[tarea_id].add(trabajador_id)
+        ocupadas[(trabajador_id, dia)] += centesimas
+        if rol == ROL_MAQUINARIA:
+            con_maquinista.add(tarea_id)
+
+    trabajadores = [
+        {**fila, 'capacidad': _centesimas(fila['horas_diarias'])}
+        for fila in trabajadores.values(
+            'id', 'rol', 'horas_diarias', 'valor_hora', 'fecha_ingreso', 'fecha_salida'
+        )
+    ]
+    disponibilidad = _Disponibilidad(trabajadores, ocupadas)
+
+    propuestas = []
+    sin_asignar = []
+    completas = 0
+    for tarea in tareas:
+        dia = tarea['fecha_programada']
+        faltante = _centesimas(tarea['horas_estimadas']) - por_tarea[tarea['id']]
+        if faltante < MIN_CENTESIMAS:
+            continue
+        roles = ROLES_POR_CATEGORIA.get(tarea['tipo_tarea__categoria'], {'operario'})
+        miembros = equipo[tarea['id']]
+        motivo = None
+
+        # Primero el maquinista, si la tarea lo requiere y aún no lo tiene
+        if tarea['tipo_tarea__requiere_maquinaria'] and tarea['id'] not in con_maquinista:
+            elegido = disponibilidad.tomar(dia, [ROL_MAQUINARIA], miembros)
+            if elegido is None:
+                sin_asignar.append({
+                    'tarea': tarea['id'], 'motivo': 'sin_maquinista',
+                    'horas_faltantes': _horas(faltante),
+                })
+                continue
+            trabajador_id, rol, libre = elegido
+            horas = _porcion(libre, faltante)
+            propuestas.append((tarea['id'], trabajador_id, horas))
+            miembros.add(trabajador_id)
+            faltante -= horas
+            disponibilidad.devolver(dia, rol, trabajador_id, libre - horas)
+
+        while faltante >= MIN_CENTESIMAS:
+            elegido = disponibilidad.tomar(dia, roles, miembros)
+            if elegido is None:
+                motivo = 'sin_capacidad'
+                break
+            trabajador_id, rol, libre = elegido
+            horas = _porcion(libre, faltante)
+            propuestas.append((tarea['id'], trabajador_id, horas))
+            miembros.add(trabajador_id)
+            faltante -= horas
+            disponibilidad.devolver(dia, rol, trabajador_id, libre - horas)
+
+        if motivo:
+            sin_asignar.append({
+                'tarea': tarea['id'], 'motivo': motivo, 'horas_faltantes': _horas(faltante),
+            })
+        else:
+            completas += 1
+
+    if aplicar and propuestas:
+        # bulk_create no envía señales: el costo se fija aquí y los totales se recalculan
+        valor_hora = {t['id']: t['valor_hora'] for t in trabajadores}
+        Asignacion.objects.bulk_create(
+            [
+                Asignacion(tarea_id=tarea_id, trabajador_id=trabajador_id,
+                           horas_asignadas=_horas(horas),
+                           costo=round(_horas(horas) * valor_hora[trabajador_id], 2))
+                for tarea_id, trabajador_id, horas in propuestas
+            ],
+            batch_size=1000,
+        )
+        recalcular_costos({tarea_id for tarea_id, _, _ in propuestas})
+
+    return {
+        'asignaciones': [
+            {'tarea': tarea_id, 'trabajador': trabajador_id, 'horas': _horas(horas)}
+            for tarea_id, trabajador_id, horas in propuestas
+        ],
+        'tareas_completas': completas,
+        'sin_asignar': sin_asignar,
+    }
+
+
+def horas_ocupadas(trabajador_id, dia, excluir_asignacion=None):
+    """Retorna las horas ya asignadas a un trabajador en tareas de ese día"""
+    asignaciones = Asignacion.objects.filter(
+        trabajador_id=trabajador_id, tarea__fecha_programada=dia
+    ).exclude(tarea__estado='cancelada')
+    if excluir_asignacion is not None:
+        asignaciones = asignaciones.exclude(pk=excluir_asignacion)
+    return asignaciones.aggregate(total=Sum('horas_asignadas'))['total'] or Decimal('0')
+
+
+def rango_fechas(desde, hasta, max_dias=366):
+    """Valida un rango de fechas ISO; retorna (desde, hasta) o lanza ValueError"""
+    try:
+        desde = datetime.date.fromisoformat(str(desde))
+        hasta = datetime.date.fromisoformat(str(hasta))
+    except ValueError:
+        raise ValueError('Se requieren desde y hasta con formato AAAA-MM-DD')
+    if not 0 <= (hasta - desde).days < max_dias:
+        raise ValueError(f'El rango debe tener entre 1 y {max_dias} días')
+    return desde, hasta
@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Trabajador, Asignacion
+from .planificacion import horas_ocupadas
 
 class TrabajadorSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,4 +14,30 @@ class AsignacionSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Asignacion
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+    # VALIDACIÓN PERSONALIZADA: capacidad diaria del trabajador. Se revisa al
+    # guardar, dentro de la transacción y con la fila del trabajador bloqueada,
+    # para que dos asignaciones simultáneas no superen juntas su capacidad
+    def save(self, **kwargs):
+        with transaction.atomic():
+            self.validar_capacidad({**self.validated_data, **kwargs})
+            return super().save(**kwargs)
+
+    def validar_capacidad(self, attrs):
+        trabajador = attrs.get('trabajador', getattr(self.instance, 'trabajador', None))
+        tarea = attrs.get('tarea', getattr(self.instance, 'tarea', None))
+        horas = attrs.get('horas_asignadas', getattr(self.instance, 'horas_asignadas', None))
+        if trabajador and tarea and horas:
+            trabajador = Trabajador.objects.select_for_update().get(pk=trabajador.pk)
+            ocupadas = horas_ocupadas(
+                trabajador.pk, tarea.fecha_programada,
+                excluir_asignacion=getattr(self.instance, 'pk', None)
+            )
+            if ocupadas + horas > trabajador.horas_diarias:
+                raise serializers.ValidationError({
+                    'horas_asignadas': [
+                        f'El trabajador solo tiene {trabajador.horas_diarias - ocupadas} '
+                        f'horas libres el {tarea.fecha_programada}.'
+                    ]
+                })
@@ -1,3 +1,155 @@
-from django.test import TestCase
+import datetime
+import random
+from collections import defaultdict
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db.models import QuerySet
+
+from rest_framework.test import APITestCase
+
+from fincas.models import Finca, Lote
+from tarea.models import Tarea, TipoTarea
+
+from .models import Asignacion, Trabajador
+from .planificacion import planificar
+
+
+class PlanificacionTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        finca = Finca.objects.create(
+            nombre='Finca Test', ubicacion='Vereda', area_total=100,
+            latitud=4.6, longitud=-74.1, propietario='Propietario'
+        )
+        cls.lote = Lote.objects.create(finca=finca, codigo='L-1', nombre='Lote 1', area=5)
+        cls.riego = TipoTarea.objects.create(
+            nombre='Riego', categoria='riego', duracion_estimada_horas=2
+        )
+        cls.cosecha = TipoTarea.objects.create(
+            nombre='Cosecha', categoria='cosecha', duracion_estimada_horas=4,
+            requiere_maquinaria=True
+        )
+        cls.desde = datetime.date(2025, 3, 3)
+
+    def crear_trabajadores(self, horas_diarias):
+        roles = ['operario', 'tecnico', 'maquinista']
+        return Trabajador.objects.bulk_create([
+            Trabajador(
+                numero_identificacion=str(1000 + i), nombres=f'Nombre {i}', apellidos='Apellido',
+                fecha_nacimiento=datetime.date(1990, 1, 1), rol=roles[i % len(roles)],
+                fecha_ingreso=datetime.date(2020, 1, 1), salario_base=1000, valor_hora=10,
+                horas_diarias=horas
+            )
+            for i, horas in enumerate(horas_diarias)
+        ])
+
+    def crear_tareas(self, cantidad, dias, horas):
+        aleatorio = random.Random(13)
+        return Tarea.objects.bulk_create([
+            Tarea(
+                lote=self.lote, tipo_tarea=self.cosecha if i % 5 == 0 else self.riego,
+                titulo=f'Tarea {i}', descripcion='Descripción',
+                fecha_programada=self.desde + datetime.timedelta(days=i % dias),
+                prioridad=aleatorio.choice(['baja', 'media', 'alta', 'urgente']),
+                horas_estimadas=aleatorio.choice(horas),
+            )
+            for i in range(cantidad)
+        ])
+
+    def test_miles_de_tareas_respetan_la_capacidad(self):
+        self.crear_trabajadores([Decimal('7.95'), 8, Decimal('6.5'), Decimal('4.05')] * 15)
+        self.crear_tareas(3000, 30, ['0.15', '0.5', '1.05', '2.95', '3.1', '6'])
+        hasta = self.desde + datetime.timedelta(days=29)
+
+        simulacion = planificar(self.desde, hasta, aplicar=False)
+        self.assertFalse(Asignacion.objects.exists())
+        resultado = planificar(self.desde, hasta)
+        self.assertEqual(len(resultado['asignaciones']), len(simulacion['asignaciones']))
+        self.assertEqual(Asignacion.objects.count(), len(resultado['asignaciones']))
+        self.assertTrue(resultado['sin_asignar'])
+
+        capacidad = dict(Trabajador.objects.values_list('pk', 'horas_diarias'))
+        ocupadas = defaultdict(Decimal)
+        por_tarea = defaultdict(Decimal)
+        for trabajador_id, tarea_id, dia, horas in Asignacion.objects.values_list(
+            'trabajador_id', 'tarea_id', 'tarea__fecha_programada', 'horas_asignadas'
+        ):
+            self.assertGreaterEqual(horas, Decimal('0.1'))
+            ocupadas[(trabajador_id, dia)] += horas
+            por_tarea[tarea_id] += horas
+        for (trabajador_id, _), horas in ocupadas.items():
+            self.assertLessEqual(horas, capacidad[trabajador_id])
+
+        sin_asignar = {s['tarea'] for s in resultado['sin_asignar']}
+        for tarea_id, estimadas in Tarea.objects.values_list('pk', 'horas_estimadas'):
+            if tarea_id not in sin_asignar:
+                self.assertGreater(por_tarea[tarea_id], estimadas - Decimal('0.1'))
+
+        # Una segunda planificación solo completa lo que quedó sin asignar
+        segunda = planificar(self.desde, hasta)
+        self.assertEqual(Asignacion.objects.count(),
+                         len(resultado['asignaciones']) + len(segunda['asignaciones']))
+
+    def test_no_crea_porciones_menores_al_minimo(self):
+        # 8 h de capacidad por trabajador: 7.95 h dejarían 0.05 h libres
+        self.crear_trabajadores([8, 8, 8, 8])
+        primera, segunda = Tarea.objects.bulk_create([
+            Tarea(lote=self.lote, tipo_tarea=self.riego, titulo=titulo, descripcion='',
+                  fecha_programada=self.desde, prioridad=prioridad, horas_estimadas=horas)
+            for titulo, prioridad, horas in [('Larga', 'urgente', '7.95'), ('Corta', 'baja', '8.05')]
+        ])
+        resultado = planificar(self.desde, self.desde)
+        self.assertEqual(resultado['sin_asignar'], [])
+        horas = {
+            (a['tarea'], a['trabajador']): a['horas'] for a in resultado['asignaciones']
+        }
+        self.assertTrue(all(h >= Decimal('0.1') for h in horas.values()))
+        self.assertEqual(sum(h for (t, _), h in horas.items() if t == primera.pk), Decimal('7.95'))
+        self.assertEqual(sum(h for (t, _), h in horas.items() if t == segunda.pk), Decimal('8.05'))
+
+
+class AsignacionCapacidadTests(APITestCase):
+    url = '/api/rrhh/asignaciones/'
+
+    @classmethod
+    def setUpTestData(cls):
+        finca = Finca.objects.create(
+            nombre='Finca Test', ubicacion='Vereda', area_total=100,
+            latitud=4.6, longitud=-74.1, propietario='Propietario'
+        )
+        lote = Lote.objects.create(finca=finca, codigo='L-1', nombre='Lote 1', area=5)
+        riego = TipoTarea.objects.create(
+            nombre='Riego', categoria='riego', duracion_estimada_horas=2
+        )
+        cls.tareas = Tarea.objects.bulk_create([
+            Tarea(lote=lote, tipo_tarea=riego, titulo=f'Riego {i}', descripcion='',
+                  fecha_programada=datetime.date(2025, 3, 3), horas_estimadas=10)
+            for i in range(3)
+        ])
+        cls.trabajador = Trabajador.objects.create(
+            numero_identificacion='1000', nombres='Nombre', apellidos='Apellido',
+            fecha_nacimiento=datetime.date(1990, 1, 1), rol='operario',
+            fecha_ingreso=datetime.date(2020, 1, 1), salario_base=1000, valor_hora=10,
+            horas_diarias=8
+        )
+
+    def asignar(self, tarea, horas):
+        return self.client.post(self.url, {
+            'trabajador': self.trabajador.pk, 'tarea': tarea.pk, 'horas_asignadas': horas,
+        })
+
+    def test_capacidad_se_revisa_con_el_trabajador_bloqueado(self):
+        with mock.patch.object(
+            QuerySet, 'select_for_update', autospec=True, side_effect=QuerySet.select_for_update
+        ) as bloqueo:
+            self.assertEqual(self.asignar(self.tareas[0], '5').status_code, 201)
+        self.assertEqual(bloqueo.call_count, 1)
+        self.assertEqual(bloqueo.call_args.args[0].model, Trabajador)
+
+        respuesta = self.asignar(self.tareas[1], '3.5')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('horas_asignadas', respuesta.json())
+        self.assertEqual(self.asignar(self.tareas[2], '3').status_code, 201)
+        self.assertEqual(Asignacion.objects.count(), 2)
@@ -3,8 +3,10 @@ from django.views.decorators.http import require_http_methods
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from drf_spectacular.utils import extend_schema_view, extend_schema
+from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
+from busqueda.filters import IndiceSearchFilter, RelevanciaOrderingFilter
 from .models import Trabajador, Asignacion
+from .planificacion import planificar, rango_fechas
 from .serializer import TrabajadorSerializer, AsignacionSerializer
 
 
@@ -21,7 +23,7 @@ class TrabajadorViewSet(viewsets.ModelViewSet):
     serializer_class = TrabajadorSerializer
 
     # 2 filtros obligatorios
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [IndiceSearchFilter, RelevanciaOrderingFilter]
     search_fields = ['nombres', 'apellidos']
     ordering_fields = ['fecha_ingreso']
 
@@ -47,4 +49,37 @@ class AsignacionViewSet(viewsets.ModelViewSet):
     
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['trabajador__nombres', 'tarea__titulo']
-    ordering_fields = ['fecha_asignacion', 'completada']
\ No newline at end of file
+    ordering_fields = ['fecha_asignacion', 'completada']
+
+    # ENDPOINT EXTRA: planificación automática de cuadrillas
+    @extend_schema(
+        tags=['👥 Asignaciones'],
+        parameters=[
+            OpenApiParameter('desde', str, required=True, description='AAAA-MM-DD'),
+            OpenApiParameter('hasta', str, required=True, description='AAAA-MM-DD'),
+            OpenApiParameter('finca', int),
+            OpenApiParameter('dry_run', bool, description='Solo calcula la propuesta sin guardarla'),
+        ],
+        request=None,
+    )
+    @action(detail=False, methods=['post'])
+    def planificar(self, request):
+        """
+        Asigna trabajadores a las tareas pendientes del rango según su capacidad
+        diaria, su rol y la maquinaria requerida. Con dry_run=true retorna la
+        propuesta sin crear asignaciones.
+        """
+        parametros = request.query_params
+        try:
+            desde, hasta = rango_fechas(parametros.get('desde'), parametros.get('hasta'))
+            finca = int(parametros['finca']) if parametros.get('finca') else None
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        simulacion = parametros.get('dry_run', '').lower() in ('1', 'true', 'si')
+
+        resultado = planificar(desde, hasta, finca_id=finca, aplicar=not simulacion)
+        resultado['dry_run'] = simulacion
+        return Response(
+            resultado,
+            status=status.HTTP_200_OK if simulacion else status.HTTP_201_CREATED
+        )